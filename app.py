@@ -1,25 +1,41 @@
 import asyncio
 import logging
-from datetime import datetime
+import secrets
+from datetime import datetime, timedelta, timezone
 from typing import List, Optional
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
-from fastapi import FastAPI, Depends, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session
+from sqlalchemy import text
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # مقامی امپورٹس
+import async_crud
 import database_crud as crud
-from config import app_settings
-from models import SessionLocal, create_db_and_tables, engine
+from config import api_settings, app_settings, guardian_settings, news_settings, webhook_settings
+from async_crud import get_async_db
+from models import AsyncSessionLocal, SessionLocal, async_engine, create_db_and_tables
 from hunter import hunt_for_signals_job
-from feedback_checker import check_active_signals_job
+from learning_store import learning_store
+from outcome_stats import outcome_stats
+from feedback_checker import announce_closed_trades, check_active_signals_job
+from event_bus import event_bus
+from guardian_scheduler import guardian_scheduler
+from leader_election import leader
+from news_index import news_index
+from response_cache import ENDPOINT_MAX_AGE, response_cache
 from sentinel import update_economic_calendar_cache
 from websocket_manager import manager
-from schemas import DailyStatsResponse, SystemStatusResponse, HistoryResponse, NewsResponse, ActiveSignalResponse
+from signal_registry import registry, verify_registry_job
+from telegram_dispatcher import telegram_dispatcher
+from webhook_dispatcher import WEBHOOK_EVENT_TYPES, check_webhook_url, webhook_dispatcher
+from schemas import (DailyStatsResponse, StatsResponse, SystemStatusResponse, HistoryResponse, NewsResponse, ActiveSignalResponse,
+                     WebhookCreateRequest, WebhookCreatedResponse, WebhookDeliveryResponse, WebhookResponse)
 from roster_manager import get_forex_pairs
 
 # لاگنگ کی ترتیب
@@ -45,17 +61,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
-# --- انحصار ---
-def get_db():
-    """ڈیٹا بیس سیشن فراہم کرنے والا انحصار۔"""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # --- پس منظر کے کام ---
 
 async def cleanup_weekend_signals():
@@ -63,49 +71,88 @@ async def cleanup_weekend_signals():
     صرف فاریکس سگنلز کو ہفتے کے آخر میں بند کرتا ہے اور فرنٹ اینڈ کو مطلع کرتا ہے۔
     """
     logger.info("🧹 ہفتے کے آخر کی صفائی کا کام شروع ہو رہا ہے...")
-    db = SessionLocal()
     try:
         forex_pairs = get_forex_pairs()
         if not forex_pairs:
             logger.warning("🧹 صفائی کا کام روکا گیا: فاریکس جوڑوں کی فہرست نہیں ملی۔")
             return
 
-        # ڈیٹا بیس سے صرف فاریکس کے فعال سگنلز حاصل کریں
-        signals_to_close = db.query(crud.ActiveSignal).filter(
-            crud.ActiveSignal.symbol.in_(forex_pairs)
-        ).all()
+        # رجسٹری سے صرف فاریکس کے فعال سگنلز حاصل کریں
+        signals_to_close = [s for s in registry.all() if s.symbol in forex_pairs]
 
         if not signals_to_close:
             logger.info("🧹 کوئی فعال فاریکس سگنل بند کرنے کے لیے نہیں ملا۔")
             return
 
         logger.info(f"🧹 {len(signals_to_close)} فعال فاریکس سگنلز کو بند کیا جا رہا ہے...")
-        closed_count = 0
-        for signal in signals_to_close:
-            signal_id_to_broadcast = signal.signal_id # ID کو پہلے محفوظ کریں
-            
-            success = crud.close_and_archive_signal(
+        # تمام سگنلز ایک ہی ٹرانزیکشن میں، ہر ایک اپنی انٹری قیمت پر بند ہوں گے
+        async with AsyncSessionLocal() as db:
+            closed_ids = await async_crud.bulk_close_and_archive_signals(
                 db=db,
-                signal_id=signal.signal_id,
+                signal_ids=[signal.signal_id for signal in signals_to_close],
                 outcome="weekend_close",
-                close_price=signal.entry_price,
                 reason_for_closure="Market closed for the weekend"
             )
-            if success:
-                closed_count += 1
-                # فرنٹ اینڈ کو اطلاع دیں
-                logger.info(f"📡 کلائنٹس کو سگنل {signal_id_to_broadcast} کے بند ہونے کی اطلاع دی جا رہی ہے...")
-                await manager.broadcast({"type": "signal_closed", "data": {"signal_id": signal_id_to_broadcast}})
-        
-        logger.info(f"🧹 {closed_count} فاریکس سگنلز کامیابی سے بند ہو گئے۔")
+        if closed_ids:
+            # فرنٹ اینڈ کو ایک ہی پیغام میں اطلاع دیں
+            logger.info(f"📡 کلائنٹس کو {len(closed_ids)} سگنلز کے بند ہونے کی اطلاع دی جا رہی ہے...")
+            symbol_by_id = {signal.signal_id: signal.symbol for signal in signals_to_close}
+            await manager.broadcast({"type": "signals_closed", "data": {
+                "signal_ids": closed_ids, "symbols": [symbol_by_id[signal_id] for signal_id in closed_ids],
+            }})
+            async with AsyncSessionLocal() as db:
+                await announce_closed_trades(db, closed_ids)
+
+        logger.info(f"🧹 {len(closed_ids or [])} فاریکس سگنلز کامیابی سے بند ہو گئے۔")
 
     except Exception as e:
         logger.error(f"🧹 ہفتے کے آخر کی صفائی میں خرابی: {e}", exc_info=True)
+
+# صرف لیڈر ورکر پر چلنے والی جابز (پوری تنصیب میں ایک ہی بار)
+LEADER_JOB_IDS = (
+    "guardian_engine_job", "hunter_engine_job", "news_engine_job",
+    "learning_compaction_job", "cleanup_weekend_signals", "webhook_retry_job",
+)
+
+def _add_leader_jobs(scheduler: AsyncIOScheduler):
+    # نگران جاب بار بار جاگتی ہے؛ کون سا سگنل کب جانچنا ہے یہ guardian_scheduler طے کرتا ہے
+    scheduler.add_job(check_active_signals_job, IntervalTrigger(seconds=guardian_settings.TICK_SECONDS), id="guardian_engine_job", coalesce=True)
+    scheduler.add_job(hunt_for_signals_job, IntervalTrigger(seconds=180), id="hunter_engine_job")
+    scheduler.add_job(update_economic_calendar_cache, IntervalTrigger(hours=4), id="news_engine_job", next_run_time=datetime.utcnow())
+    scheduler.add_job(learning_store.compact, CronTrigger(hour=0, minute=30, timezone='UTC'), id="learning_compaction_job")
+    # ڈیٹا بیس میں رکی ناکام/مؤخر webhook ترسیلات
+    scheduler.add_job(webhook_dispatcher.retry_due, IntervalTrigger(seconds=webhook_settings.RETRY_POLL_SECONDS), id="webhook_retry_job", coalesce=True)
+    
+    # ہر جمعہ کو 21:05 UTC پر چلے گا
+    scheduler.add_job(cleanup_weekend_signals, CronTrigger(day_of_week='fri', hour=21, minute=5, timezone='UTC'), id="cleanup_weekend_signals")
+
+def _load_leader_state():
+    """لیڈر بننے پر: پیروکار کی حالت ایونٹس سے بنی تھی، اس لیے جابز سے پہلے ڈیٹا بیس سے تازہ کریں۔"""
+    db = SessionLocal()
+    try:
+        registry.rebuild(db)
+        news_index.load(db)
+        crud.backfill_trade_stats_rollup(db)
     finally:
         db.close()
+    learning_store.reconcile_with_trades()
+
+async def on_elected_leader():
+    await asyncio.to_thread(_load_leader_state)
+    _add_leader_jobs(app.state.scheduler)
+    logger.info("★★★ لیڈر کی جابز شیڈیول ہو گئیں۔ ★★★")
+
+async def on_lost_leadership():
+    scheduler = app.state.scheduler
+    for job_id in LEADER_JOB_IDS:
+        if scheduler.get_job(job_id):
+            scheduler.remove_job(job_id)
 
 async def start_background_tasks():
-    """شیڈیولر کو شروع کرتا ہے جو پس منظر کے کاموں کو چلاتا ہے۔"""
+    """
+    شیڈیولر کو شروع کرتا ہے جو پس منظر کے کاموں کو چلاتا ہے۔ رجسٹری کی جانچ ہر ورکر پر چلتی ہے؛
+    باقی جابز صرف لیڈر ورکر پر (leader_election)۔
+    """
     if hasattr(app.state, "scheduler") and app.state.scheduler.running:
         logger.info("شیڈیولر پہلے سے چل رہا ہے۔")
         return
@@ -113,16 +160,40 @@ async def start_background_tasks():
     logger.info(">>> پس منظر کے کام شروع ہو رہے ہیں...")
     scheduler = AsyncIOScheduler(timezone="UTC")
     app.state.scheduler = scheduler
-    
-    scheduler.add_job(check_active_signals_job, IntervalTrigger(seconds=120), id="guardian_engine_job")
-    scheduler.add_job(hunt_for_signals_job, IntervalTrigger(seconds=180), id="hunter_engine_job")
-    scheduler.add_job(update_economic_calendar_cache, IntervalTrigger(hours=4), id="news_engine_job", next_run_time=datetime.utcnow())
-    
-    # ہر جمعہ کو 21:05 UTC پر چلے گا
-    scheduler.add_job(cleanup_weekend_signals, CronTrigger(day_of_week='fri', hour=21, minute=5, timezone='UTC'), id="cleanup_weekend_signals")
-    
+    scheduler.add_job(verify_registry_job, IntervalTrigger(minutes=10), id="registry_invariant_job")
     scheduler.start()
     logger.info("★★★ شیڈیولر کامیابی سے شروع ہو گیا۔ ★★★")
+    await leader.start(on_elected=on_elected_leader, on_lost=on_lost_leadership)
+
+WEBHOOKS_CHANGED_TYPE = "webhooks_changed"
+
+async def on_bus_event(message: dict, remote: bool):
+    """
+    ایونٹ بس کا ہینڈلر: دوسرے ورکر کے سگنل ایونٹس مقامی رجسٹری پر لاگو، پھر اس ورکر کے کلائنٹس تک۔
+    webhooks صرف شائع کرنے والا ورکر بھیجتا ہے، تاکہ ہر ایونٹ ہر سبسکرائبر کو ایک ہی بار پہنچے۔
+    """
+    if message.get("type") == WEBHOOKS_CHANGED_TYPE:
+        await webhook_dispatcher.refresh()
+        return
+    if remote:
+        registry.apply_event(message)
+    else:
+        webhook_dispatcher.publish(message)
+    await manager.deliver(message)
+
+def _rebuild_registry_sync():
+    db = SessionLocal()
+    try:
+        registry.rebuild(db)
+    finally:
+        db.close()
+
+async def resync_after_bus_outage():
+    """بس منقطع رہنے کے دوران کے ایونٹس ضائع ہوئے: رجسٹری ڈیٹا بیس سے اور جوابی کیش خالی۔"""
+    await asyncio.to_thread(_rebuild_registry_sync)
+    for endpoint in ENDPOINT_MAX_AGE:
+        response_cache.invalidate(endpoint)
+    await webhook_dispatcher.refresh()
 
 # --- FastAPI ایونٹس ---
 @app.on_event("startup")
@@ -131,6 +202,19 @@ async def startup_event():
     logger.info(f"{app_settings.PROJECT_NAME} سرور شروع ہو رہا ہے...")
     create_db_and_tables()
     logger.info("ڈیٹا بیس کی حالت کی تصدیق ہو گئی۔")
+    db = SessionLocal()
+    try:
+        registry.rebuild(db)
+        news_index.load(db)
+    finally:
+        db.close()
+    await learning_store.start()
+    await telegram_dispatcher.start()
+    await webhook_dispatcher.start()
+    await webhook_dispatcher.refresh()
+    await asyncio.to_thread(outcome_stats.seed_from_learning_log)
+    await event_bus.start(on_bus_event, on_resync=resync_after_bus_outage)
+    manager.bus = event_bus
     asyncio.create_task(start_background_tasks())
 
 @app.on_event("shutdown")
@@ -140,38 +224,120 @@ async def shutdown_event():
     if hasattr(app.state, "scheduler") and app.state.scheduler.running:
         app.state.scheduler.shutdown()
         logger.info("شیڈیولر کامیابی سے بند ہو گیا۔")
+    await leader.stop()
+    manager.bus = None
+    await event_bus.stop()
+    await telegram_dispatcher.stop()
+    await webhook_dispatcher.stop()
+    await learning_store.stop()
+    await async_engine.dispose()
 
 # --- API روٹس ---
+# جوابی کیش کی سیریلائزیشن انہی ماڈلز کے مطابق، ہر تعمیر پر ایک بار
+_ACTIVE_SIGNALS_ADAPTER = TypeAdapter(List[ActiveSignalResponse])
+_DAILY_STATS_ADAPTER = TypeAdapter(DailyStatsResponse)
+_STATS_ADAPTER = TypeAdapter(StatsResponse)
+_NEWS_ADAPTER = TypeAdapter(Optional[NewsResponse])
+
+def _to_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """ڈیٹا بیس کے کالمز naive UTC ہیں؛ ٹائم زون والی قدر کو UTC میں بدل کر naive بناتا ہے۔"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
 @app.get("/health", status_code=200, tags=["System"])
 async def health_check():
     """سرور کی صحت کی جانچ کے لیے ایک سادہ اینڈ پوائنٹ۔"""
     return {"status": "ok"}
 
 @app.get("/api/active-signals", response_model=List[ActiveSignalResponse], tags=["Signals"])
-async def get_active_signals(db: Session = Depends(get_db)):
-    """تمام فعال ٹریڈنگ سگنلز کی فہرست واپس کرتا ہے۔"""
-    signals = crud.get_all_active_signals_from_db(db)
-    return signals
+async def get_active_signals(request: Request):
+    """تمام فعال ٹریڈنگ سگنلز کی فہرست (میموری میں موجود رجسٹری سے) واپس کرتا ہے۔"""
+    async def build():
+        return [signal._asdict() for signal in registry.all()], {}
+    entry = await response_cache.get_or_build("active-signals", None, build, _ACTIVE_SIGNALS_ADAPTER)
+    return response_cache.respond(request, entry)
 
 @app.get("/api/daily-stats", response_model=DailyStatsResponse, tags=["Stats"])
-async def get_daily_stats_endpoint(db: Session = Depends(get_db)):
+async def get_daily_stats_endpoint(request: Request):
     """آج کے اعداد و شمار (TP/SL ہٹس، ون ریٹ) واپس کرتا ہے۔"""
-    stats = crud.get_daily_stats(db)
-    return stats
+    # کیش کی تعمیر اپنے ٹاسک میں، اپنے سیشن کے ساتھ (درخواست منسوخ ہو تو بھی باقی انتظار کرنے والوں کو جواب ملے)
+    async def build():
+        async with AsyncSessionLocal() as db:
+            return await async_crud.get_daily_stats(db), {}
+    # کلید میں آج کی تاریخ تاکہ دن بدلتے ہی پچھلے دن کا جواب استعمال نہ ہو
+    entry = await response_cache.get_or_build("daily-stats", datetime.utcnow().date(), build, _DAILY_STATS_ADAPTER)
+    return response_cache.respond(request, entry)
+
+@app.get("/api/stats", response_model=StatsResponse, tags=["Stats"])
+async def get_stats_endpoint(
+    request: Request,
+    start: Optional[datetime] = Query(None, description="آغاز (UTC)؛ ڈیفالٹ: آج کا آغاز"),
+    end: Optional[datetime] = Query(None, description="اختتام (UTC، خارج)؛ ڈیفالٹ: ابھی"),
+    symbol: Optional[str] = Query(None, description="صرف ایک علامت، مثلاً EUR/USD"),
+):
+    """کسی بھی وقت کی حد کے کل اور فی علامت اعداد و شمار (TP/SL، دیگر بندشیں، ون ریٹ)، گھنٹہ وار خلاصے سے۔"""
+    default_start, default_end = crud.today_range()
+    start, end = _to_naive_utc(start) or default_start, _to_naive_utc(end) or default_end
+    if start >= end:
+        raise HTTPException(status_code=400, detail="'start' کو 'end' سے پہلے ہونا چاہیے۔")
+    # خلاصہ گھنٹہ وار ہے، اس لیے حد کو پورے گھنٹوں پر لانے سے نتیجہ نہیں بدلتا اور کیش کی کلیدیں کم رہتی ہیں
+    start = crud._hour_bucket(start)
+    if end != crud._hour_bucket(end):
+        end = crud._hour_bucket(end) + timedelta(hours=1)
+
+    async def build():
+        async with AsyncSessionLocal() as db:
+            stats = await async_crud.get_stats(db, start, end, symbol)
+        if stats is None:
+            raise HTTPException(status_code=503, detail="اعداد و شمار فی الحال دستیاب نہیں۔")
+        return stats, {}
+    entry = await response_cache.get_or_build("stats", (start, end, symbol), build, _STATS_ADAPTER)
+    return response_cache.respond(request, entry)
 
 @app.get("/api/history", response_model=List[HistoryResponse], tags=["Stats"])
-async def get_history(db: Session = Depends(get_db)):
-    """مکمل شدہ ٹریڈز کی تاریخ واپس کرتا ہے۔"""
-    trades = crud.get_completed_trades(db)
-    return trades
+async def get_history(
+    request: Request,
+    limit: int = Query(100, ge=1, le=crud.MAX_HISTORY_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="پچھلے جواب کے X-Next-Cursor ہیڈر سے"),
+    symbol: Optional[str] = Query(None),
+    outcome: Optional[str] = Query(None, description="مثلاً tp_hit، sl_hit"),
+    start: Optional[datetime] = Query(None, description="closed_at >= start (UTC)"),
+    end: Optional[datetime] = Query(None, description="closed_at < end (UTC)"),
+    fields: Optional[str] = Query(None, description="کوما سے الگ فیلڈز، مثلاً symbol,outcome,closed_at"),
+):
+    """
+    مکمل شدہ ٹریڈز کی تاریخ (تازہ ترین پہلے)، keyset صفحہ بندی کے ساتھ۔
+    اگلا صفحہ ہو تو اس کا کرسر X-Next-Cursor ہیڈر میں واپس آتا ہے؛ جواب خود ٹریڈز کی فہرست ہی رہتا ہے۔
+    """
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    start, end = _to_naive_utc(start), _to_naive_utc(end)
+
+    async def build():
+        try:
+            async with AsyncSessionLocal() as db:
+                page = await async_crud.get_completed_trades_page(
+                    db, limit=limit, cursor=cursor, symbol=symbol, outcome=outcome,
+                    start=start, end=end, fields=field_list,
+                )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        headers = {"X-Next-Cursor": page.next_cursor} if page.next_cursor else {}
+        return page.trades, headers
+    # فیلڈ کے انتخاب کی وجہ سے جواب ماڈل کے بغیر سیریلائز ہوتا ہے (response_model صرف دستاویزات کے لیے)
+    key = (limit, cursor, symbol, outcome, start, end, tuple(field_list) if field_list else None)
+    entry = await response_cache.get_or_build("history", key, build)
+    return response_cache.respond(request, entry)
 
 @app.get("/api/news", response_model=Optional[NewsResponse], tags=["Market Data"])
-async def get_news(db: Session = Depends(get_db)):
-    """کیش شدہ مارکیٹ کی خبریں واپس کرتا ہے۔"""
-    news_content = crud.get_cached_news(db)
-    if news_content and "articles_by_symbol" in news_content:
-        return {"articles_by_symbol": news_content["articles_by_symbol"]}
-    return None
+async def get_news(request: Request):
+    """تازہ ترین مارکیٹ کی خبریں، علامت کے لحاظ سے گروپ شدہ، واپس کرتا ہے۔"""
+    async def build():
+        async with AsyncSessionLocal() as db:
+            articles_by_symbol = await async_crud.get_recent_news_by_symbol(db, news_settings.API_ARTICLE_LIMIT)
+        return ({"articles_by_symbol": articles_by_symbol} if articles_by_symbol else None), {}
+    entry = await response_cache.get_or_build("news", None, build, _NEWS_ADAPTER)
+    return response_cache.respond(request, entry)
 
 @app.get("/api/system-status", response_model=SystemStatusResponse, tags=["System"])
 async def get_system_status():
@@ -180,7 +346,8 @@ async def get_system_status():
     scheduler_running = hasattr(app.state, "scheduler") and app.state.scheduler.running
     db_status = "Disconnected"
     try:
-        with engine.connect():
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
             db_status = "Connected"
     except Exception:
         db_status = "Connection Error"
@@ -193,15 +360,130 @@ async def get_system_status():
         "key_status": key_manager.get_key_status()
     }
 
+@app.get("/api/guardian-schedule", tags=["System"])
+async def get_guardian_schedule():
+    """نگران انجن کا موجودہ شیڈول: ہر سگنل کا ATR فاصلہ، جانچ کا وقفہ اور متوقع تاخیر۔"""
+    return guardian_scheduler.get_status()
+
+@app.get("/api/outcome-stats", tags=["Stats"])
+async def get_outcome_stats():
+    """ہر (symbol, grade, regime, strategy_type) کی کمزور شدہ جیت کی شرح اور متوقع R، جو اعتماد کی انشانکن میں استعمال ہوتی ہے۔"""
+    return outcome_stats.get_summary()
+
+@app.get("/api/websocket-status", tags=["System"])
+async def get_websocket_status():
+    """ہر WebSocket کلائنٹ کی قطار، گرائے/ضم کیے گئے پیغامات اور تاخیر (lag) کی پیمائش۔"""
+    return manager.get_metrics()
+
 # --- WebSocket ---
+async def build_live_snapshot():
+    """دوبارہ جڑنے والے کلائنٹس کے لیے مکمل حالت: فعال سگنلز اور آج کے اعداد و شمار۔"""
+    async with AsyncSessionLocal() as db:
+        daily_stats = await async_crud.get_daily_stats(db)
+    return {
+        "active_signals": _ACTIVE_SIGNALS_ADAPTER.dump_python(
+            _ACTIVE_SIGNALS_ADAPTER.validate_python([signal._asdict() for signal in registry.all()]), mode="json"
+        ),
+        "daily_stats": _DAILY_STATS_ADAPTER.dump_python(daily_stats, mode="json"),
+    }
+
+manager.snapshot_provider = build_live_snapshot
+
+@app.get("/api/telegram-status", tags=["System"])
+async def get_telegram_status():
+    """ٹیلیگرام ڈسپیچر: قطار کی گہرائی، بھیجے/گرائے/ناکام الرٹس، دوبارہ کوششیں اور ترسیل کی تاخیر۔"""
+    return telegram_dispatcher.get_metrics()
+
+def require_webhook_admin(x_admin_token: Optional[str] = Header(None)):
+    """/api/webhooks کے اینڈ پوائنٹس صرف WEBHOOK_ADMIN_TOKEN والے X-Admin-Token ہیڈر کے ساتھ۔"""
+    expected = api_settings.WEBHOOK_ADMIN_TOKEN
+    if not expected:
+        raise HTTPException(status_code=503, detail="WEBHOOK_ADMIN_TOKEN سیٹ نہیں؛ webhook کا انتظام بند ہے۔")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token.encode("utf-8"), expected.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="X-Admin-Token غلط یا موجود نہیں۔")
+
+@app.post("/api/webhooks", response_model=WebhookCreatedResponse, status_code=201, tags=["Webhooks"], dependencies=[Depends(require_webhook_admin)])
+async def create_webhook(request: WebhookCreateRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    نئی webhook سبسکرپشن۔ ہر ترسیل کا دستخط X-Webhook-Signature ہیڈر میں ہوتا ہے:
+    "sha256=" + HMAC-SHA256(secret, X-Webhook-Timestamp + "." + body)۔
+    url کا host عوامی پتے پر ہونا چاہیے (نجی، loopback اور link-local پتے رد)۔
+    """
+    if not request.url.startswith(("http://", "https://")):
+        raise HTTPException(status_code=400, detail="url کو http:// یا https:// سے شروع ہونا چاہیے۔")
+    if not webhook_settings.ALLOW_PRIVATE_URLS:
+        rejection = await check_webhook_url(request.url)
+        if rejection:
+            raise HTTPException(status_code=400, detail=rejection)
+    unknown = set(request.event_types or ()) - set(WEBHOOK_EVENT_TYPES)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"نامعلوم event_types: {', '.join(sorted(unknown))}۔ دستیاب: {', '.join(WEBHOOK_EVENT_TYPES)}")
+    secret = request.secret or secrets.token_hex(32)
+    symbols = sorted({symbol.strip().upper() for symbol in request.symbols or () if symbol.strip()}) or None
+    subscription = await async_crud.create_webhook_subscription(
+        db, request.url, secret, symbols, request.event_types or None, request.max_concurrency,
+    )
+    if subscription is None:
+        raise HTTPException(status_code=503, detail="سبسکرپشن محفوظ نہیں ہو سکی۔")
+    # تمام ورکرز کے ڈسپیچرز تازہ فہرست لوڈ کریں
+    await event_bus.publish({"type": WEBHOOKS_CHANGED_TYPE})
+    return WebhookCreatedResponse.model_validate(subscription, from_attributes=True)
+
+@app.get("/api/webhooks", response_model=List[WebhookResponse], tags=["Webhooks"], dependencies=[Depends(require_webhook_admin)])
+async def list_webhooks(db: AsyncSession = Depends(get_async_db)):
+    """تمام webhook سبسکرپشنز (secret کے بغیر)۔"""
+    subscriptions = await async_crud.get_webhook_subscriptions(db, active_only=False)
+    if subscriptions is None:
+        raise HTTPException(status_code=503, detail="سبسکرپشنز فی الحال دستیاب نہیں۔")
+    return [WebhookResponse.model_validate(subscription, from_attributes=True) for subscription in subscriptions]
+
+@app.delete("/api/webhooks/{subscription_id}", status_code=204, tags=["Webhooks"], dependencies=[Depends(require_webhook_admin)])
+async def delete_webhook(subscription_id: int, db: AsyncSession = Depends(get_async_db)):
+    """سبسکرپشن اور اس کی زیرِ التوا ترسیلات حذف کرتا ہے۔"""
+    if not await async_crud.delete_webhook_subscription(db, subscription_id):
+        raise HTTPException(status_code=404, detail="سبسکرپشن نہیں ملی۔")
+    await event_bus.publish({"type": WEBHOOKS_CHANGED_TYPE})
+
+@app.get("/api/webhooks/deliveries", response_model=List[WebhookDeliveryResponse], tags=["Webhooks"], dependencies=[Depends(require_webhook_admin)])
+async def list_webhook_deliveries(
+    status: str = Query("dead", pattern="^(pending|dead)$", description="'dead' (dead-letter) یا 'pending' (دوبارہ کوشش کی منتظر)"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """ناکام webhook ترسیلات: dead-letter یا دوبارہ کوشش کی منتظر۔"""
+    deliveries = await async_crud.get_webhook_deliveries(db, status, limit)
+    if deliveries is None:
+        raise HTTPException(status_code=503, detail="ترسیلات فی الحال دستیاب نہیں۔")
+    return [WebhookDeliveryResponse.model_validate(delivery, from_attributes=True) for delivery in deliveries]
+
+@app.post("/api/webhooks/deliveries/{delivery_id}/retry", status_code=202, tags=["Webhooks"], dependencies=[Depends(require_webhook_admin)])
+async def retry_webhook_delivery(delivery_id: int, db: AsyncSession = Depends(get_async_db)):
+    """dead-letter ترسیل دوبارہ قطار میں؛ لیڈر کی اگلی retry جاب اسے بھیجے گی۔"""
+    if not await async_crud.requeue_webhook_delivery(db, delivery_id):
+        raise HTTPException(status_code=404, detail="dead-letter ترسیل نہیں ملی۔")
+    return {"status": "queued", "id": delivery_id}
+
+@app.get("/api/webhook-status", tags=["System"])
+async def get_webhook_status():
+    """webhook ڈسپیچر (اس ورکر کا): قطار، ترسیلات، ناکامیاں، کھلے سرکٹ اور ترسیل کی تاخیر۔"""
+    return webhook_dispatcher.get_metrics()
+
+@app.get("/api/cluster-status", tags=["System"])
+async def get_cluster_status():
+    """یہ ورکر لیڈر ہے یا نہیں، اور ایونٹ بس کی حالت۔"""
+    return {"leader": leader.get_status(), "event_bus": event_bus.get_status()}
+
 @app.websocket("/ws/live-signals")
 async def websocket_endpoint(websocket: WebSocket):
     """لائیو سگنل اپ ڈیٹس کے لیے WebSocket کنکشن کو ہینڈل کرتا ہے۔"""
     await manager.connect(websocket)
     try:
         while True:
-            await websocket.receive_text()
-    except WebSocketDisconnect:
+            await manager.handle_client_message(websocket, await websocket.receive_text())
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: سست کلائنٹ کے طور پر مینیجر نے ساکٹ پہلے ہی بند کر دیا
+        pass
+    finally:
         manager.disconnect(websocket)
 
 # --- اسٹیٹک فائلز ---
@@ -0,0 +1,371 @@
+# filename: async_crud.py
+
+"""
+database_crud کا غیر مطابقت پذیر (async) ہم شکل۔
+
+ہر gunicorn ورکر کے API اینڈ پوائنٹس، WebSockets اور (لیڈر ورکر میں) پس منظر کی جابز اسی ورکر کے ایک ایونٹ
+لوپ پر چلتی ہیں، اس لیے یہاں ہر کوئری await کی جاتی ہے تاکہ اس ورکر کے WebSockets اور شیڈولر رکیں نہیں۔ SQL بیانات database_crud کے ساتھ مشترک ہیں۔
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# مقامی امپورٹس
+from database_crud import (HISTORY_FIELDS, MAX_HISTORY_PAGE_SIZE, HistoryPage, SignalUpdateResult,
+                           _archive_rollup_counts, _build_archive_statements, _build_high_impact_events_statement,
+                           _build_high_impact_news_statement, _build_history_page,
+                           _build_history_statement, _build_news_by_symbol, _build_news_prune_statements,
+                           _build_news_upsert_statements, _build_recent_news_statement,
+                           _build_rollup_upsert, _build_stats_response, _build_stats_statement,
+                           _build_trades_for_signals_statement, _daily_stats_from, _history_trade,
+                           _new_active_signal, today_range)
+from models import ActiveSignal, AsyncSessionLocal, CompletedTrade, WebhookDelivery, WebhookSubscription
+from schemas import DailyStatsResponse, StatsResponse
+from signal_registry import registry
+
+logger = logging.getLogger(__name__)
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """FastAPI انحصار: async ڈیٹا بیس سیشن۔"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_all_active_signals_from_db(db: AsyncSession) -> List[ActiveSignal]:
+    """ڈیٹا بیس سے تمام فعال سگنلز حاصل کرتا ہے۔"""
+    try:
+        return list((await db.execute(select(ActiveSignal))).scalars().all())
+    except SQLAlchemyError as e:
+        logger.error(f"تمام فعال سگنلز حاصل کرنے میں ڈیٹا بیس کی خرابی: {e}", exc_info=True)
+        return []
+
+async def get_active_signal_by_symbol(db: AsyncSession, symbol: str) -> Optional[ActiveSignal]:
+    """علامت کی بنیاد پر ایک فعال سگنل حاصل کرتا ہے۔"""
+    try:
+        return (await db.execute(select(ActiveSignal).where(ActiveSignal.symbol == symbol).limit(1))).scalars().first()
+    except SQLAlchemyError as e:
+        logger.error(f"علامت '{symbol}' کے لیے فعال سگنل حاصل کرنے میں خرابی: {e}", exc_info=True)
+        return None
+
+async def add_or_update_active_signal(db: AsyncSession, signal_data: Dict[str, Any]) -> Optional[SignalUpdateResult]:
+    """ڈیٹا بیس میں ایک فعال سگنل کو شامل یا اپ ڈیٹ کرتا ہے۔"""
+    symbol = signal_data.get("symbol")
+    if not symbol:
+        logger.error("سگنل ڈیٹا میں 'symbol' غائب ہے۔ سگنل شامل نہیں کیا جا سکتا۔")
+        return None
+
+    try:
+        # رجسٹری مستند ہے؛ صرف اپ ڈیٹ کی صورت میں ڈیٹا بیس سے قطار لی جاتی ہے
+        if registry.is_loaded:
+            cached = registry.get_by_symbol(symbol)
+            existing_signal = (
+                (await db.execute(select(ActiveSignal).where(ActiveSignal.signal_id == cached.signal_id))).scalars().first()
+                if cached else None
+            )
+        else:
+            existing_signal = await get_active_signal_by_symbol(db, symbol)
+
+        if existing_signal:
+            logger.info(f"موجودہ سگنل {symbol} کو اپ ڈیٹ کیا جا رہا ہے۔")
+            for key, value in signal_data.items():
+                setattr(existing_signal, key, value)
+            existing_signal.is_new = True # ہر اپ ڈیٹ پر اسے نیا سمجھیں تاکہ گریس پیریڈ ملے
+
+            await db.commit()
+            await db.refresh(existing_signal)
+            registry.upsert(existing_signal)
+            return SignalUpdateResult(signal=existing_signal, is_new=False)
+
+        logger.info(f"نیا سگنل {symbol} بنایا جا رہا ہے۔")
+        new_signal = _new_active_signal(symbol, signal_data)
+        db.add(new_signal)
+        await db.commit()
+        await db.refresh(new_signal)
+        registry.upsert(new_signal)
+        return SignalUpdateResult(signal=new_signal, is_new=True)
+
+    except IntegrityError as e:
+        logger.error(f"ڈیٹا بیس میں سالمیت کی خلاف ورزی: {e}", exc_info=True)
+        await db.rollback()
+        return None
+    except SQLAlchemyError as e:
+        logger.error(f"فعال سگنل شامل/اپ ڈیٹ کرنے میں ڈیٹا بیس کی خرابی: {e}", exc_info=True)
+        await db.rollback()
+        return None
+
+async def bulk_close_and_archive_signals(
+    db: AsyncSession,
+    signal_ids: List[str],
+    outcome: str,
+    reason_for_closure: str,
+    close_price: Optional[float] = None
+) -> Optional[List[str]]:
+    """
+    کئی سگنلز کو ایک ہی اٹامک ٹرانزیکشن میں بند اور آرکائیو کرتا ہے۔
+    Returns: بند ہونے والے signal_id کی فہرست، یا خرابی کی صورت میں None۔
+    """
+    if not signal_ids:
+        return []
+
+    logger.info(f"{len(signal_ids)} سگنلز کو ایک ٹرانزیکشن میں بند اور آرکائیو کیا جا رہا ہے۔ نتیجہ: {outcome}")
+    try:
+        closed_at = datetime.utcnow()
+        result = None
+        for statement in _build_archive_statements(signal_ids, outcome, reason_for_closure, close_price, closed_at):
+            result = await db.execute(statement)
+        closed_rows = result.all()
+        closed_ids = [row.signal_id for row in closed_rows]
+        # گھنٹہ وار خلاصہ اسی ٹرانزیکشن میں اپ ڈیٹ ہوتا ہے
+        if closed_rows:
+            await db.execute(_build_rollup_upsert(_archive_rollup_counts(closed_rows, outcome, closed_at)))
+        await db.commit()
+        registry.remove(signal_ids)
+
+        missing = set(signal_ids) - set(closed_ids)
+        if missing:
+            logger.warning(f"بند کرنے کے لیے {len(missing)} فعال سگنلز نہیں ملے۔ شاید یہ پہلے ہی بند ہو چکے ہیں۔")
+        logger.info(f"{len(closed_ids)} سگنلز کامیابی سے ہسٹری میں منتقل ہو گئے۔")
+        return closed_ids
+
+    except SQLAlchemyError as e:
+        logger.error(f"سگنلز کو اجتماعی طور پر آرکائیو کرنے میں ڈیٹا بیس کی سنگین خرابی: {e}", exc_info=True)
+        await db.rollback()
+        return None
+
+async def close_and_archive_signal(db: AsyncSession, signal_id: str, outcome: str, close_price: float, reason_for_closure: str) -> bool:
+    """
+    ایک سگنل کو ایک محفوظ، اٹامک ٹرانزیکشن میں بند اور آرکائیو کرتا ہے۔
+    اگر سگنل موجود نہ ہو (پہلے ہی بند ہو چکا ہو) تو بھی کامیاب مانا جاتا ہے۔
+    """
+    closed_ids = await bulk_close_and_archive_signals(db, [signal_id], outcome, reason_for_closure, close_price)
+    return closed_ids is not None
+
+async def get_completed_trades_page(
+    db: AsyncSession, limit: int = 100, cursor: Optional[str] = None, symbol: Optional[str] = None,
+    outcome: Optional[str] = None, start: Optional[datetime] = None, end: Optional[datetime] = None,
+    fields: Optional[List[str]] = None,
+) -> HistoryPage:
+    """
+    مکمل شدہ ٹریڈز کا ایک keyset صفحہ (تازہ ترین پہلے)، فلٹرز اور فیلڈ کے انتخاب کے ساتھ۔
+    غلط کرسر یا فیلڈ پر ValueError۔
+    """
+    limit = max(1, min(limit, MAX_HISTORY_PAGE_SIZE))
+    statement = _build_history_statement(limit, cursor, symbol, outcome, start, end, fields)
+    try:
+        return _build_history_page((await db.execute(statement)).all(), limit, fields)
+    except SQLAlchemyError as e:
+        logger.error(f"مکمل شدہ ٹریڈز حاصل کرنے میں خرابی: {e}", exc_info=True)
+        return HistoryPage(trades=[], next_cursor=None)
+
+async def get_completed_trades(db: AsyncSession, limit: int = 100) -> List[Dict[str, Any]]:
+    """مکمل شدہ ٹریڈز کی تاریخ حاصل کرتا ہے (تازہ ترین صفحہ)۔"""
+    return (await get_completed_trades_page(db, limit=limit)).trades
+
+async def get_completed_trades_for_signals(db: AsyncSession, signal_ids: List[str]) -> List[Dict[str, Any]]:
+    """دیے گئے سگنلز کے مکمل شدہ ٹریڈز، /api/history والی شکل میں۔"""
+    if not signal_ids:
+        return []
+    try:
+        rows = (await db.execute(_build_trades_for_signals_statement(signal_ids))).all()
+    except SQLAlchemyError as e:
+        logger.error(f"بند شدہ ٹریڈز حاصل کرنے میں خرابی: {e}", exc_info=True)
+        return []
+    return [_history_trade(row, HISTORY_FIELDS) for row in rows]
+
+async def get_stats(db: AsyncSession, start: datetime, end: datetime, symbol: Optional[str] = None) -> Optional[StatsResponse]:
+    """کسی بھی وقت کی حد کے لیے کل اور فی علامت اعداد و شمار (گھنٹہ وار خلاصے سے)۔"""
+    try:
+        rows = (await db.execute(_build_stats_statement(start, end, symbol))).all()
+        return _build_stats_response(rows, start, end)
+    except SQLAlchemyError as e:
+        logger.error(f"اعداد و شمار حاصل کرنے میں خرابی: {e}", exc_info=True)
+        return None
+
+async def get_daily_stats(db: AsyncSession) -> DailyStatsResponse:
+    """روزانہ کے اعداد و شمار حاصل کرتا ہے۔"""
+    stats = await get_stats(db, *today_range())
+    if stats is None:
+        return DailyStatsResponse(tp_hits_today=0, sl_hits_today=0, live_signals=0, win_rate_today=0)
+    if registry.is_loaded:
+        live_signals = registry.count()
+    else:
+        try:
+            live_signals = (await db.execute(select(func.count(ActiveSignal.id)))).scalar() or 0
+        except SQLAlchemyError as e:
+            logger.error(f"فعال سگنلز گننے میں خرابی: {e}", exc_info=True)
+            live_signals = 0
+    return _daily_stats_from(stats, live_signals)
+
+async def upsert_news_articles(db: AsyncSession, articles: List[Dict[str, Any]], retention_days: int) -> bool:
+    """خبروں کو محفوظ کرتا ہے اور retention_days سے پرانی خبریں اسی ٹرانزیکشن میں حذف کرتا ہے۔"""
+    if not articles:
+        return True
+    try:
+        for statement in _build_news_upsert_statements(articles):
+            await db.execute(statement)
+        for statement in _build_news_prune_statements(datetime.utcnow() - timedelta(days=retention_days)):
+            await db.execute(statement)
+        await db.commit()
+        return True
+    except SQLAlchemyError as e:
+        logger.error(f"خبریں محفوظ کرنے میں خرابی: {e}", exc_info=True)
+        await db.rollback()
+        return False
+
+async def find_high_impact_news(db: AsyncSession, symbols: List[str], start: datetime, end: datetime) -> Optional[str]:
+    """ان علامتوں کی [start, end] میں کوئی اعلیٰ اثر والی خبر ہو تو اس کا عنوان (بغیر عنوان کے '')، ورنہ None۔"""
+    try:
+        return (await db.execute(_build_high_impact_news_statement(symbols, start, end))).scalar()
+    except SQLAlchemyError as e:
+        logger.error(f"اعلیٰ اثر والی خبریں تلاش کرنے میں خرابی: {e}", exc_info=True)
+        return None
+
+async def get_high_impact_news_events(db: AsyncSession) -> Optional[List[Tuple[str, datetime, str]]]:
+    """news_index کے لیے تمام اعلیٰ اثر والی خبریں: (symbol, published_at, title)۔"""
+    try:
+        return [tuple(row) for row in (await db.execute(_build_high_impact_events_statement())).all()]
+    except SQLAlchemyError as e:
+        logger.error(f"اعلیٰ اثر والی خبریں بازیافت کرنے میں خرابی: {e}", exc_info=True)
+        return None
+
+async def get_recent_news_by_symbol(db: AsyncSession, limit: int) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+    """تازہ ترین خبریں، علامت کے لحاظ سے گروپ شدہ (/api/news کی ساخت میں)۔"""
+    try:
+        return _build_news_by_symbol((await db.execute(_build_recent_news_statement(limit))).all())
+    except SQLAlchemyError as e:
+        logger.error(f"خبریں بازیافت کرنے میں خرابی: {e}", exc_info=True)
+        return None
+
+async def get_recent_sl_hits(db: AsyncSession, minutes_ago: int) -> List[CompletedTrade]:
+    """حالیہ SL ہٹس حاصل کرتا ہے۔"""
+    try:
+        time_filter = datetime.utcnow() - timedelta(minutes=minutes_ago)
+        result = await db.execute(select(CompletedTrade).where(
+            CompletedTrade.outcome == 'sl_hit',
+            CompletedTrade.closed_at >= time_filter
+        ))
+        return list(result.scalars().all())
+    except SQLAlchemyError as e:
+        logger.error(f"حالیہ SL ہٹس حاصل کرنے میں خرابی: {e}", exc_info=True)
+        return []
+
+# --- webhook سبسکرپشنز اور ترسیل کی پائیدار قطار ---
+
+async def create_webhook_subscription(
+    db: AsyncSession, url: str, secret: str, symbols: Optional[List[str]],
+    event_types: Optional[List[str]], max_concurrency: int,
+) -> Optional[WebhookSubscription]:
+    """نئی webhook سبسکرپشن محفوظ کرتا ہے۔"""
+    try:
+        subscription = WebhookSubscription(
+            url=url, secret=secret, symbols=symbols, event_types=event_types, max_concurrency=max_concurrency,
+        )
+        db.add(subscription)
+        await db.commit()
+        await db.refresh(subscription)
+        return subscription
+    except SQLAlchemyError as e:
+        logger.error(f"webhook سبسکرپشن '{url}' محفوظ کرنے میں خرابی: {e}", exc_info=True)
+        await db.rollback()
+        return None
+
+async def get_webhook_subscriptions(db: AsyncSession, active_only: bool = True) -> Optional[List[WebhookSubscription]]:
+    """تمام (یا صرف فعال) webhook سبسکرپشنز۔"""
+    try:
+        statement = select(WebhookSubscription).order_by(WebhookSubscription.id)
+        if active_only:
+            statement = statement.where(WebhookSubscription.is_active.is_(True))
+        return list((await db.execute(statement)).scalars().all())
+    except SQLAlchemyError as e:
+        logger.error(f"webhook سبسکرپشنز حاصل کرنے میں خرابی: {e}", exc_info=True)
+        return None
+
+async def delete_webhook_subscription(db: AsyncSession, subscription_id: int) -> bool:
+    """سبسکرپشن اور اس کی زیرِ التوا/dead-letter ترسیلات حذف کرتا ہے۔"""
+    try:
+        # SQLite پر foreign key کا CASCADE نافذ نہیں ہوتا، اس لیے ترسیلات صراحتاً حذف
+        await db.execute(delete(WebhookDelivery).where(WebhookDelivery.subscription_id == subscription_id))
+        result = await db.execute(delete(WebhookSubscription).where(WebhookSubscription.id == subscription_id))
+        await db.commit()
+        return result.rowcount > 0
+    except SQLAlchemyError as e:
+        logger.error(f"webhook سبسکرپشن {subscription_id} حذف کرنے میں خرابی: {e}", exc_info=True)
+        await db.rollback()
+        return False
+
+async def save_webhook_deliveries(
+    db: AsyncSession, new_rows: List[Dict[str, Any]], updates: List[Dict[str, Any]], delivered_ids: List[int],
+) -> bool:
+    """
+    ڈسپیچر کی جمع شدہ تبدیلیاں ایک ٹرانزیکشن میں: نئی ناکام ترسیلات، موجودہ قطاروں کی نئی حالت (id سمیت)،
+    اور کامیابی سے پہنچ جانے والی قطاروں کا حذف۔
+    """
+    try:
+        if new_rows:
+            await db.execute(insert(WebhookDelivery), new_rows)
+        if updates:
+            await db.execute(update(WebhookDelivery), updates)
+        if delivered_ids:
+            await db.execute(delete(WebhookDelivery).where(WebhookDelivery.id.in_(delivered_ids)))
+        await db.commit()
+        return True
+    except SQLAlchemyError as e:
+        logger.error(f"webhook ترسیلات کی قطار محفوظ کرنے میں خرابی: {e}", exc_info=True)
+        await db.rollback()
+        return False
+
+async def claim_due_webhook_deliveries(db: AsyncSession, lease_seconds: float, limit: int) -> List[WebhookDelivery]:
+    """
+    واجب الادا 'pending' ترسیلات لیتا ہے اور ان کا next_attempt_at lease جتنا آگے کر دیتا ہے، تاکہ اگلا
+    پول انہیں دوبارہ نہ اٹھائے؛ پروسیس بیچ میں مر جائے تو lease ختم ہونے پر یہ خود دوبارہ واجب ہو جاتی ہیں۔
+    """
+    now = datetime.utcnow()
+    try:
+        rows = list((await db.execute(
+            select(WebhookDelivery)
+            .where(WebhookDelivery.status == "pending", WebhookDelivery.next_attempt_at <= now)
+            .order_by(WebhookDelivery.next_attempt_at)
+            .limit(limit)
+        )).scalars().all())
+        if rows:
+            await db.execute(
+                update(WebhookDelivery)
+                .where(WebhookDelivery.id.in_([row.id for row in rows]))
+                .values(next_attempt_at=now + timedelta(seconds=lease_seconds))
+            )
+            await db.commit()
+        return rows
+    except SQLAlchemyError as e:
+        logger.error(f"واجب webhook ترسیلات حاصل کرنے میں خرابی: {e}", exc_info=True)
+        await db.rollback()
+        return []
+
+async def get_webhook_deliveries(db: AsyncSession, status: str, limit: int = 100) -> Optional[List[WebhookDelivery]]:
+    """دی گئی حالت ('pending' یا 'dead') کی تازہ ترین ترسیلات۔"""
+    try:
+        return list((await db.execute(
+            select(WebhookDelivery).where(WebhookDelivery.status == status)
+            .order_by(WebhookDelivery.id.desc()).limit(limit)
+        )).scalars().all())
+    except SQLAlchemyError as e:
+        logger.error(f"webhook ترسیلات ({status}) حاصل کرنے میں خرابی: {e}", exc_info=True)
+        return None
+
+async def requeue_webhook_delivery(db: AsyncSession, delivery_id: int) -> bool:
+    """dead-letter ترسیل کو صفر کوششوں کے ساتھ فوراً دوبارہ قطار میں ڈالتا ہے۔"""
+    try:
+        result = await db.execute(
+            update(WebhookDelivery)
+            .where(WebhookDelivery.id == delivery_id, WebhookDelivery.status == "dead")
+            .values(status="pending", attempts=0, next_attempt_at=datetime.utcnow(), last_error=None)
+        )
+        await db.commit()
+        return result.rowcount > 0
+    except SQLAlchemyError as e:
+        logger.error(f"webhook ترسیل {delivery_id} دوبارہ قطار میں ڈالنے میں خرابی: {e}", exc_info=True)
+        await db.rollback()
+        return False
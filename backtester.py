@@ -0,0 +1,471 @@
+# filename: backtester.py
+
+"""
+ٹریڈنگ کمیٹی (run_trading_committee + find_realistic_tp_sl) کے لیے ویکٹرائزڈ، ملٹی کور بیک ٹیسٹنگ انجن۔
+
+ہر علامت کی پوری تاریخ پر انڈیکیٹرز ایک ہی بار NumPy/pandas میں حساب کیے جاتے ہیں، پھر ہر بار پر
+کمیٹی کا فیصلہ ویکٹر کی شکل میں نکالا جاتا ہے اور TP/SL کا تعین اگلی کینڈلز کے high/low سے ہوتا ہے۔
+کام علامتوں کی بنیاد پر مختلف پروسیسز میں تقسیم ہوتا ہے۔
+
+نوٹ: لائیو انجن صرف آخری CANDLE_COUNT کینڈلز پر EWM انڈیکیٹرز چلاتا ہے، جبکہ یہاں پوری تاریخ
+استعمال ہوتی ہے۔ ابتدائی وارم اپ کے بعد دونوں کے نتائج عملی طور پر یکساں رہتے ہیں۔
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import guardian_settings, strategy_settings, tech_settings
+from level_analyzer import resolve_intrabar_outcome
+
+logger = logging.getLogger(__name__)
+
+# --- مستقل اقدار ---
+PERSONALITIES_FILE = "asset_personalities.json"
+MIN_CANDLES_FOR_SIGNAL = 34  # fusion_engine کی کم از کم حد
+TP_SL_ATR_SPAN = 14
+TP_SL_SWING_LOOKBACK = 10
+GRADE_BASE_CONFIDENCE = {"A+": 85.0, "A": 75.0, "B": 65.0}
+AMBIGUOUS_BAR_POLICIES = ("sl_first", "tp_first", "nearest_open")
+
+TRADE_COLUMNS = [
+    "symbol", "signal_type", "signal_grade", "strategy_type", "confidence",
+    "entry_time", "exit_time", "entry_price", "tp_price", "sl_price", "exit_price",
+    "outcome", "bars_held", "r_multiple", "pnl_pct",
+]
+
+# --- ڈیٹا لوڈ کرنا ---
+
+def load_asset_personalities(path: str = PERSONALITIES_FILE) -> Dict[str, Dict]:
+    """اثاثوں کی شخصیات کی فائل پڑھتا ہے۔"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        logger.error(f"{path} نہیں ملی یا خراب ہے۔ ڈیفالٹ شخصیت استعمال کی جائے گی۔")
+        return {}
+
+def get_symbol_personality(personalities: Dict[str, Dict], symbol: str) -> Dict[str, Any]:
+    """کسی علامت کی شخصیت (یا DEFAULT) کی ایک کاپی واپس کرتا ہے۔"""
+    personality = dict(personalities.get(symbol, personalities.get("DEFAULT", {})))
+    personality['symbol'] = symbol
+    return personality
+
+def load_history_from_csv(directory: str, symbols: Optional[List[str]] = None) -> Dict[str, pd.DataFrame]:
+    """
+    کسی ڈائرکٹری سے کینڈلز کی تاریخ لوڈ کرتا ہے۔
+    ہر علامت کی فائل کا نام '/' کی جگہ '_' کے ساتھ ہو (مثلاً EUR_USD.csv) اور اس میں
+    datetime, open, high, low, close کالم ہوں۔
+    """
+    history: Dict[str, pd.DataFrame] = {}
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".csv"):
+            continue
+        symbol = filename[:-4].replace("_", "/")
+        if symbols and symbol not in symbols:
+            continue
+        df = pd.read_csv(os.path.join(directory, filename), parse_dates=["datetime"])
+        history[symbol] = df
+    logger.info(f"📂 {len(history)} علامتوں کی تاریخ '{directory}' سے لوڈ ہوئی۔")
+    return history
+
+def load_history_from_db(
+    timeframe: str, symbols: Optional[List[str]] = None,
+    start: Optional[datetime] = None, end: Optional[datetime] = None,
+) -> Dict[str, pd.DataFrame]:
+    """ہنٹر کی محفوظ کردہ کینڈلز (candles ٹیبل) سے تاریخ لوڈ کرتا ہے، ہر علامت ایک انڈیکس اسکین میں۔"""
+    # ڈیٹا بیس کا انحصار صرف اسی راستے پر، تاکہ CSV والے بیک ٹیسٹ کو ڈیٹا بیس کی ضرورت نہ ہو
+    from candle_store import list_symbols, read_candles
+    from models import SessionLocal
+
+    history: Dict[str, pd.DataFrame] = {}
+    db = SessionLocal()
+    try:
+        for symbol in symbols or list_symbols(db, timeframe):
+            window = read_candles(db, symbol, timeframe, start, end)
+            if len(window):
+                history[symbol] = window.to_dataframe()
+    finally:
+        db.close()
+    logger.info(f"🗄️ {len(history)} علامتوں کی {timeframe} تاریخ ڈیٹا بیس سے لوڈ ہوئی۔")
+    return history
+
+def _prepare_ohlc(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """ڈیٹا فریم کو وقت کے لحاظ سے ترتیب دے کر OHLC کی NumPy arrays بناتا ہے۔"""
+    df = df.dropna(subset=['open', 'high', 'low', 'close']).sort_values('datetime')
+    return {
+        "time": pd.to_datetime(df['datetime']).to_numpy(),
+        "open": df['open'].to_numpy(dtype=np.float64),
+        "high": df['high'].to_numpy(dtype=np.float64),
+        "low": df['low'].to_numpy(dtype=np.float64),
+        "close": df['close'].to_numpy(dtype=np.float64),
+    }
+
+# --- ویکٹرائزڈ انڈیکیٹرز ---
+
+def _cached(cache: Optional[Dict], key: tuple, compute: Callable[[], np.ndarray]) -> np.ndarray:
+    """اگر کیش فراہم کیا گیا ہو تو ایک ہی انڈیکیٹر دوبارہ حساب نہیں ہوتا۔"""
+    if cache is None:
+        return compute()
+    if key not in cache:
+        cache[key] = compute()
+    return cache[key]
+
+def _ewm(values: np.ndarray, **kwargs) -> np.ndarray:
+    return pd.Series(values).ewm(adjust=False, **kwargs).mean().to_numpy()
+
+def true_range(ohlc: Dict[str, np.ndarray], cache: Optional[Dict] = None) -> np.ndarray:
+    """True Range (پہلی بار پر high - low، بالکل pandas کے skipna رویے کی طرح)۔"""
+    def compute():
+        high, low, close = ohlc['high'], ohlc['low'], ohlc['close']
+        prev_close = np.empty_like(close)
+        prev_close[0] = np.nan
+        prev_close[1:] = close[:-1]
+        tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+        return tr
+    return _cached(cache, ("tr",), compute)
+
+def ema(ohlc: Dict[str, np.ndarray], span: int, cache: Optional[Dict] = None) -> np.ndarray:
+    return _cached(cache, ("ema", span), lambda: _ewm(ohlc['close'], span=span))
+
+def rsi(ohlc: Dict[str, np.ndarray], period: int, cache: Optional[Dict] = None) -> np.ndarray:
+    """strategy_scalper.calculate_rsi کا ویکٹرائزڈ ہم منصب۔"""
+    def compute():
+        close = ohlc['close']
+        delta = np.empty_like(close)
+        delta[0] = 0.0
+        delta[1:] = np.diff(close)
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+        avg_gain = _ewm(gain, com=period - 1)
+        avg_loss = _ewm(loss, com=period - 1)
+        avg_loss = np.where(avg_loss == 0, 1e-9, avg_loss)
+        values = 100 - (100 / (1 + avg_gain / avg_loss))
+        return np.where(np.isnan(values), 50.0, values)
+    return _cached(cache, ("rsi", period), compute)
+
+def wilder_atr(ohlc: Dict[str, np.ndarray], period: int, cache: Optional[Dict] = None) -> np.ndarray:
+    return _cached(cache, ("atr_alpha", period), lambda: _ewm(true_range(ohlc, cache), alpha=1 / period))
+
+def span_atr(ohlc: Dict[str, np.ndarray], span: int, cache: Optional[Dict] = None) -> np.ndarray:
+    return _cached(cache, ("atr_span", span), lambda: _ewm(true_range(ohlc, cache), span=span))
+
+def supertrend_uptrend(ohlc: Dict[str, np.ndarray], atr_period: int, multiplier: float, cache: Optional[Dict] = None) -> np.ndarray:
+    """
+    strategy_scalper.calculate_supertrend کا تیز ہم منصب۔
+    بینڈز کی ترتیب وار منطق ایک سادہ لوپ میں NumPy arrays پر چلتی ہے، pandas کے .loc کے بغیر۔
+    """
+    def compute():
+        high, low, close = ohlc['high'], ohlc['low'], ohlc['close']
+        atr = wilder_atr(ohlc, atr_period, cache)
+        mid = (high + low) / 2
+        upper = (mid + multiplier * atr).tolist()
+        lower = (mid - multiplier * atr).tolist()
+        closes = close.tolist()
+        in_uptrend = [True] * len(closes)
+        for i in range(1, len(closes)):
+            if closes[i] > upper[i - 1]:
+                up = True
+            elif closes[i] < lower[i - 1]:
+                up = False
+            else:
+                up = in_uptrend[i - 1]
+            in_uptrend[i] = up
+            if up and lower[i] < lower[i - 1]:
+                lower[i] = lower[i - 1]
+            if not up and upper[i] > upper[i - 1]:
+                upper[i] = upper[i - 1]
+        return np.array(in_uptrend, dtype=bool)
+    return _cached(cache, ("supertrend", atr_period, float(multiplier)), compute)
+
+def rolling_extreme(values: np.ndarray, window: int, kind: str, cache: Optional[Dict] = None, key: str = "") -> np.ndarray:
+    def compute():
+        series = pd.Series(values).rolling(window, min_periods=1)
+        return (series.min() if kind == "min" else series.max()).to_numpy()
+    return _cached(cache, ("rolling", key, kind, window), compute)
+
+# --- ویکٹرائزڈ کمیٹی ---
+
+def compute_committee_signals(
+    ohlc: Dict[str, np.ndarray],
+    tech_params: Dict[str, Any],
+    personality: Dict[str, Any],
+    market_regime: str = "Calm Trend",
+    cache: Optional[Dict] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    ہر بار پر run_trading_committee + find_realistic_tp_sl + fusion_engine کے اعتماد کے فارمولے کو
+    ویکٹر کی شکل میں چلاتا ہے۔ (تاریخی خبروں کی عدم موجودگی میں خبروں کی سزا شامل نہیں۔)
+    """
+    n = len(ohlc['close'])
+    close = ohlc['close']
+
+    ema_fast = ema(ohlc, tech_params['EMA_SHORT_PERIOD'], cache)
+    ema_slow = ema(ohlc, tech_params['EMA_LONG_PERIOD'], cache)
+    in_uptrend = supertrend_uptrend(ohlc, tech_params['SUPERTREND_ATR'], tech_params['SUPERTREND_FACTOR'], cache)
+    rsi_values = rsi(ohlc, tech_params['RSI_PERIOD'], cache)
+
+    # جارحانہ اسکیلپر
+    scalper_score = (
+        np.where(ema_fast > ema_slow, 50, 0) - np.where(ema_fast < ema_slow, 50, 0)
+        + np.where(in_uptrend, 50, -50)
+    )
+    scalper_vote = np.where(scalper_score >= 100, 1, np.where(scalper_score <= -100, -1, 0))
+
+    # محتاط ٹریڈر (لائیو کوڈ کی طرح دونوں سمتوں میں اسکور +100 ہے)
+    cautious_vote = np.where(rsi_values < 30, 1, np.where(rsi_values > 70, -1, 0))
+    cautious_score = np.where(cautious_vote != 0, 100, 0)
+
+    # فیصلہ سازی کا میٹرکس
+    agree = (scalper_vote == cautious_vote) & (scalper_vote != 0)
+    scalper_only = (scalper_vote != 0) & (cautious_vote == 0)
+    cautious_only = (cautious_vote != 0) & (scalper_vote == 0)
+    direction = np.select([agree, scalper_only, cautious_only], [scalper_vote, scalper_vote, cautious_vote], 0)
+    grade = np.select([agree, scalper_only, cautious_only], ["A+", "A", "B"], "F")
+
+    total_score = scalper_score + cautious_score
+    base_confidence = np.select(
+        [grade == g for g in GRADE_BASE_CONFIDENCE], list(GRADE_BASE_CONFIDENCE.values()), 50.0
+    )
+    confidence = np.clip(base_confidence + (np.abs(total_score) - 100) / 10, 40.0, 99.0)
+
+    # TP/SL
+    atr = span_atr(ohlc, TP_SL_ATR_SPAN, cache)
+    recent_low = rolling_extreme(ohlc['low'], TP_SL_SWING_LOOKBACK, "min", cache, "low")
+    recent_high = rolling_extreme(ohlc['high'], TP_SL_SWING_LOOKBACK, "max", cache, "high")
+    volatility_multiplier = personality.get("volatility_multiplier", 1.5)
+    min_rr_ratio = personality.get("min_rr_ratio", 1.5)
+
+    buy_sl = np.minimum(recent_low - atr * 0.25, close - atr * volatility_multiplier)
+    sell_sl = np.maximum(recent_high + atr * 0.25, close + atr * volatility_multiplier)
+    sl = np.where(direction > 0, buy_sl, sell_sl)
+    risk = np.abs(close - sl)
+    tp = close + direction * risk * min_rr_ratio
+
+    required_confidence = strategy_settings.FINAL_CONFIDENCE_THRESHOLD
+    if market_regime == "Volatile":
+        required_confidence += 10
+
+    valid = (
+        (direction != 0)
+        & (np.arange(n) >= MIN_CANDLES_FOR_SIGNAL - 1)
+        & (atr != 0) & (risk != 0)
+        & (confidence >= strategy_settings.FINAL_CONFIDENCE_THRESHOLD)
+        & (confidence >= required_confidence)
+    )
+    if market_regime == "Kill Zone":
+        valid[:] = False
+
+    return {
+        "valid": valid,
+        "direction": direction,
+        "grade": grade,
+        "strategy_type": np.where(scalper_score != 0, "Trend", "Reversal"),
+        "confidence": np.round(confidence, 2),
+        "tp": tp,
+        "sl": sl,
+        "rr": np.full(n, float(min_rr_ratio)),
+    }
+
+# --- TP/SL کا انٹرا بار حل ---
+
+def _first_hit_index(ohlc: Dict[str, np.ndarray], start: int, direction: int, tp: float, sl: float) -> Optional[int]:
+    """start سے آگے وہ پہلی بار تلاش کرتا ہے جس کا high/low TP یا SL کو چھوئے (بڑھتی ہوئی ونڈوز میں)۔"""
+    high, low = ohlc['high'], ohlc['low']
+    n = len(high)
+    window = 64
+    while start < n:
+        end = min(n, start + window)
+        h, l = high[start:end], low[start:end]
+        if direction > 0:
+            hits = (h >= tp) | (l <= sl)
+        else:
+            hits = (l <= tp) | (h >= sl)
+        idx = np.flatnonzero(hits)
+        if idx.size:
+            return start + int(idx[0])
+        start = end
+        window *= 2
+    return None
+
+def simulate_trades(
+    symbol: str,
+    ohlc: Dict[str, np.ndarray],
+    signals: Dict[str, np.ndarray],
+    ambiguous_policy: str = guardian_settings.INTRABAR_AMBIGUITY_POLICY,
+) -> List[Dict[str, Any]]:
+    """
+    لائیو رویے کی نقل: ایک علامت پر ایک وقت میں صرف ایک فعال سگنل۔ سگنل بار کے close پر کھلتا ہے اور
+    اگلی بار سے high/low کی بنیاد پر (نگران انجن والی resolve_intrabar_outcome سے) بند ہوتا ہے۔ جو ٹریڈ ڈیٹا کے اختتام تک بند نہ ہو وہ شامل نہیں ہوتا۔
+    """
+    if ambiguous_policy not in AMBIGUOUS_BAR_POLICIES:
+        raise ValueError(f"نامعلوم پالیسی: {ambiguous_policy}")
+
+    candidates = np.flatnonzero(signals['valid'])
+    trades: List[Dict[str, Any]] = []
+    times, opens, closes = ohlc['time'], ohlc['open'], ohlc['close']
+    next_free_bar = 0
+    cursor = 0
+
+    while cursor < candidates.size:
+        entry_idx = int(candidates[cursor])
+        if entry_idx < next_free_bar:
+            cursor = int(np.searchsorted(candidates, next_free_bar))
+            continue
+
+        direction = int(signals['direction'][entry_idx])
+        tp, sl = float(signals['tp'][entry_idx]), float(signals['sl'][entry_idx])
+        exit_idx = _first_hit_index(ohlc, entry_idx + 1, direction, tp, sl)
+        if exit_idx is None:
+            break
+
+        outcome = resolve_intrabar_outcome(
+            "buy" if direction > 0 else "sell", tp, sl,
+            opens[exit_idx], ohlc['high'][exit_idx], ohlc['low'][exit_idx], ambiguous_policy
+        )
+        entry_price = float(closes[entry_idx])
+        exit_price = tp if outcome == "tp_hit" else sl
+        trades.append({
+            "symbol": symbol,
+            "signal_type": "buy" if direction > 0 else "sell",
+            "signal_grade": str(signals['grade'][entry_idx]),
+            "strategy_type": str(signals['strategy_type'][entry_idx]),
+            "confidence": float(signals['confidence'][entry_idx]),
+            "entry_time": pd.Timestamp(times[entry_idx]),
+            "exit_time": pd.Timestamp(times[exit_idx]),
+            "entry_price": entry_price,
+            "tp_price": tp,
+            "sl_price": sl,
+            "exit_price": exit_price,
+            "outcome": outcome,
+            "bars_held": exit_idx - entry_idx,
+            "r_multiple": float(signals['rr'][entry_idx]) if outcome == "tp_hit" else -1.0,
+            "pnl_pct": direction * (exit_price - entry_price) / entry_price * 100,
+        })
+        # ہنٹر اگلے دور میں ہی نیا سگنل بنا سکتا ہے
+        next_free_bar = exit_idx + 1
+        cursor += 1
+
+    return trades
+
+# --- خلاصہ ---
+
+def summarize_trades(trades: pd.DataFrame) -> Dict[str, Any]:
+    """فی ٹریڈ نتائج سے خلاصہ اعداد و شمار (R ملٹیپلز میں) تیار کرتا ہے۔"""
+    if trades.empty:
+        return {"trades": 0, "wins": 0, "losses": 0, "win_rate": 0.0, "expectancy_r": 0.0,
+                "total_r": 0.0, "profit_factor": 0.0, "max_drawdown_r": 0.0, "avg_bars_held": 0.0}
+
+    ordered = trades.sort_values("exit_time")
+    r = ordered['r_multiple'].to_numpy()
+    equity = np.cumsum(r)
+    drawdown = np.maximum.accumulate(np.concatenate(([0.0], equity)))[1:] - equity
+    gross_win = r[r > 0].sum()
+    gross_loss = -r[r < 0].sum()
+    wins = int((ordered['outcome'] == "tp_hit").sum())
+
+    return {
+        "trades": int(len(r)),
+        "wins": wins,
+        "losses": int(len(r) - wins),
+        "win_rate": round(wins / len(r) * 100, 2),
+        "expectancy_r": round(float(r.mean()), 4),
+        "total_r": round(float(r.sum()), 4),
+        "profit_factor": round(float(gross_win / gross_loss), 4) if gross_loss > 0 else float("inf"),
+        "max_drawdown_r": round(float(drawdown.max()), 4),
+        "avg_bars_held": round(float(ordered['bars_held'].mean()), 2),
+    }
+
+# --- متوازی عمل ---
+
+def backtest_symbol(
+    symbol: str,
+    df: pd.DataFrame,
+    tech_params: Dict[str, Any],
+    personality: Dict[str, Any],
+    market_regime: str = "Calm Trend",
+    ambiguous_policy: str = guardian_settings.INTRABAR_AMBIGUITY_POLICY,
+) -> List[Dict[str, Any]]:
+    """ایک علامت کی پوری تاریخ کا بیک ٹیسٹ (ورکر پروسیس میں چلتا ہے)۔"""
+    ohlc = _prepare_ohlc(df)
+    if len(ohlc['close']) < MIN_CANDLES_FOR_SIGNAL + 1:
+        logger.warning(f"📊 [{symbol}] بیک ٹیسٹ روکا گیا: ناکافی کینڈل ڈیٹا ({len(ohlc['close'])})۔")
+        return []
+    signals = compute_committee_signals(ohlc, tech_params, personality, market_regime, cache={})
+    return simulate_trades(symbol, ohlc, signals, ambiguous_policy)
+
+def _backtest_symbol_task(args: tuple) -> List[Dict[str, Any]]:
+    return backtest_symbol(*args)
+
+def run_backtest(
+    history: Dict[str, pd.DataFrame],
+    tech_params: Optional[Dict[str, Any]] = None,
+    personalities: Optional[Dict[str, Dict]] = None,
+    market_regime: str = "Calm Trend",
+    ambiguous_policy: str = guardian_settings.INTRABAR_AMBIGUITY_POLICY,
+    workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    کئی علامتوں کا بیک ٹیسٹ چلاتا ہے، ہر علامت ایک الگ پروسیس میں۔
+    Returns: {"trades": DataFrame, "summary": Dict, "by_symbol": Dict[str, Dict]}
+    """
+    tech_params = tech_params or tech_settings.model_dump()
+    personalities = personalities if personalities is not None else load_asset_personalities()
+
+    tasks = [
+        (symbol, df, tech_params, get_symbol_personality(personalities, symbol), market_regime, ambiguous_policy)
+        for symbol, df in history.items()
+    ]
+    start = time.perf_counter()
+    if workers == 1 or len(tasks) <= 1:
+        results = [_backtest_symbol_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_backtest_symbol_task, tasks))
+
+    trades = pd.DataFrame([t for symbol_trades in results for t in symbol_trades], columns=TRADE_COLUMNS)
+    by_symbol = {symbol: summarize_trades(trades[trades['symbol'] == symbol]) for symbol in history}
+    summary = summarize_trades(trades)
+    total_bars = sum(len(df) for df in history.values())
+    logger.info(
+        f"🧪 بیک ٹیسٹ مکمل: {len(history)} علامتیں، {total_bars} کینڈلز، {summary['trades']} ٹریڈز، "
+        f"{time.perf_counter() - start:.1f} سیکنڈ۔"
+    )
+    return {"trades": trades, "summary": summary, "by_symbol": by_symbol}
+
+def main():
+    parser = argparse.ArgumentParser(description="ٹریڈنگ کمیٹی کا تاریخی بیک ٹیسٹ")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--data-dir", help="علامتوں کی CSV فائلوں والی ڈائرکٹری")
+    source.add_argument("--from-db", action="store_true", help="ڈیٹا بیس کی candles ٹیبل سے تاریخ لوڈ کریں")
+    parser.add_argument("--timeframe", default="15min", help="--from-db کے ساتھ: کینڈلز کا ٹائم فریم")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="--from-db کے ساتھ: آغاز (UTC)")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="--from-db کے ساتھ: اختتام (UTC، خارج)")
+    parser.add_argument("--symbols", nargs="*", help="صرف یہ علامتیں (ڈیفالٹ: سب)")
+    parser.add_argument("--regime", default="Calm Trend", help="مارکیٹ کا مستقل نظام")
+    parser.add_argument("--policy", default=guardian_settings.INTRABAR_AMBIGUITY_POLICY, choices=AMBIGUOUS_BAR_POLICIES)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", help="فی ٹریڈ نتائج کے لیے CSV فائل")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [%(name)s] - %(message)s')
+    if args.from_db:
+        history = load_history_from_db(args.timeframe, args.symbols, args.start, args.end)
+    else:
+        history = load_history_from_csv(args.data_dir, args.symbols)
+    result = run_backtest(history, market_regime=args.regime, ambiguous_policy=args.policy, workers=args.workers)
+
+    if args.output:
+        result["trades"].to_csv(args.output, index=False)
+    print(json.dumps({"summary": result["summary"], "by_symbol": result["by_symbol"]}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# filename: candle_store.py
+
+"""
+OHLCV کینڈلز کا پائیدار ذخیرہ (candles ٹیبل)۔
+
+ہنٹر Twelve Data سے آنے والی ہر کینڈل یہاں محفوظ کرتا ہے، تاکہ ری اسٹارٹ، بیک ٹیسٹ اور چارٹس کو دوبارہ
+API سے ڈیٹا نہ لانا پڑے۔ لکھائی ایک bulk upsert ہے: ایک ہی INSERT ... ON CONFLICT بیان پوری فہرست کے ساتھ
+executemany کے طور پر چلتا ہے، جسے SQLAlchemy پوسٹگریس پر کثیر قطار VALUES بیچز میں اور SQLite پر
+executemany میں بدلتا ہے۔ پڑھائی براہ راست NumPy arrays واپس کرتی ہے۔
+"""
+
+import logging
+from datetime import datetime
+from typing import Iterable, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import desc, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models import AsyncSessionLocal, CandleRecord, is_sqlite
+from schemas import Candle
+
+logger = logging.getLogger(__name__)
+
+PRICE_COLUMNS = ("open", "high", "low", "close", "volume")
+
+class CandleWindow(NamedTuple):
+    """کسی علامت کی کینڈلز، وقت کے لحاظ سے صعودی ترتیب میں، کالم وار NumPy arrays کی شکل میں۔"""
+    ts: np.ndarray        # datetime64[s]
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray    # غیر موجود حجم NaN
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """backtester کی ساخت (datetime, open, high, low, close, volume) والا ڈیٹا فریم۔"""
+        return pd.DataFrame({"datetime": self.ts, **{name: getattr(self, name) for name in PRICE_COLUMNS}})
+
+def _empty_window() -> CandleWindow:
+    return CandleWindow(np.array([], dtype="datetime64[s]"), *(np.array([], dtype=np.float64) for _ in PRICE_COLUMNS))
+
+def _candle_rows(symbol: str, timeframe: str, candles: Iterable[Candle]) -> List[dict]:
+    return [
+        {
+            "symbol": symbol,
+            "timeframe": timeframe,
+            "ts": candle.datetime.replace(tzinfo=None),
+            "open": candle.open,
+            "high": candle.high,
+            "low": candle.low,
+            "close": candle.close,
+            "volume": candle.volume,
+        }
+        for candle in candles
+    ]
+
+def _build_candle_upsert():
+    """(symbol, timeframe, ts) پر ٹکراؤ ہو تو قیمتیں اپ ڈیٹ (آخری کینڈل بعد میں درست ہو سکتی ہے)۔"""
+    statement = (sqlite_insert if is_sqlite else pg_insert)(CandleRecord)
+    return statement.on_conflict_do_update(
+        index_elements=["symbol", "timeframe", "ts"],
+        set_={name: statement.excluded[name] for name in PRICE_COLUMNS},
+    )
+
+def _build_range_statement(
+    symbol: str, timeframe: str, start: Optional[datetime], end: Optional[datetime], limit: Optional[int]
+):
+    columns = (CandleRecord.ts, CandleRecord.open, CandleRecord.high, CandleRecord.low, CandleRecord.close, CandleRecord.volume)
+    statement = select(*columns).where(CandleRecord.symbol == symbol, CandleRecord.timeframe == timeframe)
+    if start is not None:
+        statement = statement.where(CandleRecord.ts >= start)
+    if end is not None:
+        statement = statement.where(CandleRecord.ts < end)
+    if limit is not None:
+        # آخری N کینڈلز: الٹی ترتیب میں LIMIT، پھر _window_from_rows میں سیدھی
+        return statement.order_by(desc(CandleRecord.ts)).limit(limit)
+    return statement.order_by(CandleRecord.ts)
+
+def _window_from_rows(rows, descending: bool) -> CandleWindow:
+    if not rows:
+        return _empty_window()
+    if descending:
+        rows = rows[::-1]
+    ts, *prices = zip(*rows)
+    return CandleWindow(
+        np.array(ts, dtype="datetime64[s]"),
+        *(np.array(values, dtype=np.float64) for values in prices),  # None -> NaN
+    )
+
+def list_symbols(db: Session, timeframe: str) -> List[str]:
+    """اس ٹائم فریم کی محفوظ شدہ تمام علامتیں۔"""
+    try:
+        return list(db.execute(
+            select(CandleRecord.symbol).where(CandleRecord.timeframe == timeframe).distinct().order_by(CandleRecord.symbol)
+        ).scalars())
+    except SQLAlchemyError as e:
+        logger.error(f"کینڈلز کی علامتیں پڑھنے میں خرابی: {e}", exc_info=True)
+        return []
+
+def upsert_candles(db: Session, symbol: str, timeframe: str, candles: List[Candle]) -> int:
+    """کینڈلز کو bulk upsert کرتا ہے۔ Returns: لکھی گئی قطاروں کی تعداد (ناکامی پر 0)۔"""
+    rows = _candle_rows(symbol, timeframe, candles)
+    if not rows:
+        return 0
+    try:
+        db.execute(_build_candle_upsert(), rows)
+        db.commit()
+        return len(rows)
+    except SQLAlchemyError as e:
+        logger.error(f"[{symbol}] کی کینڈلز محفوظ کرنے میں خرابی: {e}", exc_info=True)
+        db.rollback()
+        return 0
+
+def read_candles(
+    db: Session, symbol: str, timeframe: str,
+    start: Optional[datetime] = None, end: Optional[datetime] = None, limit: Optional[int] = None,
+) -> CandleWindow:
+    """[start, end) کی کینڈلز (یا limit دیا ہو تو آخری N) ایک انڈیکس اسکین میں، NumPy arrays کی شکل میں۔"""
+    try:
+        rows = db.execute(_build_range_statement(symbol, timeframe, start, end, limit)).all()
+    except SQLAlchemyError as e:
+        logger.error(f"[{symbol}] کی کینڈلز پڑھنے میں خرابی: {e}", exc_info=True)
+        return _empty_window()
+    return _window_from_rows(rows, descending=limit is not None)
+
+async def upsert_candles_async(db: AsyncSession, symbol: str, timeframe: str, candles: List[Candle]) -> int:
+    """upsert_candles کا async ورژن۔"""
+    rows = _candle_rows(symbol, timeframe, candles)
+    if not rows:
+        return 0
+    try:
+        await db.execute(_build_candle_upsert(), rows)
+        await db.commit()
+        return len(rows)
+    except SQLAlchemyError as e:
+        logger.error(f"[{symbol}] کی کینڈلز محفوظ کرنے میں خرابی: {e}", exc_info=True)
+        await db.rollback()
+        return 0
+
+async def read_candles_async(
+    db: AsyncSession, symbol: str, timeframe: str,
+    start: Optional[datetime] = None, end: Optional[datetime] = None, limit: Optional[int] = None,
+) -> CandleWindow:
+    """read_candles کا async ورژن۔"""
+    try:
+        rows = (await db.execute(_build_range_statement(symbol, timeframe, start, end, limit))).all()
+    except SQLAlchemyError as e:
+        logger.error(f"[{symbol}] کی کینڈلز پڑھنے میں خرابی: {e}", exc_info=True)
+        return _empty_window()
+    return _window_from_rows(rows, descending=limit is not None)
+
+async def save_fetched_candles(symbol: str, timeframe: str, candles: Optional[List[Candle]]):
+    """ہنٹر کے لیے: API سے آئی کینڈلز اپنے سیشن میں محفوظ کرتا ہے (ناکامی تجزیے کو نہیں روکتی)۔"""
+    if not candles:
+        return
+    async with AsyncSessionLocal() as db:
+        await upsert_candles_async(db, symbol, timeframe, candles)
@@ -23,6 +23,8 @@ class APISettings(BaseSettings):
     MARKETAUX_API_KEY: str = Field(default="")
     TELEGRAM_BOT_TOKEN: str = Field(default="")
     TELEGRAM_CHAT_ID: str = Field(default="")
+    # /api/webhooks کے انتظامی اینڈ پوائنٹس کے لیے X-Admin-Token؛ خالی ہو تو وہ اینڈ پوائنٹس بند رہتے ہیں
+    WEBHOOK_ADMIN_TOKEN: str = Field(default="")
     
     PRIMARY_TIMEFRAME: str = "15min"
     CANDLE_COUNT: int = 100
@@ -49,6 +51,10 @@ class StrategySettings(BaseSettings):
     FINAL_CONFIDENCE_THRESHOLD: float = 70.0
     MIN_RISK_REWARD_RATIO: float = 1.2
     MIN_CONFLUENCE_SCORE: int = 4
+    # ماضی کے نتائج سے اعتماد کی انشانکن (calibration)
+    OUTCOME_HALF_LIFE_DAYS: float = 14.0      # اس مدت کے بعد پرانے نتیجے کا وزن آدھا رہ جاتا ہے
+    CALIBRATION_PRIOR_WEIGHT: float = 20.0    # K: تجرباتی شرح کا حصہ = n / (n + K)
+    CALIBRATION_CONFIDENCE_PER_R: float = 40.0  # ہر 1R توقع (expectancy) تھریشولڈ سے اتنے پوائنٹس اوپر
 
 class TechnicalAnalysisSettings(BaseSettings):
     """تکنیکی انڈیکیٹرز کے لیے پیرامیٹرز۔"""
@@ -65,6 +71,69 @@ class TechnicalAnalysisSettings(BaseSettings):
     BBANDS_SQUEEZE_THRESHOLD: float = 0.8 # بولنگر بینڈ کی چوڑائی کا تھریشولڈ
 
 
+class GuardianSettings(BaseSettings):
+    """نگران انجن (TP/SL کی نگرانی) کے لیے سیٹنگز۔"""
+    # جب ایک ہی کینڈل TP اور SL دونوں کو چھوئے: sl_first (محتاط)، tp_first، یا nearest_open
+    INTRABAR_AMBIGUITY_POLICY: str = "sl_first"
+    # پچھلی جانچ کے بعد بند ہونے والی زیادہ سے زیادہ کینڈلز جو ایک درخواست میں لی جائیں گی
+    INTRABAR_MAX_CANDLES: int = 50
+    # --- قربت کی بنیاد پر انکولی نگرانی ---
+    TICK_SECONDS: int = 10             # نگران جاب کتنی بار جاگتی ہے
+    CREDITS_PER_MINUTE: float = 20.0   # نگران انجن کے لیے فی منٹ API کریڈٹس کا عالمی بجٹ
+    MIN_CHECK_INTERVAL: float = 15.0   # سطح کے بالکل قریب سگنل کا وقفہ (سیکنڈ)
+    MAX_CHECK_INTERVAL: float = 300.0  # دور والے سگنل کا زیادہ سے زیادہ وقفہ (سیکنڈ)
+    SECONDS_PER_ATR: float = 60.0      # قریب ترین سطح سے ہر ATR فاصلے پر اضافی وقفہ
+
+class WebSocketSettings(BaseSettings):
+    """WebSocket کلائنٹس کی فی کنکشن بھیجنے والی قطاروں کی سیٹنگز۔"""
+    SEND_QUEUE_SIZE: int = 256         # فی کنکشن زیادہ سے زیادہ زیرِ التوا پیغامات
+    # قطار بھر جائے تو: drop_oldest (پرانا پیغام حذف)، coalesce (ایک ہی سگنل کے پیغامات ضم، پھر پرانا حذف)، disconnect
+    OVERFLOW_POLICY: str = "coalesce"
+    SEND_TIMEOUT_SECONDS: float = 10.0 # اس سے زیادہ دیر تک اٹکا کلائنٹ منقطع کر دیا جاتا ہے
+    BATCH_WINDOW_SECONDS: float = 0.05 # اس وقفے میں نشر ہونے والے پیغامات ایک فریم میں بھیجے جاتے ہیں
+    REPLAY_BUFFER_SIZE: int = 1000     # دوبارہ جڑنے والے کلائنٹس کے لیے آخری پیغامات؛ اس سے پیچھے ہوں تو مکمل اسنیپ شاٹ
+    PRICE_MIN_INTERVAL_SECONDS: float = 1.0  # فی کلائنٹ، فی علامت قیمت کی زیادہ سے زیادہ شرح؛ بیچ کی قیمتیں ضم
+    # نئے کنکشن کے لائیو فریمز resume کے جواب تک روکے جاتے ہیں؛ resume نہ بھیجنے والے کلائنٹ کو اتنی دیر بعد ملتے ہیں
+    RESUME_WAIT_SECONDS: float = 2.0
+
+class TelegramSettings(BaseSettings):
+    """ٹیلیگرام الرٹس بھیجنے والے ڈسپیچر کی سیٹنگز۔"""
+    QUEUE_SIZE: int = 500                 # زیادہ سے زیادہ زیرِ التوا الرٹس؛ اس سے آگے نئے الرٹس گرائے جاتے ہیں
+    PER_CHAT_RATE: float = 1.0            # فی چیٹ پیغامات فی سیکنڈ (ٹیلیگرام کی حد کے اندر)
+    PER_CHAT_BURST: int = 3               # فی چیٹ فوری طور پر بھیجے جا سکنے والے پیغامات
+    MAX_RETRIES: int = 5
+    BACKOFF_BASE_SECONDS: float = 1.0     # 1، 2، 4، ... سیکنڈ (retry_after ملے تو وہی)
+    BACKOFF_MAX_SECONDS: float = 60.0
+    REQUEST_TIMEOUT_SECONDS: float = 15.0
+    # ڈائجسٹ: ایک ہی علامت کی اپ ڈیٹس اتنی دیر روک کر ایک پیغام میں ضم (0 = بند)
+    DIGEST_WINDOW_SECONDS: float = 0.0
+
+class WebhookSettings(BaseSettings):
+    """بیرونی webhook سبسکرائبرز کو سگنل ایونٹس کی ترسیل کی سیٹنگز۔"""
+    WORKERS: int = 32                     # بیک وقت ترسیل کرنے والے ٹاسک
+    QUEUE_SIZE: int = 20_000              # میموری کی قطار؛ بھر جائے تو ترسیل سیدھی ڈیٹا بیس کی قطار میں
+    REQUEST_TIMEOUT_SECONDS: float = 5.0
+    MAX_ATTEMPTS: int = 8                 # اس کے بعد dead-letter
+    BACKOFF_BASE_SECONDS: float = 5.0     # 5، 10، 20، ... سیکنڈ
+    BACKOFF_MAX_SECONDS: float = 1800.0
+    BREAKER_FAILURE_THRESHOLD: int = 5    # لگاتار ناکامیاں جن پر اینڈ پوائنٹ کا سرکٹ کھل جاتا ہے
+    BREAKER_RESET_SECONDS: float = 60.0   # کھلے سرکٹ کے بعد ایک آزمائشی ترسیل
+    RETRY_POLL_SECONDS: float = 15.0      # لیڈر اتنے وقفے سے واجب دوبارہ کوششیں ڈیٹا بیس سے اٹھاتا ہے
+    RETRY_BATCH_SIZE: int = 1000
+    RETRY_LEASE_SECONDS: float = 300.0    # اٹھائی گئی قطاریں اتنی دیر دوبارہ نہیں اٹھائی جاتیں
+    SIGNATURE_TOLERANCE_SECONDS: int = 300  # وصول کنندہ پرانے ٹائم اسٹیمپ والی درخواستیں رد کرے
+    # نجی/loopback/link-local پتوں کو ترسیل (SSRF سے بچاؤ کے لیے بند)؛ صرف مقامی جانچ کے لیے true کریں
+    ALLOW_PRIVATE_URLS: bool = False
+    URL_CHECK_TTL_SECONDS: float = 60.0   # ترسیل کے وقت host کے DNS پتوں کی جانچ اتنی دیر یاد رکھی جاتی ہے
+
+class ClusterSettings(BaseSettings):
+    """کئی gunicorn ورکرز: ان کے درمیان نشریات (ایونٹ بس) اور شیڈیولر کی قیادت (leader election)۔"""
+    # auto: پوسٹگریس پر LISTEN/NOTIFY، SQLite پر پروسیس کے اندر؛ یا صراحتاً "postgres" / "memory"
+    EVENT_BUS_BACKEND: str = "auto"
+    EVENT_BUS_CHANNEL: str = "scalpmaster_events"
+    LEADER_LOCK_KEY: int = 7_404_501        # pg_try_advisory_lock کی کلید (پوری ڈیٹا بیس میں منفرد)
+    LEADER_RETRY_SECONDS: float = 15.0      # پیروکار اتنے وقفے سے قیادت حاصل کرنے کی کوشش کرتے ہیں
+
 # اصلاح: خبروں کے لیے گمشدہ سیٹنگز کلاس شامل کی گئی
 class NewsSettings(BaseSettings):
     """اعلیٰ اثر والی خبروں کی شناخت کے لیے کلیدی الفاظ۔"""
@@ -76,9 +145,11 @@ class NewsSettings(BaseSettings):
         'CAD': ['boc'],
         'AUD': ['rba'],
         'NZD': ['rbnz'],
-        'XAU': ['war', 'crisis', 'geopolitical', 'fed', 'inflation'],
+        'XAU': ['war', 'crisis', 'crises', 'geopolitical', 'fed', 'inflation'],
         'BTC': ['sec', 'regulation', 'etf', 'crypto ban', 'halving']
     }
+    RETENTION_DAYS: int = 14          # اس سے پرانی خبریں ڈیٹا بیس سے حذف
+    API_ARTICLE_LIMIT: int = 200      # /api/news میں تازہ ترین خبروں کی تعداد
 
 # --- تمام سیٹنگز کے نمونے بنانا ---
 app_settings = AppSettings()
@@ -86,6 +157,11 @@ api_settings = APISettings()
 trading_settings = TradingSettings()
 strategy_settings = StrategySettings()
 tech_settings = TechnicalAnalysisSettings()
+guardian_settings = GuardianSettings()
+websocket_settings = WebSocketSettings()
+telegram_settings = TelegramSettings()
+webhook_settings = WebhookSettings()
+cluster_settings = ClusterSettings()
 news_settings = NewsSettings()
 
 # --- اہم سیٹنگز کی موجودگی کی جانچ ---
@@ -1,17 +1,29 @@
+import base64
+import binascii
+import json
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional, NamedTuple
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, NamedTuple, Tuple
 
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
+from sqlalchemy import DateTime, Float, String, delete, desc, func, insert, literal, literal_column, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 
 # مقامی امپورٹس
-from models import ActiveSignal, CompletedTrade, CachedNews
-from schemas import DailyStatsResponse
+from models import ActiveSignal, CompletedTrade, NewsArticleRecord, NewsArticleSymbol, TradeStatsHourly, is_sqlite
+from schemas import DailyStatsResponse, StatsResponse, SymbolStats
+from signal_registry import registry
 
 logger = logging.getLogger(__name__)
 
+NEWS_ARTICLE_FIELDS = ("article_id", "title", "url", "source", "snippet", "published_at", "is_high_impact")
+
+# بیک فل کے دوران ایک upsert میں زیادہ سے زیادہ قطاریں (ڈرائیور کی پیرامیٹر حد کے اندر)
+ROLLUP_BACKFILL_CHUNK = 1000
+
 class SignalUpdateResult(NamedTuple):
     signal: ActiveSignal
     is_new: bool
@@ -32,6 +44,23 @@ def get_active_signal_by_symbol(db: Session, symbol: str) -> Optional[ActiveSign
         logger.error(f"علامت '{symbol}' کے لیے فعال سگنل حاصل کرنے میں خرابی: {e}", exc_info=True)
         return None
 
+def _new_active_signal(symbol: str, signal_data: Dict[str, Any]) -> ActiveSignal:
+    """فیوژن انجن کے نتیجے سے نیا ActiveSignal آبجیکٹ بناتا ہے (sync اور async دونوں راستوں کے لیے)۔"""
+    signal_id = f"{symbol.replace('/', '')}_{signal_data.get('timeframe', '15min')}_{int(datetime.utcnow().timestamp())}"
+    return ActiveSignal(
+        signal_id=signal_id,
+        symbol=symbol,
+        timeframe=signal_data.get('timeframe'),
+        signal_type=signal_data.get('signal'),
+        entry_price=signal_data.get('price'),
+        tp_price=signal_data.get('tp'),
+        sl_price=signal_data.get('sl'),
+        confidence=signal_data.get('confidence'),
+        reason=signal_data.get('reason'),
+        component_scores=signal_data.get('component_scores'),
+        is_new=True
+    )
+
 def add_or_update_active_signal(db: Session, signal_data: Dict[str, Any]) -> Optional[SignalUpdateResult]:
     """ڈیٹا بیس میں ایک فعال سگنل کو شامل یا اپ ڈیٹ کرتا ہے۔"""
     symbol = signal_data.get("symbol")
@@ -40,7 +69,12 @@ def add_or_update_active_signal(db: Session, signal_data: Dict[str, Any]) -> Opt
         return None
         
     try:
-        existing_signal = get_active_signal_by_symbol(db, symbol)
+        # رجسٹری مستند ہے؛ صرف اپ ڈیٹ کی صورت میں ڈیٹا بیس سے قطار لی جاتی ہے
+        if registry.is_loaded:
+            cached = registry.get_by_symbol(symbol)
+            existing_signal = db.query(ActiveSignal).filter(ActiveSignal.signal_id == cached.signal_id).first() if cached else None
+        else:
+            existing_signal = get_active_signal_by_symbol(db, symbol)
 
         if existing_signal:
             # موجودہ سگنل کو اپ ڈیٹ کریں
@@ -51,28 +85,16 @@ def add_or_update_active_signal(db: Session, signal_data: Dict[str, Any]) -> Opt
             
             db.commit()
             db.refresh(existing_signal)
+            registry.upsert(existing_signal)
             return SignalUpdateResult(signal=existing_signal, is_new=False)
         else:
             # نیا سگنل بنائیں
             logger.info(f"نیا سگنل {symbol} بنایا جا رہا ہے۔")
-            signal_id = f"{symbol.replace('/', '')}_{signal_data.get('timeframe', '15min')}_{int(datetime.utcnow().timestamp())}"
-            
-            new_signal = ActiveSignal(
-                signal_id=signal_id,
-                symbol=symbol,
-                timeframe=signal_data.get('timeframe'),
-                signal_type=signal_data.get('signal'),
-                entry_price=signal_data.get('price'),
-                tp_price=signal_data.get('tp'),
-                sl_price=signal_data.get('sl'),
-                confidence=signal_data.get('confidence'),
-                reason=signal_data.get('reason'),
-                component_scores=signal_data.get('component_scores'),
-                is_new=True
-            )
+            new_signal = _new_active_signal(symbol, signal_data)
             db.add(new_signal)
             db.commit()
             db.refresh(new_signal)
+            registry.upsert(new_signal)
             return SignalUpdateResult(signal=new_signal, is_new=True)
 
     except IntegrityError as e:
@@ -84,113 +106,464 @@ def add_or_update_active_signal(db: Session, signal_data: Dict[str, Any]) -> Opt
         db.rollback()
         return None
 
-# ★★★ یہ ہے ہمارا حتمی اور فول پروف حل ★★★
+# آرکائیو کے وقت active_signals سے completed_trades میں منتقل ہونے والے کالمز
+_ARCHIVED_COLUMNS = [
+    "signal_id", "symbol", "timeframe", "signal_type", "entry_price", "tp_price",
+    "sl_price", "confidence", "reason", "created_at",
+]
+
+def _build_archive_statements(
+    signal_ids: List[str], outcome: str, reason_for_closure: str, close_price: Optional[float], closed_at: datetime
+):
+    """
+    سگنلز کو completed_trades میں منتقل کرنے کے SQL بیانات تیار کرتا ہے۔
+    - PostgreSQL: ایک ہی بیان (WITH moved AS (DELETE ... RETURNING) INSERT ... SELECT ... RETURNING)
+    - SQLite: ایک ہی ٹرانزیکشن میں INSERT ... SELECT اور پھر DELETE ... RETURNING
+    اگر close_price نہ دی جائے تو ہر سگنل کی انٹری قیمت استعمال ہوتی ہے۔
+    Returns: بیانات کی فہرست؛ آخری بیان بند ہونے والے (signal_id, symbol) واپس کرتا ہے۔
+    """
+    target_columns = _ARCHIVED_COLUMNS + ["close_price", "reason_for_closure", "outcome", "closed_at"]
+
+    def archived_select(source):
+        return select(
+            *[source.c[name] for name in _ARCHIVED_COLUMNS],
+            source.c.entry_price if close_price is None else literal(close_price, Float),
+            literal(reason_for_closure, String),
+            literal(outcome, String),
+            literal(closed_at, DateTime),
+        )
+
+    if not is_sqlite:
+        moved = (
+            delete(ActiveSignal)
+            .where(ActiveSignal.signal_id.in_(signal_ids))
+            .returning(*[ActiveSignal.__table__.c[name] for name in _ARCHIVED_COLUMNS])
+            .cte("moved")
+        )
+        return [
+            insert(CompletedTrade)
+            .from_select(target_columns, archived_select(moved))
+            .add_cte(moved)
+            .returning(CompletedTrade.signal_id, CompletedTrade.symbol)
+        ]
+
+    active = ActiveSignal.__table__
+    return [
+        insert(CompletedTrade).from_select(
+            target_columns, archived_select(active).where(active.c.signal_id.in_(signal_ids))
+        ),
+        delete(ActiveSignal).where(ActiveSignal.signal_id.in_(signal_ids)).returning(ActiveSignal.signal_id, ActiveSignal.symbol),
+    ]
+
+def _hour_bucket(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+def _build_rollup_upsert(counts: Dict[Tuple[datetime, str, str], int]):
+    """
+    گھنٹہ وار خلاصے میں گنتی جمع کرنے کا ایک کثیر قطار upsert (ON CONFLICT DO UPDATE)۔
+    counts: {(hour, symbol, outcome): count}
+    """
+    dialect_insert = sqlite_insert if is_sqlite else pg_insert
+    statement = dialect_insert(TradeStatsHourly).values([
+        {"hour": hour, "symbol": symbol, "outcome": outcome, "trade_count": count}
+        for (hour, symbol, outcome), count in counts.items()
+    ])
+    return statement.on_conflict_do_update(
+        index_elements=["hour", "symbol", "outcome"],
+        set_={"trade_count": TradeStatsHourly.trade_count + statement.excluded.trade_count},
+    )
+
+def _archive_rollup_counts(closed_rows, outcome: str, closed_at: datetime) -> Dict[Tuple[datetime, str, str], int]:
+    hour = _hour_bucket(closed_at)
+    return dict(Counter((hour, row.symbol, outcome) for row in closed_rows))
+
+def bulk_close_and_archive_signals(
+    db: Session,
+    signal_ids: List[str],
+    outcome: str,
+    reason_for_closure: str,
+    close_price: Optional[float] = None
+) -> Optional[List[str]]:
+    """
+    کئی سگنلز کو ایک ہی اٹامک ٹرانزیکشن میں بند اور آرکائیو کرتا ہے (سگنلز کی تعداد سے قطع نظر ایک راؤنڈ ٹرپ)۔
+    Returns: بند ہونے والے signal_id کی فہرست، یا خرابی کی صورت میں None۔
+    """
+    if not signal_ids:
+        return []
+
+    logger.info(f"{len(signal_ids)} سگنلز کو ایک ٹرانزیکشن میں بند اور آرکائیو کیا جا رہا ہے۔ نتیجہ: {outcome}")
+    try:
+        closed_at = datetime.utcnow()
+        result = None
+        for statement in _build_archive_statements(signal_ids, outcome, reason_for_closure, close_price, closed_at):
+            result = db.execute(statement)
+        closed_rows = result.all()
+        closed_ids = [row.signal_id for row in closed_rows]
+        # گھنٹہ وار خلاصہ اسی ٹرانزیکشن میں اپ ڈیٹ ہوتا ہے
+        if closed_rows:
+            db.execute(_build_rollup_upsert(_archive_rollup_counts(closed_rows, outcome, closed_at)))
+        db.commit()
+        registry.remove(signal_ids)
+
+        missing = set(signal_ids) - set(closed_ids)
+        if missing:
+            logger.warning(f"بند کرنے کے لیے {len(missing)} فعال سگنلز نہیں ملے۔ شاید یہ پہلے ہی بند ہو چکے ہیں۔")
+        logger.info(f"{len(closed_ids)} سگنلز کامیابی سے ہسٹری میں منتقل ہو گئے۔")
+        return closed_ids
+
+    except SQLAlchemyError as e:
+        logger.error(f"سگنلز کو اجتماعی طور پر آرکائیو کرنے میں ڈیٹا بیس کی سنگین خرابی: {e}", exc_info=True)
+        db.rollback()
+        return None
+
 def close_and_archive_signal(db: Session, signal_id: str, outcome: str, close_price: float, reason_for_closure: str) -> bool:
     """
     ایک سگنل کو ایک محفوظ، اٹامک ٹرانزیکشن میں بند اور آرکائیو کرتا ہے۔
+    اگر سگنل موجود نہ ہو (پہلے ہی بند ہو چکا ہو) تو بھی کامیاب مانا جاتا ہے۔
     """
-    signal_to_archive = db.query(ActiveSignal).filter(ActiveSignal.signal_id == signal_id).first()
-    
-    if not signal_to_archive:
-        logger.warning(f"بند کرنے کے لیے فعال سگنل {signal_id} نہیں ملا۔ شاید یہ پہلے ہی بند ہو چکا ہے۔")
-        return True # اگر سگنل موجود نہیں، تو ہم اسے کامیاب مانیں گے
+    closed_ids = bulk_close_and_archive_signals(db, [signal_id], outcome, reason_for_closure, close_price)
+    return closed_ids is not None
+
+class HistoryPage(NamedTuple):
+    trades: List[Dict[str, Any]]
+    next_cursor: Optional[str]
+
+HISTORY_FIELDS = tuple(c.name for c in CompletedTrade.__table__.columns)
+MAX_HISTORY_PAGE_SIZE = 500
 
-    logger.info(f"سگنل {signal_id} کو بند اور آرکائیو کیا جا رہا ہے۔ نتیجہ: {outcome}")
-    
+def encode_history_cursor(closed_at: datetime, trade_id: int) -> str:
+    """(closed_at, id) کو ایک مبہم URL-محفوظ کرسر میں بدلتا ہے۔"""
+    raw = json.dumps([closed_at.isoformat(), trade_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_history_cursor(cursor: str) -> Tuple[datetime, int]:
+    """کرسر کو (closed_at, id) میں واپس بدلتا ہے۔ غلط کرسر پر ValueError۔"""
     try:
-        # مرحلہ 1: ایک نیا مکمل شدہ ٹریڈ آبجیکٹ بنائیں
-        completed_trade = CompletedTrade(
-            signal_id=signal_to_archive.signal_id,
-            symbol=signal_to_archive.symbol,
-            timeframe=signal_to_archive.timeframe,
-            signal_type=signal_to_archive.signal_type,
-            entry_price=signal_to_archive.entry_price,
-            tp_price=signal_to_archive.tp_price,
-            sl_price=signal_to_archive.sl_price,
-            close_price=close_price,
-            reason_for_closure=reason_for_closure,
-            outcome=outcome,
-            confidence=signal_to_archive.confidence,
-            reason=signal_to_archive.reason,
-            created_at=signal_to_archive.created_at,
-            closed_at=datetime.utcnow()
+        padded = cursor + "=" * (-len(cursor) % 4)
+        closed_at, trade_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(closed_at), int(trade_id)
+    except (TypeError, ValueError, binascii.Error, json.JSONDecodeError) as e:
+        raise ValueError(f"غلط کرسر: {cursor}") from e
+
+def _build_history_statement(
+    limit: int,
+    cursor: Optional[str] = None,
+    symbol: Optional[str] = None,
+    outcome: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    fields: Optional[List[str]] = None,
+):
+    """
+    (closed_at, id) پر keyset صفحہ بندی: ہر صفحہ انڈیکس پر ایک ہی رینج اسکین ہے، OFFSET نہیں،
+    اس لیے ٹیبل کتنی بھی بڑی ہو صفحے کی لاگت یکساں رہتی ہے۔ اگلا صفحہ ہے یا نہیں، یہ جاننے کے لیے limit + 1 قطاریں۔
+    """
+    unknown = set(fields or []) - set(HISTORY_FIELDS)
+    if unknown:
+        raise ValueError(f"نامعلوم فیلڈز: {sorted(unknown)}")
+    selected = [CompletedTrade.__table__.c[name] for name in (fields or HISTORY_FIELDS)]
+    for key_column in (CompletedTrade.closed_at, CompletedTrade.id):
+        if key_column.name not in (fields or HISTORY_FIELDS):
+            selected.append(key_column)
+
+    statement = select(*selected).where(CompletedTrade.closed_at.is_not(None))
+    if cursor:
+        cursor_closed_at, cursor_id = decode_history_cursor(cursor)
+        statement = statement.where(
+            tuple_(CompletedTrade.closed_at, CompletedTrade.id) < tuple_(literal(cursor_closed_at, DateTime), cursor_id)
         )
-        
-        # مرحلہ 2: اسے سیشن میں شامل کریں
-        db.add(completed_trade)
-        
-        # مرحلہ 3: پرانے فعال سگنل کو ڈیلیٹ کریں
-        db.delete(signal_to_archive)
-        
-        # مرحلہ 4: تمام تبدیلیوں کو ایک ساتھ محفوظ کریں (اٹامک کمٹ)
-        db.commit()
-        
-        logger.info(f"سگنل {signal_id} کامیابی سے ہسٹری میں منتقل ہو گیا۔")
-        return True
+    if symbol:
+        statement = statement.where(CompletedTrade.symbol == symbol)
+    if outcome:
+        statement = statement.where(CompletedTrade.outcome == outcome)
+    if start:
+        statement = statement.where(CompletedTrade.closed_at >= start)
+    if end:
+        statement = statement.where(CompletedTrade.closed_at < end)
+    return statement.order_by(desc(CompletedTrade.closed_at), desc(CompletedTrade.id)).limit(limit + 1)
+
+def _history_trade(row, names) -> Dict[str, Any]:
+    trade = {}
+    for name in names:
+        value = row._mapping[name]
+        trade[name] = value.isoformat() if isinstance(value, datetime) else value
+    return trade
 
+def _build_history_page(rows, limit: int, fields: Optional[List[str]]) -> HistoryPage:
+    names = fields or HISTORY_FIELDS
+    trades = [_history_trade(row, names) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]._mapping
+        next_cursor = encode_history_cursor(last["closed_at"], last["id"])
+    return HistoryPage(trades=trades, next_cursor=next_cursor)
+
+def get_completed_trades_page(
+    db: Session, limit: int = 100, cursor: Optional[str] = None, symbol: Optional[str] = None,
+    outcome: Optional[str] = None, start: Optional[datetime] = None, end: Optional[datetime] = None,
+    fields: Optional[List[str]] = None,
+) -> HistoryPage:
+    """
+    مکمل شدہ ٹریڈز کا ایک صفحہ (تازہ ترین پہلے)، فلٹرز اور فیلڈ کے انتخاب کے ساتھ۔
+    غلط کرسر یا فیلڈ پر ValueError۔
+    """
+    limit = max(1, min(limit, MAX_HISTORY_PAGE_SIZE))
+    statement = _build_history_statement(limit, cursor, symbol, outcome, start, end, fields)
+    try:
+        return _build_history_page(db.execute(statement).all(), limit, fields)
     except SQLAlchemyError as e:
-        logger.error(f"سگنل {signal_id} کو آرکائیو کرنے میں ڈیٹا بیس کی سنگین خرابی: {e}", exc_info=True)
-        # اگر کوئی بھی خرابی ہو تو تمام تبدیلیوں کو واپس لے لیں
-        db.rollback()
-        return False
+        logger.error(f"مکمل شدہ ٹریڈز حاصل کرنے میں خرابی: {e}", exc_info=True)
+        return HistoryPage(trades=[], next_cursor=None)
 
 def get_completed_trades(db: Session, limit: int = 100) -> List[Dict[str, Any]]:
-    """مکمل شدہ ٹریڈز کی تاریخ حاصل کرتا ہے۔"""
+    """مکمل شدہ ٹریڈز کی تاریخ حاصل کرتا ہے (تازہ ترین صفحہ)۔"""
+    return get_completed_trades_page(db, limit=limit).trades
+
+def _build_trades_for_signals_statement(signal_ids: List[str]):
+    """ابھی بند ہونے والے سگنلز کی completed_trades قطاریں (تازہ ترین پہلے، /api/history کی ترتیب)۔"""
+    return (
+        select(*CompletedTrade.__table__.columns)
+        .where(CompletedTrade.signal_id.in_(signal_ids))
+        .order_by(desc(CompletedTrade.closed_at), desc(CompletedTrade.id))
+    )
+
+def get_completed_trades_for_signals(db: Session, signal_ids: List[str]) -> List[Dict[str, Any]]:
+    """دیے گئے سگنلز کے مکمل شدہ ٹریڈز، /api/history والی شکل میں۔"""
+    if not signal_ids:
+        return []
     try:
-        trades = db.query(CompletedTrade).order_by(desc(CompletedTrade.closed_at)).limit(limit).all()
-        return [trade.as_dict() for trade in trades]
+        rows = db.execute(_build_trades_for_signals_statement(signal_ids)).all()
     except SQLAlchemyError as e:
-        logger.error(f"مکمل شدہ ٹریڈز حاصل کرنے میں خرابی: {e}", exc_info=True)
+        logger.error(f"بند شدہ ٹریڈز حاصل کرنے میں خرابی: {e}", exc_info=True)
         return []
+    return [_history_trade(row, HISTORY_FIELDS) for row in rows]
+
+def _build_stats_statement(start: datetime, end: datetime, symbol: Optional[str] = None):
+    """[start, end) کے گھنٹوں کی (symbol, outcome) گنتی، گھنٹہ وار خلاصے سے ایک انڈیکسڈ کوئری میں۔"""
+    statement = (
+        select(TradeStatsHourly.symbol, TradeStatsHourly.outcome, func.sum(TradeStatsHourly.trade_count))
+        .where(TradeStatsHourly.hour >= _hour_bucket(start), TradeStatsHourly.hour < end)
+        .group_by(TradeStatsHourly.symbol, TradeStatsHourly.outcome)
+    )
+    if symbol:
+        statement = statement.where(TradeStatsHourly.symbol == symbol)
+    return statement
+
+def _outcome_totals(counts: Dict[str, int]) -> Dict[str, Any]:
+    tp_hits = counts.get("tp_hit", 0)
+    sl_hits = counts.get("sl_hit", 0)
+    decided = tp_hits + sl_hits
+    return {
+        "tp_hits": tp_hits,
+        "sl_hits": sl_hits,
+        "other_closures": sum(counts.values()) - decided,
+        "win_rate": round(tp_hits / decided * 100, 2) if decided > 0 else 0.0,
+    }
+
+def _build_stats_response(rows, start: datetime, end: datetime) -> StatsResponse:
+    by_symbol: Dict[str, Counter] = defaultdict(Counter)
+    totals: Counter = Counter()
+    for symbol, outcome, count in rows:
+        by_symbol[symbol][outcome] += int(count or 0)
+        totals[outcome] += int(count or 0)
+    return StatsResponse(
+        start=_hour_bucket(start),
+        end=end,
+        **_outcome_totals(totals),
+        by_symbol=[SymbolStats(symbol=symbol, **_outcome_totals(counts)) for symbol, counts in sorted(by_symbol.items())],
+    )
+
+def today_range() -> Tuple[datetime, datetime]:
+    now = datetime.utcnow()
+    return now.replace(hour=0, minute=0, second=0, microsecond=0), now + timedelta(hours=1)
+
+def _daily_stats_from(stats: StatsResponse, live_signals: int) -> DailyStatsResponse:
+    """روزانہ کے اعداد و شمار: آج کے StatsResponse کی ایک سستی شکل۔"""
+    return DailyStatsResponse(
+        tp_hits_today=stats.tp_hits,
+        sl_hits_today=stats.sl_hits,
+        live_signals=live_signals,
+        win_rate_today=stats.win_rate
+    )
+
+def get_stats(db: Session, start: datetime, end: datetime, symbol: Optional[str] = None) -> Optional[StatsResponse]:
+    """کسی بھی وقت کی حد کے لیے کل اور فی علامت اعداد و شمار۔"""
+    try:
+        return _build_stats_response(db.execute(_build_stats_statement(start, end, symbol)).all(), start, end)
+    except SQLAlchemyError as e:
+        logger.error(f"اعداد و شمار حاصل کرنے میں خرابی: {e}", exc_info=True)
+        return None
 
 def get_daily_stats(db: Session) -> DailyStatsResponse:
     """روزانہ کے اعداد و شمار حاصل کرتا ہے۔"""
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    
+    stats = get_stats(db, *today_range())
+    if stats is None:
+        return DailyStatsResponse(tp_hits_today=0, sl_hits_today=0, live_signals=0, win_rate_today=0)
+    live_signals = registry.count() if registry.is_loaded else (db.query(func.count(ActiveSignal.id)).scalar() or 0)
+    return _daily_stats_from(stats, live_signals)
+
+def _build_rollup_backfill_select():
+    """completed_trades سے (گھنٹہ، علامت، نتیجہ) کی گنتی۔"""
+    if is_sqlite:
+        hour = func.strftime("%Y-%m-%d %H:00:00", CompletedTrade.closed_at)
+    else:
+        # literal تاکہ SELECT اور GROUP BY میں ایک ہی اظہار بنے (الگ bind پیرامیٹرز نہیں)
+        hour = func.date_trunc(literal_column("'hour'"), CompletedTrade.closed_at)
+    return (
+        select(hour, CompletedTrade.symbol, CompletedTrade.outcome, func.count(CompletedTrade.id))
+        .where(CompletedTrade.closed_at.is_not(None))
+        .group_by(hour, CompletedTrade.symbol, CompletedTrade.outcome)
+    )
+
+def backfill_trade_stats_rollup(db: Session) -> int:
+    """
+    اگر گھنٹہ وار خلاصہ خالی ہو (پہلی بار یا نئی ٹیبل) تو اسے موجودہ completed_trades سے بھرتا ہے۔
+    Returns: شامل کی گئی خلاصہ قطاروں کی تعداد۔
+    """
     try:
-        tp_hits = db.query(func.count(CompletedTrade.id)).filter(
-            CompletedTrade.outcome == 'tp_hit',
-            CompletedTrade.closed_at >= today_start
-        ).scalar() or 0
-        
-        sl_hits = db.query(func.count(CompletedTrade.id)).filter(
-            CompletedTrade.outcome == 'sl_hit',
-            CompletedTrade.closed_at >= today_start
-        ).scalar() or 0
-        
-        live_signals = db.query(func.count(ActiveSignal.id)).scalar() or 0
-        
-        total_today = tp_hits + sl_hits
-        win_rate = (tp_hits / total_today * 100) if total_today > 0 else 0
-        
-        return DailyStatsResponse(
-            tp_hits_today=tp_hits,
-            sl_hits_today=sl_hits,
-            live_signals=live_signals,
-            win_rate_today=round(win_rate, 2)
-        )
+        if db.execute(select(TradeStatsHourly.hour).limit(1)).first() is not None:
+            return 0
+        counts: Dict[Tuple[datetime, str, str], int] = Counter()
+        for hour, symbol, outcome, count in db.execute(_build_rollup_backfill_select()).all():
+            hour = datetime.fromisoformat(hour) if isinstance(hour, str) else hour
+            counts[(hour, symbol, outcome or "unknown")] += count
+        if not counts:
+            return 0
+        items = list(counts.items())
+        for i in range(0, len(items), ROLLUP_BACKFILL_CHUNK):
+            db.execute(_build_rollup_upsert(dict(items[i:i + ROLLUP_BACKFILL_CHUNK])))
+        db.commit()
+        logger.info(f"📊 گھنٹہ وار خلاصہ completed_trades سے بھرا گیا: {len(counts)} قطاریں۔")
+        return len(counts)
     except SQLAlchemyError as e:
-        logger.error(f"روزانہ کے اعداد و شمار حاصل کرنے میں خرابی: {e}", exc_info=True)
-        return DailyStatsResponse(tp_hits_today=0, sl_hits_today=0, live_signals=0, win_rate_today=0)
+        logger.error(f"گھنٹہ وار خلاصہ بھرنے میں خرابی: {e}", exc_info=True)
+        db.rollback()
+        return 0
+
+def _build_news_upsert_statements(articles: List[Dict[str, Any]]):
+    """
+    خبروں کا upsert: article_id پر منفرد، اس لیے دوبارہ آنے والی خبر اپ ڈیٹ ہوتی ہے، نقل نہیں بنتی۔
+    """
+    dialect_insert = sqlite_insert if is_sqlite else pg_insert
+    fetched_at = datetime.utcnow()
+    article_rows = [
+        {key: article[key] for key in NEWS_ARTICLE_FIELDS} | {"fetched_at": fetched_at}
+        for article in articles
+    ]
+    article_statement = dialect_insert(NewsArticleRecord).values(article_rows)
+    article_statement = article_statement.on_conflict_do_update(
+        index_elements=["article_id"],
+        set_={key: article_statement.excluded[key] for key in NEWS_ARTICLE_FIELDS if key != "article_id"}
+        | {"fetched_at": article_statement.excluded.fetched_at},
+    )
+    # علامتوں کے ربط ہر بار نئے سرے سے لکھے جاتے ہیں تاکہ خبر کی علامتیں بدلیں تو پرانے ربط باقی نہ رہیں
+    statements = [
+        article_statement,
+        delete(NewsArticleSymbol).where(NewsArticleSymbol.article_id.in_([a["article_id"] for a in articles])),
+    ]
+    symbol_rows = [
+        {"article_id": a["article_id"], "symbol": symbol, "is_high_impact": a["is_high_impact"], "published_at": a["published_at"]}
+        for a in articles for symbol in set(a["symbols"])
+    ]
+    if symbol_rows:
+        statements.append(insert(NewsArticleSymbol).values(symbol_rows))
+    return statements
+
+def _build_news_prune_statements(before: datetime):
+    return [
+        delete(NewsArticleSymbol).where(NewsArticleSymbol.published_at < before),
+        delete(NewsArticleRecord).where(NewsArticleRecord.published_at < before),
+    ]
+
+def _build_high_impact_news_statement(symbols: List[str], start: datetime, end: datetime):
+    """
+    [start, end] میں ان علامتوں کی پہلی اعلیٰ اثر والی خبر کا عنوان (ایک انڈیکس رینج، LIMIT 1)۔
+    NULL عنوان '' بن جاتا ہے، تاکہ ملی ہوئی خبر کا scalar کبھی None ("کوئی خبر نہیں") نہ ہو۔
+    """
+    return (
+        select(func.coalesce(NewsArticleRecord.title, ""))
+        .join(NewsArticleSymbol, NewsArticleSymbol.article_id == NewsArticleRecord.article_id)
+        .where(
+            NewsArticleSymbol.symbol.in_(symbols),
+            NewsArticleSymbol.is_high_impact.is_(True),
+            NewsArticleSymbol.published_at >= start,
+            NewsArticleSymbol.published_at <= end,
+        )
+        .order_by(NewsArticleSymbol.published_at)
+        .limit(1)
+    )
+
+def _build_high_impact_events_statement():
+    return (
+        select(NewsArticleSymbol.symbol, NewsArticleSymbol.published_at, NewsArticleRecord.title)
+        .join(NewsArticleRecord, NewsArticleRecord.article_id == NewsArticleSymbol.article_id)
+        .where(NewsArticleSymbol.is_high_impact.is_(True))
+    )
+
+def _build_recent_news_statement(limit: int):
+    latest = select(NewsArticleRecord.article_id).order_by(desc(NewsArticleRecord.published_at)).limit(limit)
+    return (
+        select(NewsArticleRecord, NewsArticleSymbol.symbol)
+        .join(NewsArticleSymbol, NewsArticleSymbol.article_id == NewsArticleRecord.article_id)
+        .where(NewsArticleRecord.article_id.in_(latest.scalar_subquery()))
+        .order_by(desc(NewsArticleRecord.published_at))
+    )
 
-def update_news_cache_in_db(db: Session, news_data: Dict[str, Any]) -> None:
-    """نیوز کیش کو ڈیٹا بیس میں اپ ڈیٹ کرتا ہے۔"""
+def _build_news_by_symbol(rows) -> Dict[str, List[Dict[str, Any]]]:
+    articles_by_symbol: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    symbols_by_article: Dict[str, List[str]] = defaultdict(list)
+    for article, symbol in rows:
+        symbols_by_article[article.article_id].append(symbol)
+    for article, symbol in rows:
+        articles_by_symbol[symbol].append({
+            "title": article.title or "",
+            "url": article.url or "",
+            "source": article.source or "",
+            "snippet": article.snippet or "",
+            "published_at": article.published_at.replace(tzinfo=timezone.utc).isoformat() if article.published_at else "",
+            "impact": "High" if article.is_high_impact else "Low",
+            "entities": symbols_by_article[article.article_id],
+        })
+    return dict(articles_by_symbol)
+
+def upsert_news_articles(db: Session, articles: List[Dict[str, Any]], retention_days: int) -> bool:
+    """خبروں کو محفوظ کرتا ہے اور retention_days سے پرانی خبریں اسی ٹرانزیکشن میں حذف کرتا ہے۔"""
+    if not articles:
+        return True
     try:
-        db.query(CachedNews).delete()
-        new_news = CachedNews(content=news_data, updated_at=datetime.utcnow())
-        db.add(new_news)
+        for statement in _build_news_upsert_statements(articles):
+            db.execute(statement)
+        for statement in _build_news_prune_statements(datetime.utcnow() - timedelta(days=retention_days)):
+            db.execute(statement)
         db.commit()
+        return True
     except SQLAlchemyError as e:
-        logger.error(f"نیوز کیش اپ ڈیٹ کرنے میں خرابی: {e}", exc_info=True)
+        logger.error(f"خبریں محفوظ کرنے میں خرابی: {e}", exc_info=True)
         db.rollback()
+        return False
+
+def find_high_impact_news(db: Session, symbols: List[str], start: datetime, end: datetime) -> Optional[str]:
+    """ان علامتوں کی [start, end] میں کوئی اعلیٰ اثر والی خبر ہو تو اس کا عنوان (بغیر عنوان کے '')، ورنہ None۔"""
+    try:
+        return db.execute(_build_high_impact_news_statement(symbols, start, end)).scalar()
+    except SQLAlchemyError as e:
+        logger.error(f"اعلیٰ اثر والی خبریں تلاش کرنے میں خرابی: {e}", exc_info=True)
+        return None
+
+def get_high_impact_news_events(db: Session) -> Optional[List[Tuple[str, datetime, str]]]:
+    """news_index کے لیے تمام اعلیٰ اثر والی خبریں: (symbol, published_at, title)۔"""
+    try:
+        return [tuple(row) for row in db.execute(_build_high_impact_events_statement()).all()]
+    except SQLAlchemyError as e:
+        logger.error(f"اعلیٰ اثر والی خبریں بازیافت کرنے میں خرابی: {e}", exc_info=True)
+        return None
 
-def get_cached_news(db: Session) -> Optional[Dict[str, Any]]:
-    """کیش شدہ خبریں ڈیٹا بیس سے حاصل کرتا ہے۔"""
+def get_recent_news_by_symbol(db: Session, limit: int) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+    """تازہ ترین خبریں، علامت کے لحاظ سے گروپ شدہ (/api/news کی ساخت میں)۔"""
     try:
-        news = db.query(CachedNews).order_by(desc(CachedNews.updated_at)).first()
-        return news.content if news else None
+        return _build_news_by_symbol(db.execute(_build_recent_news_statement(limit)).all())
     except SQLAlchemyError as e:
-        logger.error(f"کیش شدہ خبریں بازیافت کرنے میں خرابی: {e}", exc_info=True)
+        logger.error(f"خبریں بازیافت کرنے میں خرابی: {e}", exc_info=True)
         return None
 
 def get_recent_sl_hits(db: Session, minutes_ago: int) -> List[CompletedTrade]:
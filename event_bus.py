@@ -0,0 +1,255 @@
+# filename: event_bus.py
+
+"""
+gunicorn ورکرز کے درمیان نشریات کی ایونٹ بس۔
+
+ہر ورکر اپنے WebSocket کلائنٹس، رجسٹری اور جوابی کیش رکھتا ہے، لیکن سگنل صرف لیڈر ورکر (جو شیڈیولر چلاتا ہے)
+بناتا اور بند کرتا ہے۔ manager.broadcast پیغام کو بس پر شائع کرتا ہے؛ بس اسے شائع کرنے والے ورکر میں فوراً
+(remote=False) اور باقی تمام ورکرز میں (remote=True) اسی ہینڈلر تک پہنچاتی ہے۔
+
+بیک اینڈز:
+- InProcessEventBus: ایک ہی پروسیس (SQLite، اسکرپٹس، ٹیسٹ)۔
+- PostgresEventBus: پوسٹگریس LISTEN/NOTIFY، ایک مخصوص asyncpg کنکشن پر۔ NOTIFY کی 8000 بائٹ کی حد سے بڑے
+  پیغامات ٹکڑوں میں بھیج کر دوسری طرف جوڑے جاتے ہیں۔ کنکشن ٹوٹنے پر دوبارہ جڑتا ہے اور resync ہینڈلر چلاتا
+  ہے، کیونکہ اس دوران کے پیغامات ضائع ہو چکے ہوتے ہیں۔
+"""
+
+import asyncio
+import base64
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import orjson
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from config import cluster_settings
+from models import async_engine, is_sqlite
+
+logger = logging.getLogger(__name__)
+
+# اس پروسیس کی پہچان؛ اپنے ہی NOTIFY واپس آئیں تو انہیں نظر انداز کیا جاتا ہے
+WORKER_ID = uuid.uuid4().hex
+NOTIFY_PAYLOAD_LIMIT = 7900    # پوسٹگریس کی حد 8000 بائٹس
+CHUNK_BYTES = 5000             # base64 کے بعد ~6700 حروف، لفافے سمیت حد کے اندر
+CHUNK_TTL_SECONDS = 60.0       # ادھورے ٹکڑے اتنی دیر بعد ضائع
+RECONNECT_SECONDS = 5.0
+
+# (message, remote) -> None
+EventHandler = Callable[[Dict[str, Any], bool], Awaitable[None]]
+ResyncHandler = Callable[[], Awaitable[None]]
+
+class EventBus:
+    """ایونٹ بس کا انٹرفیس۔"""
+    name = "base"
+
+    def __init__(self):
+        self._handler: Optional[EventHandler] = None
+        self.published = 0
+        self.received = 0
+
+    async def start(self, handler: EventHandler, on_resync: Optional[ResyncHandler] = None):
+        self._handler = handler
+
+    async def stop(self):
+        self._handler = None
+
+    async def publish(self, message: Dict[str, Any]):
+        raise NotImplementedError
+
+    async def _deliver(self, message: Dict[str, Any], remote: bool):
+        if self._handler is None:
+            return
+        try:
+            await self._handler(message, remote)
+        except Exception as e:
+            logger.error(f"🚌 ایونٹ بس کا پیغام '{message.get('type')}' پروسیس کرنے میں خرابی: {e}", exc_info=True)
+
+    def get_status(self) -> Dict[str, Any]:
+        return {"backend": self.name, "worker_id": WORKER_ID, "published": self.published, "received": self.received}
+
+class InProcessEventBus(EventBus):
+    """ایک ہی پروسیس: شائع کردہ پیغام سیدھا ہینڈلر کو۔"""
+    name = "memory"
+
+    async def publish(self, message: Dict[str, Any]):
+        self.published += 1
+        await self._deliver(message, remote=False)
+
+class PostgresEventBus(EventBus):
+    """پوسٹگریس LISTEN/NOTIFY پر ورکرز کے درمیان بس۔"""
+    name = "postgres"
+
+    def __init__(self, channel: str = cluster_settings.EVENT_BUS_CHANNEL):
+        super().__init__()
+        self.channel = channel
+        self._on_resync: Optional[ResyncHandler] = None
+        self._connection: Optional[AsyncConnection] = None
+        self._driver = None
+        # asyncpg کنکشن پر ایک وقت میں ایک ہی کوئری
+        self._send_lock = asyncio.Lock()
+        # آنے والے پیغامات ترتیب سے ایک ہی ٹاسک میں پروسیس ہوتے ہیں
+        self._inbox: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        self._consumer_task: Optional[asyncio.Task] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._chunks: Dict[str, Dict[str, Any]] = {}
+        self._stopping = False
+        self.reconnects = 0
+
+    async def start(self, handler: EventHandler, on_resync: Optional[ResyncHandler] = None):
+        await super().start(handler, on_resync)
+        self._on_resync = on_resync
+        self._stopping = False
+        self._consumer_task = asyncio.create_task(self._consume())
+        try:
+            await self._listen()
+        except Exception as e:
+            logger.error(f"🚌 ایونٹ بس ('{self.channel}') سے جڑنے میں ناکامی: {e}۔ دوبارہ کوشش کی جائے گی۔")
+            self._schedule_reconnect()
+
+    async def stop(self):
+        self._stopping = True
+        for task in (self._reconnect_task, self._consumer_task):
+            if task:
+                task.cancel()
+        await self._close_connection()
+        await super().stop()
+
+    async def _listen(self):
+        self._connection = await async_engine.connect()
+        raw = await self._connection.get_raw_connection()
+        self._driver = raw.driver_connection
+        await self._driver.add_listener(self.channel, self._on_notify)
+        self._driver.add_termination_listener(self._on_terminated)
+        logger.info(f"🚌 ایونٹ بس پوسٹگریس چینل '{self.channel}' سن رہی ہے (ورکر {WORKER_ID[:8]})۔")
+
+    async def _close_connection(self):
+        connection, self._connection, self._driver = self._connection, None, None
+        if connection is None:
+            return
+        try:
+            # LISTEN والا کنکشن پول میں واپس نہ جائے
+            await connection.invalidate()
+            await connection.close()
+        except Exception:
+            pass
+
+    def _on_terminated(self, _connection):
+        if not self._stopping:
+            logger.warning("🚌 ایونٹ بس کا کنکشن ٹوٹ گیا؛ دوبارہ جڑا جا رہا ہے۔")
+            self._schedule_reconnect()
+
+    def _schedule_reconnect(self):
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        await self._close_connection()
+        while not self._stopping:
+            await asyncio.sleep(RECONNECT_SECONDS)
+            try:
+                await self._listen()
+            except Exception as e:
+                logger.warning(f"🚌 ایونٹ بس سے دوبارہ جڑنے میں ناکامی: {e}")
+                await self._close_connection()
+                continue
+            self.reconnects += 1
+            # منقطع رہنے کے دوران کے پیغامات نہیں ملے؛ مقامی حالت ڈیٹا بیس سے دوبارہ بنے
+            if self._on_resync:
+                try:
+                    await self._on_resync()
+                except Exception as e:
+                    logger.error(f"🚌 ایونٹ بس کی resync میں خرابی: {e}", exc_info=True)
+            return
+
+    # --- شائع کرنا ---
+
+    def _payloads(self, message: Dict[str, Any]) -> List[str]:
+        envelope = orjson.dumps({"origin": WORKER_ID, "message": message}, default=str)
+        if len(envelope) <= NOTIFY_PAYLOAD_LIMIT:
+            return [envelope.decode("utf-8")]
+        body = orjson.dumps(message, default=str)
+        chunk_id = uuid.uuid4().hex
+        parts = [body[i:i + CHUNK_BYTES] for i in range(0, len(body), CHUNK_BYTES)]
+        return [
+            orjson.dumps({
+                "origin": WORKER_ID,
+                "chunk": {"id": chunk_id, "index": i, "total": len(parts), "data": base64.b64encode(part).decode("ascii")},
+            }).decode("utf-8")
+            for i, part in enumerate(parts)
+        ]
+
+    async def publish(self, message: Dict[str, Any]):
+        """پہلے اس ورکر میں فوراً، پھر NOTIFY کے ذریعے باقی ورکرز میں۔ بس کی ناکامی مقامی ترسیل نہیں روکتی۔"""
+        self.published += 1
+        await self._deliver(message, remote=False)
+        if self._driver is None:
+            logger.warning(f"🚌 ایونٹ بس منقطع ہے؛ '{message.get('type')}' صرف اس ورکر تک پہنچا۔")
+            return
+        try:
+            async with self._send_lock:
+                for payload in self._payloads(message):
+                    await self._driver.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+        except Exception as e:
+            logger.error(f"🚌 ایونٹ بس پر '{message.get('type')}' شائع کرنے میں ناکامی: {e}")
+
+    # --- وصول کرنا ---
+
+    def _on_notify(self, _connection, _pid, _channel, payload: str):
+        try:
+            envelope = orjson.loads(payload)
+        except orjson.JSONDecodeError:
+            logger.warning("🚌 ایونٹ بس پر ناقابلِ فہم پیغام نظر انداز کیا گیا۔")
+            return
+        if envelope.get("origin") == WORKER_ID:
+            return
+        if "chunk" in envelope:
+            message = self._assemble(envelope["chunk"])
+            if message is None:
+                return
+        else:
+            message = envelope.get("message")
+        if isinstance(message, dict):
+            self._inbox.put_nowait(message)
+
+    def _assemble(self, chunk: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        for stale_id in [cid for cid, entry in self._chunks.items() if now - entry["started"] > CHUNK_TTL_SECONDS]:
+            del self._chunks[stale_id]
+        entry = self._chunks.setdefault(chunk["id"], {"started": now, "parts": {}})
+        entry["parts"][chunk["index"]] = base64.b64decode(chunk["data"])
+        if len(entry["parts"]) < chunk["total"]:
+            return None
+        del self._chunks[chunk["id"]]
+        return orjson.loads(b"".join(entry["parts"][i] for i in range(chunk["total"])))
+
+    async def _consume(self):
+        while True:
+            message = await self._inbox.get()
+            self.received += 1
+            await self._deliver(message, remote=True)
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            **super().get_status(),
+            "channel": self.channel,
+            "connected": self._driver is not None,
+            "reconnects": self.reconnects,
+            "inbox": self._inbox.qsize(),
+        }
+
+def create_event_bus(backend: str = cluster_settings.EVENT_BUS_BACKEND) -> EventBus:
+    """سیٹنگز کے مطابق بیک اینڈ؛ SQLite پر LISTEN/NOTIFY موجود نہیں، اس لیے ہمیشہ پروسیس کے اندر۔"""
+    if backend == "auto":
+        backend = "memory" if is_sqlite else "postgres"
+    if backend == "postgres" and is_sqlite:
+        logger.warning("🚌 SQLite پر پوسٹگریس ایونٹ بس ممکن نہیں؛ پروسیس کے اندر والی بس استعمال ہوگی۔")
+        backend = "memory"
+    if backend not in ("memory", "postgres"):
+        logger.warning(f"🚌 نامعلوم ایونٹ بس بیک اینڈ '{backend}'، پروسیس کے اندر والی بس استعمال ہوگی۔")
+        backend = "memory"
+    return PostgresEventBus() if backend == "postgres" else InProcessEventBus()
+
+# بس کا عالمی نمونہ؛ app.py اسٹارٹ اپ پر اسے شروع کرتا ہے
+event_bus = create_event_bus()
@@ -1,42 +1,99 @@
 import asyncio
 import logging
-from contextlib import contextmanager
-from typing import List, Dict, Any, Generator
-from datetime import datetime
-
-from sqlalchemy.orm import Session
-
-import database_crud as crud
-from models import SessionLocal, ActiveSignal
-from utils import get_real_time_quotes
+import math
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime, timezone
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import async_crud
+from models import AsyncSessionLocal
+from signal_registry import registry, ActiveSignalSnapshot
+from utils import get_real_time_quotes, fetch_twelve_data_ohlc
+from schemas import Candle
+from level_analyzer import resolve_intrabar_outcome
+from config import guardian_settings
+from guardian_scheduler import guardian_scheduler, timeframe_to_timedelta
 from websocket_manager import manager
+from price_stream import publish_quotes
 from trainerai import learn_from_outcome
 from roster_manager import get_forex_pairs, get_crypto_pairs
 
 logger = logging.getLogger(__name__)
 
-@contextmanager
-def get_db_session() -> Generator[Session, None, None]:
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# ہر سگنل کی آخری کامیاب جانچ کا وقت (UTC)، تاکہ صرف اس کے بعد بند ہونے والی کینڈلز لی جائیں
+_last_checked_at: Dict[str, datetime] = {}
+
+def _window_start(signal: ActiveSignalSnapshot) -> datetime:
+    return _last_checked_at.get(signal.signal_id, signal.created_at)
+
+def _has_closed_bar_since_last_check(signal: ActiveSignalSnapshot, now: datetime) -> bool:
+    """کیا پچھلی جانچ کے بعد کم از کم ایک کینڈل بند ہوئی ہے؟"""
+    tf_seconds = timeframe_to_timedelta(signal.timeframe).total_seconds()
+    now_ts = now.replace(tzinfo=timezone.utc).timestamp()
+    last_bar_close = (now_ts // tf_seconds) * tf_seconds
+    return last_bar_close > _window_start(signal).replace(tzinfo=timezone.utc).timestamp()
+
+async def _fetch_closed_candles(signal: ActiveSignalSnapshot, now: datetime) -> Optional[List[Candle]]:
+    """پچھلی جانچ کے بعد بند ہونے والی کینڈلز ایک ہی درخواست میں حاصل کرتا ہے۔"""
+    timeframe = signal.timeframe or "15min"
+    tf = timeframe_to_timedelta(timeframe)
+    needed = math.ceil((now - _window_start(signal)) / tf) + 1
+    count = max(2, min(needed, guardian_settings.INTRABAR_MAX_CANDLES))
+    return await fetch_twelve_data_ohlc(signal.symbol, timeframe, count)
+
+def _resolve_from_candles(signal: ActiveSignalSnapshot, candles: List[Candle]) -> Tuple[Optional[str], Optional[float]]:
+    """
+    سگنل بننے کے بعد شروع ہونے والی اور پچھلی جانچ کے بعد بند ہونے والی کینڈلز میں پہلی TP/SL ہٹ تلاش کرتا ہے۔
+    """
+    tf = timeframe_to_timedelta(signal.timeframe)
+    window_start = _window_start(signal)
+    for candle in candles:
+        bar_start = candle.datetime.replace(tzinfo=None)
+        if bar_start < signal.created_at or bar_start + tf <= window_start:
+            continue
+        outcome = resolve_intrabar_outcome(
+            signal.signal_type, signal.tp_price, signal.sl_price,
+            candle.open, candle.high, candle.low, guardian_settings.INTRABAR_AMBIGUITY_POLICY
+        )
+        if outcome:
+            logger.info(f"🕯️ [{signal.symbol}] کینڈل {bar_start.isoformat()} (H: {candle.high}, L: {candle.low}) میں {outcome.upper()}۔")
+            return outcome, signal.tp_price if outcome == "tp_hit" else signal.sl_price
+    return None, None
+
+def _resolve_from_price(signal: ActiveSignalSnapshot, current_price: float) -> Tuple[Optional[str], Optional[float]]:
+    """موجودہ قیمت کی بنیاد پر TP/SL کی جانچ۔"""
+    if signal.signal_type == "buy":
+        if current_price >= signal.tp_price:
+            return "tp_hit", signal.tp_price
+        if current_price <= signal.sl_price:
+            return "sl_hit", signal.sl_price
+    elif signal.signal_type == "sell":
+        if current_price <= signal.tp_price:
+            return "tp_hit", signal.tp_price
+        if current_price >= signal.sl_price:
+            return "sl_hit", signal.sl_price
+    return None, None
 
 async def check_active_signals_job():
     """
     ایک خود مختار نگران انجن جو دن کے لحاظ سے اپنے کام کو ایڈجسٹ کرتا ہے۔
     - ہفتے کے دنوں میں: فاریکس اور کرپٹو دونوں کی نگرانی کرتا ہے۔
     - اختتام ہفتہ پر: صرف کرپٹو کی نگرانی کرتا ہے اور باقی رہ جانے والے فاریکس سگنلز کو بند کرتا ہے۔
+    - پچھلی جانچ کے بعد بند ہونے والی کینڈلز کے high/low سے TP/SL ہٹس طے کرتا ہے، اور موجودہ قیمت
+      صرف جاری (ادھوری) کینڈل کے لیے استعمال ہوتی ہے۔
+    - یہ جاب ہر TICK_SECONDS پر جاگتی ہے، لیکن صرف وہی سگنلز جانچتی ہے جن کا وقت guardian_scheduler
+      کے مطابق آ گیا ہو (TP/SL کے قریب والے جلدی، دور والے دیر سے)۔
     """
-    logger.info("🛡️ خود مختار نگران انجن (ورژن 5.0): نگرانی کا دور شروع...")
+    logger.debug("🛡️ خود مختار نگران انجن (ورژن 6.0): نگرانی کا ٹک شروع...")
     is_weekend = datetime.utcnow().weekday() >= 5  # 5 = Saturday, 6 = Sunday
 
     try:
-        with get_db_session() as db:
-            all_active_signals = crud.get_all_active_signals_from_db(db)
+        async with AsyncSessionLocal() as db:
+            all_active_signals = registry.all()
             if not all_active_signals:
-                logger.info("🛡️ کوئی فعال سگنل موجود نہیں۔")
+                guardian_scheduler.sync([])
+                logger.debug("🛡️ کوئی فعال سگنل موجود نہیں۔")
                 return
 
             forex_pairs = get_forex_pairs()
@@ -44,66 +101,114 @@ async def check_active_signals_job():
             
             # ★★★ مرکزی ذہانت یہاں ہے ★★★
             if is_weekend:
-                logger.info("📅 اختتام ہفتہ موڈ فعال۔ صرف کرپٹو کی نگرانی کی جائے گی۔")
+                logger.debug("📅 اختتام ہفتہ موڈ فعال۔ صرف کرپٹو کی نگرانی کی جائے گی۔")
+                forex_signals = []
                 for signal in all_active_signals:
                     if signal.symbol in forex_pairs:
                         # اگر ویک اینڈ پر کوئی فاریکس سگنل فعال ہے تو اسے بند کر دیں
                         logger.warning(f"🚨 ویک اینڈ پر فعال فاریکس سگنل [{signal.symbol}] ملا۔ اسے زبردستی بند کیا جا رہا ہے۔")
-                        await close_signal(db, signal, "weekend_force_close", signal.entry_price)
+                        forex_signals.append(signal)
                     else:
                         # یہ ایک کرپٹو سگنل ہے، اسے نگرانی کے لیے شامل کریں
                         signals_to_monitor.append(signal)
+                if forex_signals:
+                    await close_signals_in_bulk(db, forex_signals, "weekend_force_close")
             else:
                 # ہفتے کے دنوں میں تمام سگنلز کی نگرانی کریں
-                logger.info("📅 ہفتے کا دن موڈ فعال۔ تمام سگنلز کی نگرانی کی جائے گی۔")
+                logger.debug("📅 ہفتے کا دن موڈ فعال۔ تمام سگنلز کی نگرانی کی جائے گی۔")
                 signals_to_monitor = all_active_signals
 
+            # صرف وہ سگنلز جن کی جانچ کا وقت آ گیا ہے (قربت کی بنیاد پر ترجیح)
+            # کینڈلز والی جانچیں اسی کریڈٹ بکٹ سے ایک اضافی کریڈٹ لیتی ہیں
+            guardian_scheduler.sync(signals_to_monitor)
+            check_time = datetime.utcnow()
+            by_id = {s.signal_id: s for s in signals_to_monitor}
+            due_ids = set(guardian_scheduler.pop_due(
+                fetches_candles=lambda signal_id: _has_closed_bar_since_last_check(by_id[signal_id], check_time)
+            ))
+            signals_to_monitor = [s for s in signals_to_monitor if s.signal_id in due_ids]
+
             if not signals_to_monitor:
-                logger.info("🛡️ نگرانی کے لیے کوئی اہل سگنل نہیں۔")
+                logger.debug("🛡️ اس ٹک میں جانچ کے لیے کوئی سگنل واجب نہیں۔")
                 return
 
             logger.info(f"🛡️ {len(signals_to_monitor)} اہل سگنلز کی نگرانی کی جا رہی ہے...")
-            
+
+            # پچھلی جانچ کے بعد بند ہونے والی کینڈلز (ہر علامت کے لیے ایک درخواست)
+            candle_tasks = {
+                signal.symbol: _fetch_closed_candles(signal, check_time)
+                for signal in signals_to_monitor
+                if _has_closed_bar_since_last_check(signal, check_time)
+            }
+            candle_results = await asyncio.gather(*candle_tasks.values())
+            closed_candles = dict(zip(candle_tasks.keys(), candle_results))
+
             symbols_to_check = [s.symbol for s in signals_to_monitor]
             latest_quotes = await get_real_time_quotes(symbols_to_check)
 
-            if not latest_quotes:
+            if not latest_quotes and not closed_candles:
                 logger.warning("🛡️ کوئی مارکیٹ قیمتیں حاصل نہیں ہوئیں۔")
+                for signal in signals_to_monitor:
+                    guardian_scheduler.record_check(signal, None)
                 return
 
             for signal in signals_to_monitor:
-                market_data = latest_quotes.get(signal.symbol)
-                if not market_data or 'price' not in market_data:
-                    logger.warning(f"🛡️ [{signal.symbol}] کے لیے قیمت کا ڈیٹا نہیں ملا۔")
-                    continue
-                
-                current_price = float(market_data['price'])
-                logger.info(f"🛡️ جانچ: [{signal.symbol}] | TP: {signal.tp_price} | SL: {signal.sl_price} | موجودہ قیمت: {current_price}")
-
-                outcome, close_price = None, None
-                
-                if signal.signal_type == "buy":
-                    if current_price >= signal.tp_price:
-                        outcome, close_price = "tp_hit", signal.tp_price
-                    elif current_price <= signal.sl_price:
-                        outcome, close_price = "sl_hit", signal.sl_price
-                
-                elif signal.signal_type == "sell":
-                    if current_price <= signal.tp_price:
-                        outcome, close_price = "tp_hit", signal.tp_price
-                    elif current_price >= signal.sl_price:
-                        outcome, close_price = "sl_hit", signal.sl_price
+                outcome, close_price, current_price = None, None, None
+                candles_ok = signal.symbol not in closed_candles or closed_candles[signal.symbol] is not None
+
+                # مرحلہ 1: بند کینڈلز کے high/low سے (وقت کی ترتیب میں) جانچ
+                if closed_candles.get(signal.symbol):
+                    outcome, close_price = _resolve_from_candles(signal, closed_candles[signal.symbol])
+
+                # مرحلہ 2: صرف جاری (ادھوری) کینڈل کے لیے موجودہ قیمت
+                if not outcome:
+                    market_data = (latest_quotes or {}).get(signal.symbol)
+                    if not market_data or 'price' not in market_data:
+                        logger.warning(f"🛡️ [{signal.symbol}] کے لیے قیمت کا ڈیٹا نہیں ملا۔")
+                    else:
+                        current_price = float(market_data['price'])
+                        logger.info(f"🛡️ جانچ: [{signal.symbol}] | TP: {signal.tp_price} | SL: {signal.sl_price} | موجودہ قیمت: {current_price}")
+                        outcome, close_price = _resolve_from_price(signal, current_price)
 
                 if outcome:
                     await close_signal(db, signal, outcome, close_price)
+                    continue
+
+                if candles_ok:
+                    # اگر کینڈلز حاصل نہ ہو سکیں تو اگلی بار وہی وقفہ دوبارہ جانچا جائے گا
+                    _last_checked_at[signal.signal_id] = check_time
+                guardian_scheduler.record_check(signal, current_price)
+
+            # وہی قیمتیں ڈیش بورڈز کو (بند شدہ سگنلز اب رجسٹری میں نہیں، اس لیے ان کا PnL نہیں جاتا)
+            await publish_quotes(latest_quotes)
+
+            logger.info("🛡️ خود مختار نگران انجن: نگرانی کا دور مکمل ہوا۔")
 
     except Exception as e:
         logger.error(f"🛡️ نگران انجن کے کام میں ایک غیر متوقع خرابی پیش آئی: {e}", exc_info=True)
-    
-    logger.info("🛡️ خود مختار نگران انجن: نگرانی کا دور مکمل ہوا۔")
 
 
-async def close_signal(db: Session, signal: ActiveSignal, outcome: str, close_price: float):
+async def announce_closed_trades(db: AsyncSession, signal_ids: List[str]):
+    """
+    بند ہونے کے بعد ہسٹری کی نئی قطاریں (history_appended) اور آج کے تازہ اعداد و شمار (stats_updated) نشر کرتا ہے،
+    تاکہ ڈیش بورڈ اور ہسٹری کے صفحات پول کرنے کے بجائے انہی پیغامات سے اپ ڈیٹ ہوں۔
+    """
+    if not signal_ids:
+        return
+    trades = await async_crud.get_completed_trades_for_signals(db, signal_ids)
+    if trades:
+        await manager.broadcast({"type": "history_appended", "data": {
+            "trades": trades, "symbols": sorted({trade["symbol"] for trade in trades}),
+        }})
+    daily_stats = await async_crud.get_daily_stats(db)
+    delta = {
+        "tp_hits_today": sum(1 for trade in trades if trade["outcome"] == "tp_hit"),
+        "sl_hits_today": sum(1 for trade in trades if trade["outcome"] == "sl_hit"),
+    }
+    await manager.broadcast({"type": "stats_updated", "data": {**daily_stats.model_dump(), "delta": delta}})
+
+
+async def close_signal(db: AsyncSession, signal: ActiveSignalSnapshot, outcome: str, close_price: float):
     """
     ایک سگنل کو بند کرنے، ٹرینر کو مطلع کرنے، اور براڈکاسٹ کرنے کے لیے مرکزی فنکشن۔
     """
@@ -119,9 +224,29 @@ async def close_signal(db: Session, signal: ActiveSignal, outcome: str, close_pr
             logger.error(f"🧠 TrainerAI کو کال کرنے میں خرابی: {e}", exc_info=True)
 
     # ڈیٹا بیس میں سگنل کو بند اور آرکائیو کریں
-    success = crud.close_and_archive_signal(db, signal.signal_id, outcome, close_price, outcome)
+    success = await async_crud.close_and_archive_signal(db, signal.signal_id, outcome, close_price, outcome)
     if success:
+        _last_checked_at.pop(signal.signal_id, None)
+        guardian_scheduler.remove(signal.signal_id)
         logger.info(f"🗄️ سگنل {signal.signal_id} کامیابی سے ہسٹری میں منتقل ہو گیا۔")
         # فرنٹ اینڈ کو اپ ڈیٹ بھیجیں
-        await manager.broadcast({"type": "signal_closed", "data": {"signal_id": signal.signal_id}})
-                        
+        await manager.broadcast({"type": "signal_closed", "data": {"signal_id": signal.signal_id, "symbol": signal.symbol}})
+        await announce_closed_trades(db, [signal.signal_id])
+
+
+async def close_signals_in_bulk(db: AsyncSession, signals: List[ActiveSignalSnapshot], outcome: str):
+    """
+    کئی سگنلز کو ان کی انٹری قیمت پر ایک ٹرانزیکشن میں بند کرتا ہے اور ایک ہی براڈکاسٹ بھیجتا ہے۔
+    (صرف جبری بندش کے لیے، اس لیے TrainerAI کو مطلع نہیں کیا جاتا۔)
+    """
+    closed_ids = await async_crud.bulk_close_and_archive_signals(db, [s.signal_id for s in signals], outcome, outcome)
+    if closed_ids:
+        for signal_id in closed_ids:
+            _last_checked_at.pop(signal_id, None)
+            guardian_scheduler.remove(signal_id)
+        logger.info(f"🗄️ {len(closed_ids)} سگنلز کامیابی سے ہسٹری میں منتقل ہو گئے۔")
+        symbol_by_id = {s.signal_id: s.symbol for s in signals}
+        await manager.broadcast({"type": "signals_closed", "data": {
+            "signal_ids": closed_ids, "symbols": [symbol_by_id[signal_id] for signal_id in closed_ids],
+        }})
+        await announce_closed_trades(db, closed_ids)
@@ -3,10 +3,10 @@ import logging
 from typing import Any, Dict, List
 
 import pandas as pd
-from sqlalchemy.orm import Session
 
 from strategy_scalper import run_trading_committee 
 from config import strategy_settings
+from outcome_stats import outcome_stats
 # reasonbot کی اب ضرورت نہیں
 # from reasonbot import generate_reason
 from schemas import Candle
@@ -16,7 +16,6 @@ from utils import convert_candles_to_dataframe
 logger = logging.getLogger(__name__)
 
 async def generate_final_signal(
-    db: Session, 
     symbol: str, 
     candles: List[Candle], 
     market_regime: Dict,
@@ -44,8 +43,15 @@ async def generate_final_signal(
         # ★★★ نیا، متوازن اعتماد کا فارمولا ★★★
         signal_grade = analysis.get("signal_grade", "F")
         
-        # 1. گریڈ کی بنیاد پر بنیادی اعتماد
-        base_confidence = {"A+": 85.0, "A": 75.0, "B": 65.0}.get(signal_grade, 50.0)
+        # 1. گریڈ کی بنیاد پر بنیادی اعتماد، ماضی کے نتائج سے انشانکن شدہ
+        regime = market_regime.get("regime", "Unknown")
+        strategy_type = analysis.get("strategy_type", "Unknown")
+        grade_confidence = {"A+": 85.0, "A": 75.0, "B": 65.0}.get(signal_grade, 50.0)
+        entry, tp, sl = analysis.get("price"), analysis.get("tp"), analysis.get("sl")
+        risk_reward = abs(tp - entry) / abs(entry - sl) if None not in (entry, tp, sl) and entry != sl else None
+        base_confidence = outcome_stats.calibrate_confidence(
+            grade_confidence, symbol, signal_grade, regime, strategy_type, risk_reward=risk_reward,
+        )
 
         # 2. کمیٹی کے اسکور کی بنیاد پر تھوڑا ایڈجسٹمنٹ
         # مثال: اگر اسکور 100 ہے تو 0 ایڈجسٹمنٹ، اگر 200 ہے تو +10
@@ -59,7 +65,8 @@ async def generate_final_signal(
 
         final_check_log = (
             f"透明 [{symbol}]: حتمی جانچ: سگنل={analysis.get('signal')}, گریڈ={signal_grade}, "
-            f"کمیٹی اسکور={analysis.get('score')}, حتمی اعتماد={confidence:.1f}%"
+            f"کمیٹی اسکور={analysis.get('score')}, بنیادی اعتماد={grade_confidence:.1f}→{base_confidence:.1f}, "
+            f"حتمی اعتماد={confidence:.1f}%"
         )
         logger.info(final_check_log)
 
@@ -76,6 +83,13 @@ async def generate_final_signal(
             "confidence": round(confidence, 2),
             "reason": reason,
             "timeframe": "15min",
+            # نتیجہ آنے پر outcome_stats انہی کلیدوں کو اپ ڈیٹ کرتا ہے
+            "component_scores": {
+                **analysis.get("component_scores", {}),
+                "signal_grade": signal_grade,
+                "strategy_type": strategy_type,
+                "market_regime": regime,
+            },
         })
         return final_signal_data
 
@@ -0,0 +1,213 @@
+# filename: guardian_scheduler.py
+
+"""
+نگران انجن کے لیے قربت کی بنیاد پر ترجیحی نگرانی کا شیڈول۔
+
+ہر فعال سگنل کا اگلا جانچ کا وقت اس کی قیمت کے قریب ترین سطح (TP یا SL) سے فاصلے پر منحصر ہے، جو ATR اکائیوں
+میں ناپا جاتا ہے: سطح کے قریب سگنلز بار بار اور دور والے کبھی کبھار جانچے جاتے ہیں۔ تمام وقفے ایک عالمی
+فی منٹ کریڈٹ بجٹ کے اندر رکھے جاتے ہیں، اور ہر سگنل کے لیے متوقع تاخیر (detection delay) دیکھی جا سکتی ہے۔
+"""
+
+import heapq
+import itertools
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from config import guardian_settings
+
+logger = logging.getLogger(__name__)
+
+# اگر سگنل کے ساتھ ATR محفوظ نہ ہو تو SL کا فاصلہ کم از کم اتنے ATR مانا جاتا ہے (DEFAULT volatility_multiplier)
+FALLBACK_SL_ATR_MULTIPLE = 1.5
+
+class ScheduleEntry(NamedTuple):
+    signal_id: str
+    symbol: str
+    due_at: float
+    base_interval: float
+    distance_atr: Optional[float]
+    last_price: Optional[float]
+    last_checked_at: Optional[float]
+    bar_seconds: float
+
+def timeframe_to_timedelta(timeframe: str) -> timedelta:
+    """'15min'، '1h' جیسی ٹائم فریم سٹرنگ کو timedelta میں تبدیل کرتا ہے۔"""
+    units = {"min": "minutes", "h": "hours", "day": "days"}
+    for suffix, unit in units.items():
+        if timeframe and timeframe.endswith(suffix) and timeframe[:-len(suffix)].isdigit():
+            return timedelta(**{unit: int(timeframe[:-len(suffix)])})
+    return timedelta(minutes=15)
+
+def _bar_seconds(signal) -> float:
+    return timeframe_to_timedelta(signal.timeframe).total_seconds()
+
+def estimate_atr(signal) -> Optional[float]:
+    """سگنل کے ساتھ محفوظ ATR، ورنہ انٹری اور SL کے فاصلے سے اندازہ۔"""
+    atr = (signal.component_scores or {}).get("atr")
+    if atr:
+        return float(atr)
+    if signal.entry_price is not None and signal.sl_price is not None:
+        risk = abs(signal.entry_price - signal.sl_price)
+        return risk / FALLBACK_SL_ATR_MULTIPLE if risk > 0 else None
+    return None
+
+def distance_in_atr(signal, price: float) -> Optional[float]:
+    """موجودہ قیمت سے قریب ترین سطح (TP یا SL) کا فاصلہ ATR اکائیوں میں۔"""
+    atr = estimate_atr(signal)
+    if not atr or signal.tp_price is None or signal.sl_price is None:
+        return None
+    return min(abs(price - signal.tp_price), abs(price - signal.sl_price)) / atr
+
+class GuardianScheduler:
+    """
+    سگنلز کی ایک ترجیحی قطار (min-heap) جو اگلے جانچ کے وقت پر ترتیب شدہ ہے۔
+    بجٹ دو طرح سے لاگو ہوتا ہے: (1) اگر کل طلب بجٹ سے زیادہ ہو تو تمام وقفے ایک ہی تناسب سے بڑھا دیے
+    جاتے ہیں، اور (2) ایک ٹوکن بکٹ ایک ہی ٹک میں کریڈٹس کے اچانک استعمال کو روکتا ہے۔
+    """
+    def __init__(
+        self,
+        credits_per_minute: float = guardian_settings.CREDITS_PER_MINUTE,
+        min_interval: float = guardian_settings.MIN_CHECK_INTERVAL,
+        max_interval: float = guardian_settings.MAX_CHECK_INTERVAL,
+        seconds_per_atr: float = guardian_settings.SECONDS_PER_ATR,
+        tick_seconds: float = guardian_settings.TICK_SECONDS,
+    ):
+        self.credits_per_minute = credits_per_minute
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.seconds_per_atr = seconds_per_atr
+        self.tick_seconds = tick_seconds
+        self._entries: Dict[str, ScheduleEntry] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._counter = itertools.count()
+        # کم از کم 2: کینڈلز والی جانچ (2 ٹوکن) کبھی نہ اٹکے
+        self._bucket_capacity = max(2.0, credits_per_minute * tick_seconds / 60 * 2)
+        self._tokens = self._bucket_capacity
+        self._tokens_updated_at = time.monotonic()
+
+    # --- وقفوں کا حساب ---
+
+    def base_interval_for(self, distance_atr: Optional[float]) -> float:
+        """فاصلے سے وقفہ: min_interval + seconds_per_atr × فاصلہ، حدود کے اندر۔"""
+        if distance_atr is None:
+            return self.min_interval
+        interval = self.min_interval + self.seconds_per_atr * distance_atr
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def credits_per_minute_demand(self) -> float:
+        """
+        تمام سگنلز کی کل طلب (کریڈٹس فی منٹ): ہر جانچ کی ایک قیمت، اور ہر بند کینڈل پر کینڈلز کی ایک اضافی
+        درخواست (زیادہ سے زیادہ ہر جانچ پر ایک)۔
+        """
+        return sum(
+            60.0 / e.base_interval + 60.0 / max(e.base_interval, e.bar_seconds)
+            for e in self._entries.values()
+        )
+
+    def budget_scale(self) -> float:
+        """اگر تمام سگنلز کی کل طلب بجٹ سے زیادہ ہو تو وقفوں کو بڑھانے کا تناسب۔"""
+        demand = self.credits_per_minute_demand()
+        return max(1.0, demand / self.credits_per_minute) if self.credits_per_minute > 0 else 1.0
+
+    def _push(self, entry: ScheduleEntry):
+        self._entries[entry.signal_id] = entry
+        heapq.heappush(self._heap, (entry.due_at, next(self._counter), entry.signal_id))
+
+    # --- قطار کا انتظام ---
+
+    def sync(self, signals: List[Any], now: Optional[float] = None):
+        """نئے سگنلز کو فوری جانچ کے لیے شامل کرتا ہے اور بند ہو جانے والوں کو ہٹاتا ہے۔"""
+        now = time.time() if now is None else now
+        current_ids = {s.signal_id for s in signals}
+        for signal_id in list(self._entries):
+            if signal_id not in current_ids:
+                self.remove(signal_id)
+        for signal in signals:
+            if signal.signal_id not in self._entries:
+                self._push(ScheduleEntry(
+                    signal.signal_id, signal.symbol, now, self.min_interval, None, None, None, _bar_seconds(signal)
+                ))
+
+    def remove(self, signal_id: str):
+        # heap میں موجود پرانی اندراجات pop_due میں نظر انداز ہو جاتی ہیں
+        self._entries.pop(signal_id, None)
+
+    def _refill_tokens(self):
+        now = time.monotonic()
+        elapsed = now - self._tokens_updated_at
+        self._tokens = min(self._bucket_capacity, self._tokens + elapsed * self.credits_per_minute / 60)
+        self._tokens_updated_at = now
+
+    def pop_due(self, now: Optional[float] = None, fetches_candles: Optional[Callable[[str], bool]] = None) -> List[str]:
+        """
+        وہ سگنلز جن کی جانچ کا وقت آ گیا ہے، سب سے پہلے واجب الادا پہلے، ٹوکن بکٹ کی حد تک۔
+        ہر جانچ ایک ٹوکن لیتی ہے؛ جس سگنل کے لیے fetches_candles سچ ہو اس کی علامت کی کینڈلز کی درخواست
+        ایک اضافی ٹوکن لیتی ہے (ہر علامت کے لیے ایک بار، کیونکہ کینڈلز فی علامت ایک ہی درخواست میں آتی ہیں)۔
+        جو سگنلز بجٹ کی وجہ سے رہ جائیں وہ قطار کے سرے پر اگلے ٹک کا انتظار کرتے ہیں۔
+        """
+        now = time.time() if now is None else now
+        self._refill_tokens()
+        due: List[str] = []
+        candle_symbols = set()
+        while self._heap and self._heap[0][0] <= now:
+            due_at, _, signal_id = self._heap[0]
+            entry = self._entries.get(signal_id)
+            if not entry or entry.due_at != due_at:
+                heapq.heappop(self._heap)
+                continue  # پرانی اندراج
+            fetch = (
+                fetches_candles is not None and entry.symbol not in candle_symbols and fetches_candles(signal_id)
+            )
+            cost = 2 if fetch else 1
+            if self._tokens < cost:
+                logger.info(f"🛡️ شیڈولر: کریڈٹ بجٹ ختم، {len(self._heap)} جانچیں اگلے ٹک تک مؤخر۔")
+                break
+            heapq.heappop(self._heap)
+            self._tokens -= cost
+            if fetch:
+                candle_symbols.add(entry.symbol)
+            due.append(signal_id)
+            # عارضی اگلا وقت: اگر جانچ کسی خرابی کی وجہ سے record_check تک نہ پہنچے تو سگنل کھو نہ جائے
+            self._push(entry._replace(due_at=now + self.min_interval))
+        return due
+
+    def record_check(self, signal: Any, price: Optional[float], now: Optional[float] = None):
+        """جانچ کے بعد قیمت کی بنیاد پر اگلا وقت طے کرتا ہے۔ قیمت نہ ملے تو کم از کم وقفے پر دوبارہ۔"""
+        now = time.time() if now is None else now
+        distance = distance_in_atr(signal, price) if price is not None else None
+        base_interval = self.base_interval_for(distance)
+        entry = ScheduleEntry(signal.signal_id, signal.symbol, now, base_interval, distance, price, now, _bar_seconds(signal))
+        self._entries[signal.signal_id] = entry  # بجٹ کے تناسب میں نیا وقفہ شامل ہو
+        interval = base_interval * self.budget_scale()
+        self._push(entry._replace(due_at=now + interval))
+
+    # --- مشاہدہ ---
+
+    def get_status(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """ہر سگنل کا فاصلہ، وقفہ، اگلی جانچ اور متوقع تاخیر (اوسطاً وقفے کا نصف + ٹک کا نصف)۔"""
+        now = time.time() if now is None else now
+        scale = self.budget_scale()
+        signals = []
+        for entry in sorted(self._entries.values(), key=lambda e: e.due_at):
+            interval = entry.base_interval * scale
+            signals.append({
+                "signal_id": entry.signal_id,
+                "symbol": entry.symbol,
+                "distance_atr": round(entry.distance_atr, 3) if entry.distance_atr is not None else None,
+                "last_price": entry.last_price,
+                "check_interval_seconds": round(interval, 1),
+                "next_check_in_seconds": round(max(0.0, entry.due_at - now), 1),
+                "expected_detection_delay_seconds": round(interval / 2 + self.tick_seconds / 2, 1),
+            })
+        demand = self.credits_per_minute_demand()
+        return {
+            "credits_per_minute_budget": self.credits_per_minute,
+            "credits_per_minute_demand": round(demand, 2),
+            "budget_scale": round(scale, 3),
+            "signals": signals,
+        }
+
+# شیڈولر کا عالمی نمونہ جو نگران انجن استعمال کرتا ہے
+guardian_scheduler = GuardianScheduler()
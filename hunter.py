@@ -2,20 +2,20 @@
 
 import asyncio
 import logging
-from contextlib import contextmanager
-from typing import Generator, Dict, Any
+from typing import Dict, Any
 import json
 
-from sqlalchemy.orm import Session
 import pandas as pd
 
-import database_crud as crud
+import async_crud
+from candle_store import save_fetched_candles
 from utils import fetch_twelve_data_ohlc
 from fusion_engine import generate_final_signal
 from messenger import send_telegram_alert, send_signal_update_alert
-from models import SessionLocal
+from models import AsyncSessionLocal
 from websocket_manager import manager
 from roster_manager import get_hunting_roster
+from signal_registry import registry
 from config import strategy_settings, api_settings
 from riskguardian import get_market_regime
 
@@ -25,14 +25,6 @@ logger = logging.getLogger(__name__)
 FINAL_CONFIDENCE_THRESHOLD = strategy_settings.FINAL_CONFIDENCE_THRESHOLD
 PERSONALITIES_FILE = "asset_personalities.json"
 
-@contextmanager
-def get_db_session() -> Generator[Session, None, None]:
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 def load_asset_personalities() -> Dict:
     try:
         with open(PERSONALITIES_FILE, 'r') as f:
@@ -48,8 +40,7 @@ async def hunt_for_signals_job():
     logger.info("🏹 شکاری انجن: نئے مواقع کی تلاش کا نیا دور شروع...")
     
     try:
-        with get_db_session() as db:
-            pairs_to_analyze = get_hunting_roster(db)
+        pairs_to_analyze = get_hunting_roster()
         
         if not pairs_to_analyze:
             logger.info("🏹 شکاری انجن: تجزیے کے لیے کوئی اہل جوڑا نہیں۔ تلاش کا دور ختم۔")
@@ -58,6 +49,9 @@ async def hunt_for_signals_job():
         # مرحلہ 1: مارکیٹ کے نظام کا تعین کریں
         h1_tasks = [fetch_twelve_data_ohlc(pair, "1h", 50) for pair in pairs_to_analyze]
         h1_results = await asyncio.gather(*h1_tasks)
+        await asyncio.gather(*(
+            save_fetched_candles(pair, "1h", candles) for pair, candles in zip(pairs_to_analyze, h1_results)
+        ))
         
         ohlc_data_map = {
             pair: pd.DataFrame([c.dict() for c in candles])
@@ -95,20 +89,20 @@ async def analyze_single_pair(pair: str, market_regime: Dict, personalities: Dic
     try:
         symbol_personality = personalities.get(pair, personalities.get("DEFAULT", {}))
 
-        with get_db_session() as db:
-            if crud.get_active_signal_by_symbol(db, pair):
-                logger.info(f"🔬 [{pair}] تجزیہ روکا گیا: اس جوڑے کا سگنل پہلے سے فعال ہے۔")
-                return
+        if registry.get_by_symbol(pair):
+            logger.info(f"🔬 [{pair}] تجزیہ روکا گیا: اس جوڑے کا سگنل پہلے سے فعال ہے۔")
+            return
+
+        timeframe = "15min"
+        candles = await fetch_twelve_data_ohlc(pair, timeframe, api_settings.CANDLE_COUNT)
+        await save_fetched_candles(pair, timeframe, candles)
 
-            timeframe = "15min"
-            candles = await fetch_twelve_data_ohlc(pair, timeframe, api_settings.CANDLE_COUNT)
-            
-            if not candles or len(candles) < 34:
-                logger.warning(f"📊 [{pair}] تجزیہ روکا گیا: ناکافی کینڈل ڈیٹا ({len(candles) if candles else 0})۔")
-                return
+        if not candles or len(candles) < 34:
+            logger.warning(f"📊 [{pair}] تجزیہ روکا گیا: ناکافی کینڈل ڈیٹا ({len(candles) if candles else 0})۔")
+            return
 
-            # فیوژن انجن سے حتمی تجزیہ حاصل کریں
-            analysis_result = await generate_final_signal(db, pair, candles, market_regime, symbol_personality)
+        # فیوژن انجن سے حتمی تجزیہ حاصل کریں
+        analysis_result = await generate_final_signal(pair, candles, market_regime, symbol_personality)
         
         if not analysis_result:
             logger.error(f"🔬 [{pair}] تجزیہ ناکام: فیوژن انجن نے کوئی نتیجہ واپس نہیں کیا۔")
@@ -124,8 +118,8 @@ async def analyze_single_pair(pair: str, market_regime: Dict, personalities: Dic
             required_confidence = FINAL_CONFIDENCE_THRESHOLD + 10 if market_regime['regime'] == 'Volatile' else FINAL_CONFIDENCE_THRESHOLD
 
             if confidence >= required_confidence:
-                with get_db_session() as db:
-                    update_result = crud.add_or_update_active_signal(db, analysis_result)
+                async with AsyncSessionLocal() as db:
+                    update_result = await async_crud.add_or_update_active_signal(db, analysis_result)
                 
                 if update_result:
                     signal_obj = update_result.signal.as_dict()
@@ -135,7 +129,8 @@ async def analyze_single_pair(pair: str, market_regime: Dict, personalities: Dic
                     
                     logger.info(f"🎯 ★★★ سگنل پروسیس ہوا: {signal_obj['symbol']} ({task_type}) ★★★")
                     
-                    asyncio.create_task(alert_task(signal_obj))
+                    # ڈسپیچر کی قطار میں ڈالنا فوری ہے؛ بھیجنا پس منظر میں
+                    await alert_task(signal_obj)
                     asyncio.create_task(manager.broadcast({"type": task_type, "data": signal_obj}))
             else:
                 logger.info(f"📉 [{pair}] سگنل مسترد: اعتماد ({confidence:.2f}%) مطلوبہ حد ({required_confidence}%) سے کم ہے۔")
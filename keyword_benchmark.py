@@ -0,0 +1,120 @@
+# filename: keyword_benchmark.py
+
+"""
+خبروں کی اعلیٰ اثر والی درجہ بندی کا بینچ مارک: پرانا طریقہ (ہر کرنسی کے ہر کلیدی لفظ پر `keyword in content`)
+بمقابلہ sentinel کا پہلے سے کمپائل شدہ KeywordMatcher، ہزاروں مصنوعی خبروں پر۔
+
+مصنوعی خبروں میں جان بوجھ کر ایسے الفاظ بھی ہیں جن کے اندر کلیدی الفاظ چھپے ہیں ('federal'، 'sector'،
+'warning')؛ جمع ('ETFs') البتہ درست میچ ہے۔ نتیجے میں دونوں طریقوں کی رفتار کے ساتھ یہ بھی آتا ہے کہ پرانا طریقہ کتنی خبروں کو غلطی سے اعلیٰ
+اثر والا سمجھتا تھا۔
+
+استعمال:
+    python keyword_benchmark.py --articles 20000 --repeat 5
+"""
+
+import argparse
+import json
+import logging
+import random
+import time
+from typing import Callable, Dict, List, Set
+
+import numpy as np
+
+from config import news_settings
+from sentinel import KeywordMatcher
+
+logger = logging.getLogger(__name__)
+
+FILLER = (
+    "markets", "traders", "stocks", "rally", "shares", "earnings", "outlook", "investors", "bonds", "yields",
+    "quarter", "guidance", "analysts", "session", "futures", "commodities", "demand", "supply", "report", "week",
+    # کلیدی الفاظ والے مگر غیر متعلقہ الفاظ
+    "federal", "sector", "warning", "software", "boccia", "crisp", "warden", "sectors", "forward", "reward",
+)
+
+def _articles(count: int, keyword_rate: float, seed: int) -> List[Dict[str, str]]:
+    rng = random.Random(seed)
+    keywords = sorted({k for words in news_settings.HIGH_IMPACT_KEYWORDS.values() for k in words})
+    articles = []
+    for _ in range(count):
+        title = rng.choices(FILLER, k=rng.randint(6, 12))
+        snippet = rng.choices(FILLER, k=rng.randint(25, 50))
+        if rng.random() < keyword_rate:
+            keyword = rng.choice(keywords)
+            snippet.insert(rng.randrange(len(snippet)), keyword.upper() if rng.random() < 0.3 else keyword)
+        articles.append({"title": " ".join(title).capitalize(), "snippet": " ".join(snippet) + "."})
+    return articles
+
+def legacy_is_high_impact(item: Dict[str, str]) -> bool:
+    """پرانا sentinel._is_high_impact، موازنے کے لیے جوں کا توں۔"""
+    content = (item.get('title') or '').lower() + " " + (item.get('snippet') or '').lower()
+    return any(
+        any(keyword in content for keyword in keywords)
+        for keywords in news_settings.HIGH_IMPACT_KEYWORDS.values()
+    )
+
+def legacy_currencies(item: Dict[str, str]) -> Set[str]:
+    """پرانا طریقہ اگر وہ بھی تمام متاثرہ کرنسیاں دیتا (ہر کلیدی لفظ کی جانچ، کوئی جلدی واپسی نہیں)۔"""
+    content = (item.get('title') or '').lower() + " " + (item.get('snippet') or '').lower()
+    return {
+        currency for currency, keywords in news_settings.HIGH_IMPACT_KEYWORDS.items()
+        if any(keyword in content for keyword in keywords)
+    }
+
+def _time(fn: Callable[[Dict[str, str]], object], articles: List[Dict[str, str]], repeat: int):
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = [fn(article) for article in articles]
+        runs.append(time.perf_counter() - started)
+    best = float(np.min(runs))
+    return results, {
+        "best_s": round(best, 4),
+        "median_s": round(float(np.median(runs)), 4),
+        "articles_per_second": round(len(articles) / best, 1),
+        "us_per_article": round(best / len(articles) * 1e6, 2),
+    }
+
+def run_benchmark(count: int, keyword_rate: float, repeat: int, seed: int = 0) -> Dict:
+    """دونوں طریقوں کا وقت اور ان کے نتائج کا فرق۔"""
+    articles = _articles(count, keyword_rate, seed)
+
+    compile_started = time.perf_counter()
+    matcher = KeywordMatcher(news_settings.HIGH_IMPACT_KEYWORDS)
+    compile_ms = (time.perf_counter() - compile_started) * 1000
+
+    legacy, legacy_timing = _time(legacy_is_high_impact, articles, repeat)
+    _, legacy_all_timing = _time(legacy_currencies, articles, repeat)
+    matched, matcher_timing = _time(lambda a: matcher.currencies(f"{a['title']}\n{a['snippet']}"), articles, repeat)
+    return {
+        "articles": count,
+        "repeat": repeat,
+        "compile_ms": round(compile_ms, 3),
+        "legacy_substring": {**legacy_timing, "high_impact": sum(legacy)},
+        "legacy_substring_all_currencies": legacy_all_timing,
+        "compiled_matcher": {
+            **matcher_timing,
+            "high_impact": sum(1 for currencies in matched if currencies),
+            "avg_currencies_per_high_impact": round(
+                float(np.mean([len(c) for c in matched if c])), 2
+            ) if any(matched) else 0.0,
+        },
+        # پرانا طریقہ انہیں اعلیٰ اثر والا کہتا تھا، مگر کوئی پورا کلیدی لفظ موجود نہیں (مثلاً 'federal' میں 'fed')
+        "legacy_false_positives": sum(1 for old, new in zip(legacy, matched) if old and not new),
+        # ہم پلہ موازنہ: دونوں تمام کرنسیاں دیتے ہیں
+        "speedup_vs_legacy_all_currencies": round(legacy_all_timing["best_s"] / matcher_timing["best_s"], 2) if matcher_timing["best_s"] else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="اعلیٰ اثر والی خبروں کے کلیدی الفاظ کے میچر کا بینچ مارک")
+    parser.add_argument("--articles", type=int, default=20000)
+    parser.add_argument("--keyword-rate", type=float, default=0.3, help="اصل کلیدی لفظ والی خبروں کا تناسب")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    print(json.dumps(run_benchmark(args.articles, args.keyword_rate, args.repeat, args.seed), indent=2))
+
+if __name__ == "__main__":
+    main()
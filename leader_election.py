@@ -0,0 +1,137 @@
+# filename: leader_election.py
+
+"""
+gunicorn ورکرز میں سے ایک لیڈر کا انتخاب۔
+
+ہنٹر، نگران، خبروں اور صفائی کی جابز پوری تنصیب میں صرف ایک بار چلنی چاہئیں۔ ہر ورکر ایک مخصوص کنکشن پر
+پوسٹگریس کا سیشن advisory lock (pg_try_advisory_lock) لینے کی کوشش کرتا ہے؛ جسے مل جائے وہ لیڈر ہے اور کنکشن
+کھلا رکھتا ہے۔ لیڈر کا پروسیس مر جائے یا کنکشن ٹوٹ جائے تو پوسٹگریس لاک چھوڑ دیتا ہے اور اگلی کوشش پر کوئی
+پیروکار لیڈر بن جاتا ہے۔ SQLite پر ایک ہی پروسیس ہوتا ہے، اس لیے وہ ہمیشہ لیڈر ہے۔
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from config import cluster_settings
+from models import async_engine, is_sqlite
+
+logger = logging.getLogger(__name__)
+
+LeadershipCallback = Callable[[], Awaitable[None]]
+
+class LeaderElector:
+    """advisory lock پر مبنی لیڈر کا انتخاب؛ لیڈر بننے اور قیادت کھونے پر کال بیکس چلاتا ہے۔"""
+    def __init__(
+        self,
+        lock_key: int = cluster_settings.LEADER_LOCK_KEY,
+        retry_seconds: float = cluster_settings.LEADER_RETRY_SECONDS,
+    ):
+        self.lock_key = lock_key
+        self.retry_seconds = retry_seconds
+        self.is_leader = False
+        self.elections = 0
+        self._connection: Optional[AsyncConnection] = None
+        self._task: Optional[asyncio.Task] = None
+        self._on_elected: Optional[LeadershipCallback] = None
+        self._on_lost: Optional[LeadershipCallback] = None
+
+    async def start(self, on_elected: LeadershipCallback, on_lost: LeadershipCallback):
+        self._on_elected, self._on_lost = on_elected, on_lost
+        if is_sqlite:
+            await self._become_leader()
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """قیادت رضاکارانہ طور پر چھوڑتا ہے، تاکہ دوسرا ورکر فوراً اگلی کوشش پر لیڈر بن سکے۔"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            try:
+                await connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.lock_key})
+                await connection.commit()
+                await connection.close()
+            except Exception as e:
+                logger.warning(f"👑 قیادت کا لاک چھوڑنے میں خرابی: {e}")
+                await self._discard(connection)
+        self.is_leader = False
+
+    async def _run(self):
+        while True:
+            try:
+                if self.is_leader:
+                    await self._check_alive()
+                else:
+                    await self._try_acquire()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"👑 لیڈر کے انتخاب میں خرابی: {e}")
+                await self._step_down()
+            await asyncio.sleep(self.retry_seconds)
+
+    async def _try_acquire(self):
+        connection = await async_engine.connect()
+        try:
+            acquired = await connection.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.lock_key})
+            # سیشن لاک ٹرانزیکشن کے بعد بھی قائم رہتا ہے؛ کنکشن "idle in transaction" نہ رہے
+            await connection.commit()
+        except Exception:
+            await self._discard(connection)
+            raise
+        if not acquired:
+            await connection.close()
+            return
+        self._connection = connection
+        await self._become_leader()
+
+    async def _check_alive(self):
+        if self._connection is None:
+            raise RuntimeError("لیڈر کا کنکشن موجود نہیں۔")
+        await self._connection.execute(text("SELECT 1"))
+        await self._connection.commit()
+
+    async def _become_leader(self):
+        self.is_leader = True
+        self.elections += 1
+        logger.info("👑 یہ ورکر لیڈر منتخب ہوا؛ شیڈیولر کی جابز یہاں چلیں گی۔")
+        if self._on_elected:
+            try:
+                await self._on_elected()
+            except Exception as e:
+                logger.error(f"👑 لیڈر بننے کے بعد کی تیاری میں خرابی: {e}", exc_info=True)
+
+    async def _step_down(self):
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            await self._discard(connection)
+        if not self.is_leader:
+            return
+        self.is_leader = False
+        logger.warning("👑 قیادت ختم ہو گئی؛ شیڈیولر کی جابز روکی جا رہی ہیں۔")
+        if self._on_lost:
+            try:
+                await self._on_lost()
+            except Exception as e:
+                logger.error(f"👑 قیادت ختم ہونے پر جابز روکنے میں خرابی: {e}", exc_info=True)
+
+    @staticmethod
+    async def _discard(connection: AsyncConnection):
+        # لاک والا (یا ٹوٹا ہوا) کنکشن پول میں واپس نہ جائے
+        try:
+            await connection.invalidate()
+            await connection.close()
+        except Exception:
+            pass
+
+    def get_status(self) -> Dict[str, Any]:
+        return {"is_leader": self.is_leader, "lock_key": self.lock_key, "elections": self.elections}
+
+# لیڈر کے انتخاب کا عالمی نمونہ
+leader = LeaderElector()
@@ -0,0 +1,283 @@
+# filename: learning_store.py
+
+"""
+TrainerAI کے نتائج کے لیے صرف اضافہ ہونے والا (append-only) پائیدار لرننگ لاگ۔
+
+ہر نتیجہ ایک JSONL لائن ہے۔ لکھنے کا کام ایک غیر مطابقت پذیر (async) بیچ رائٹر کرتا ہے جو N اندراجات یا
+T سیکنڈ (جو پہلے ہو) پر فائل میں اضافہ کرتا ہے، اس لیے ایونٹ لوپ فائل I/O پر نہیں رکتا۔ ہر بیچ ایک ہی
+O_APPEND رائٹ میں فائل لاک (flock) کے تحت لکھا اور fsync کیا جاتا ہے، اس لیے کئی پروسیسز بھی محفوظ ہیں۔
+
+- بند ہوتے وقت قطار مکمل طور پر خالی کی جاتی ہے۔
+- اچانک کریش کی صورت میں قطار میں رہ جانے والے نتائج اسٹارٹ اپ پر completed_trades سے بحال کیے جاتے ہیں۔
+  بحال شدہ اندراجات ("recovered": True) میں component_scores نہیں ہوتے، اس لیے وہ outcome_stats کے مجموعوں
+  (اور اعتماد کی انشانکن) میں شامل نہیں ہوتے؛ لاگ اور تجزیے میں وہ r_multiple کے ساتھ موجود رہتے ہیں۔
+- تجزیے کے لیے لاگ کو ایک کالم وار (Parquet) اسنیپ شاٹ میں کمپیکٹ کیا جا سکتا ہے۔
+"""
+
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+import pandas as pd
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import CompletedTrade, SessionLocal
+from outcome_stats import realized_r_multiple
+
+logger = logging.getLogger(__name__)
+
+# --- مستقل اقدار ---
+LEARNING_LOG_FILE = "learning_log.jsonl"
+LEARNING_SNAPSHOT_FILE = "learning_snapshot.parquet"
+LEGACY_LEARNING_FILE = "learning_data.json"
+FLUSH_BATCH_SIZE = 50
+FLUSH_INTERVAL_SECONDS = 5.0
+RECONCILE_LOOKBACK_DAYS = 7
+
+class LearningStore:
+    """
+    بیچ شدہ، پائیدار لرننگ لاگ۔ record() فوری واپس آتا ہے؛ اصل لکھائی پس منظر کے ٹاسک میں ہوتی ہے۔
+    """
+    def __init__(
+        self,
+        log_path: str = LEARNING_LOG_FILE,
+        snapshot_path: str = LEARNING_SNAPSHOT_FILE,
+        batch_size: int = FLUSH_BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS,
+    ):
+        self.log_path = log_path
+        self.snapshot_path = snapshot_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._io_lock: Optional[asyncio.Lock] = None
+
+    # --- فائل I/O (تھریڈ میں چلتا ہے) ---
+
+    def _append_lines(self, entries: List[Dict[str, Any]]):
+        """ایک ہی O_APPEND رائٹ میں بیچ شامل کرتا ہے، فائل لاک کے تحت، اور fsync کرتا ہے۔"""
+        payload = "".join(json.dumps(entry, default=str) + "\n" for entry in entries).encode("utf-8")
+        fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                os.write(fd, payload)
+                os.fsync(fd)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    def _read_log(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.log_path):
+            return []
+        entries = []
+        with open(self.log_path, 'r', encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"🧠 لرننگ لاگ میں ایک خراب لائن نظر انداز کی گئی۔")
+        return entries
+
+    def _migrate_legacy_file(self):
+        """پرانی learning_data.json کو ایک بار JSONL لاگ میں منتقل کرتا ہے۔"""
+        if not os.path.exists(LEGACY_LEARNING_FILE):
+            return
+        try:
+            with open(LEGACY_LEARNING_FILE, 'r') as f:
+                legacy = json.load(f)
+        except json.JSONDecodeError:
+            logger.error(f"🧠 {LEGACY_LEARNING_FILE} خراب ہے، منتقل نہیں کی جا سکی۔")
+            return
+        if legacy:
+            self._append_lines(legacy)
+        os.replace(LEGACY_LEARNING_FILE, LEGACY_LEARNING_FILE + ".migrated")
+        logger.info(f"🧠 {len(legacy)} پرانے اندراجات {LEGACY_LEARNING_FILE} سے لرننگ لاگ میں منتقل ہو گئے۔")
+
+    # --- پس منظر کا رائٹر ---
+
+    async def start(self):
+        """رائٹر ٹاسک شروع کرتا ہے (ایونٹ لوپ کے اندر بلایا جائے)۔"""
+        if self._writer_task and not self._writer_task.done():
+            return
+        self._queue = asyncio.Queue()
+        self._io_lock = asyncio.Lock()
+        await asyncio.to_thread(self._migrate_legacy_file)
+        self._writer_task = asyncio.create_task(self._run_writer())
+        logger.info(f"🧠 لرننگ اسٹور شروع: بیچ = {self.batch_size}، وقفہ = {self.flush_interval} سیکنڈ۔")
+
+    def record(self, entry: Dict[str, Any]):
+        """ایک نتیجہ قطار میں ڈالتا ہے۔ اگر رائٹر نہیں چل رہا (مثلاً اسکرپٹس میں) تو فوراً لکھ دیتا ہے۔"""
+        if self._queue is None or not self._writer_task or self._writer_task.done():
+            self._append_lines([entry])
+            return
+        self._queue.put_nowait(entry)
+
+    async def _write_batch(self, batch: List[Dict[str, Any]]):
+        async with self._io_lock:
+            await asyncio.to_thread(self._append_lines, batch)
+        logger.info(f"🧠 {len(batch)} نتائج لرننگ لاگ میں محفوظ ہو گئے۔")
+
+    async def _run_writer(self):
+        batch: List[Dict[str, Any]] = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                entry = await asyncio.wait_for(self._queue.get(), timeout)
+                batch.append(entry)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                # بند ہوتے وقت: باقی تمام اندراجات لکھ دیں
+                while not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                if batch:
+                    self._append_lines(batch)
+                    logger.info(f"🧠 بند ہوتے وقت {len(batch)} نتائج لرننگ لاگ میں محفوظ ہو گئے۔")
+                raise
+
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                to_write, batch, deadline = batch, [], None
+                try:
+                    await self._write_batch(to_write)
+                except OSError as e:
+                    logger.error(f"🧠 لرننگ لاگ لکھنے میں خرابی: {e}۔ بیچ دوبارہ کوشش کے لیے رکھا گیا۔", exc_info=True)
+                    batch, deadline = to_write + batch, time.monotonic() + self.flush_interval
+
+    async def stop(self):
+        """رائٹر کو روکتا ہے اور قطار میں موجود ہر اندراج کو محفوظ کرتا ہے۔"""
+        if not self._writer_task:
+            return
+        self._writer_task.cancel()
+        try:
+            await self._writer_task
+        except asyncio.CancelledError:
+            pass
+        self._writer_task = None
+
+    # --- بحالی اور تجزیہ ---
+
+    @staticmethod
+    def _drop_duplicate_signals(entries: pd.DataFrame) -> pd.DataFrame:
+        """
+        ہر signal_id کا صرف آخری اندراج۔ کمپیکشن os.replace کے بعد اور لاگ خالی ہونے سے پہلے رک جائے تو وہی
+        اندراجات اسنیپ شاٹ اور لاگ دونوں میں ہوتے ہیں۔
+        """
+        if "signal_id" not in entries:
+            return entries
+        duplicated = entries["signal_id"].notna() & entries.duplicated(subset="signal_id", keep="last")
+        return entries[~duplicated].reset_index(drop=True)
+
+    def read_entries(self) -> pd.DataFrame:
+        """اسنیپ شاٹ اور لاگ دونوں کے تمام اندراجات ایک ڈیٹا فریم میں۔"""
+        frames = []
+        if os.path.exists(self.snapshot_path):
+            frames.append(pd.read_parquet(self.snapshot_path))
+        log_entries = self._read_log()
+        if log_entries:
+            frames.append(pd.DataFrame(log_entries))
+        return self._drop_duplicate_signals(pd.concat(frames, ignore_index=True)) if frames else pd.DataFrame()
+
+    def _known_signal_ids(self) -> Set[str]:
+        entries = self.read_entries()
+        return set(entries["signal_id"]) if "signal_id" in entries else set()
+
+    def reconcile_with_trades(self) -> int:
+        """
+        کریش کی صورت میں قطار میں رہ جانے والے نتائج completed_trades سے بحال کرتا ہے۔ r_multiple ٹریڈ کی
+        انٹری، بندش اور SL قیمتوں سے نکالا جاتا ہے۔ completed_trades میں component_scores (گریڈ، regime،
+        حکمت عملی) محفوظ نہیں ہوتے، اس لیے یہ اندراجات outcome_stats کے مجموعوں سے باہر رہتے ہیں۔
+        Returns: بحال شدہ اندراجات کی تعداد۔
+        """
+        known_ids = self._known_signal_ids()
+        since = datetime.utcnow() - timedelta(days=RECONCILE_LOOKBACK_DAYS)
+        db = SessionLocal()
+        try:
+            trades = db.query(CompletedTrade).filter(
+                CompletedTrade.outcome.in_(["tp_hit", "sl_hit"]),
+                CompletedTrade.closed_at >= since
+            ).all()
+        except SQLAlchemyError as e:
+            logger.error(f"🧠 لرننگ لاگ کی بحالی کے لیے ٹریڈز حاصل کرنے میں خرابی: {e}", exc_info=True)
+            return 0
+        finally:
+            db.close()
+
+        recovered = [
+            {
+                "signal_id": t.signal_id,
+                "symbol": t.symbol,
+                "outcome": t.outcome,
+                "confidence": t.confidence,
+                "reason": t.reason,
+                "component_scores": None,
+                "news_at_trade_time": None,
+                "r_multiple": realized_r_multiple(
+                    t.outcome, t.signal_type, t.entry_price, t.close_price, t.tp_price, t.sl_price
+                ),
+                "timestamp": t.closed_at.isoformat() if t.closed_at else None,
+                "recovered": True,
+            }
+            for t in trades if t.signal_id not in known_ids
+        ]
+        if recovered:
+            self._append_lines(recovered)
+            logger.warning(
+                f"🧠 {len(recovered)} گمشدہ نتائج completed_trades سے لرننگ لاگ میں بحال کیے گئے "
+                f"(component_scores کے بغیر، اس لیے اعتماد کی انشانکن کے مجموعوں میں شامل نہیں)۔"
+            )
+        return len(recovered)
+
+    def _compact_sync(self) -> int:
+        fd = os.open(self.log_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            # لاگ پر خصوصی لاک تاکہ کمپیکشن کے دوران کوئی اور پروسیس اضافہ نہ کرے
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                log_entries = self._read_log()
+                if not log_entries:
+                    return 0
+                frames = [pd.DataFrame(log_entries)]
+                if os.path.exists(self.snapshot_path):
+                    frames.insert(0, pd.read_parquet(self.snapshot_path))
+                combined = self._drop_duplicate_signals(pd.concat(frames, ignore_index=True))
+                if "component_scores" in combined:
+                    combined["component_scores"] = combined["component_scores"].map(
+                        lambda v: json.dumps(v) if isinstance(v, dict) else v
+                    )
+                tmp_path = self.snapshot_path + ".tmp"
+                combined.to_parquet(tmp_path, index=False)
+                os.replace(tmp_path, self.snapshot_path)
+                os.ftruncate(fd, 0)
+                os.fsync(fd)
+                return len(log_entries)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    async def compact(self):
+        """لاگ کو کالم وار اسنیپ شاٹ میں ضم کر کے لاگ کو خالی کرتا ہے۔"""
+        try:
+            if self._io_lock:
+                async with self._io_lock:
+                    compacted = await asyncio.to_thread(self._compact_sync)
+            else:
+                compacted = await asyncio.to_thread(self._compact_sync)
+            if compacted:
+                logger.info(f"🧠 لرننگ لاگ کے {compacted} اندراجات اسنیپ شاٹ '{self.snapshot_path}' میں کمپیکٹ ہو گئے۔")
+        except Exception as e:
+            logger.error(f"🧠 لرننگ لاگ کی کمپیکشن میں خرابی: {e}", exc_info=True)
+
+# لرننگ اسٹور کا عالمی نمونہ
+learning_store = LearningStore()
@@ -7,6 +7,11 @@ import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+def calculate_atr(df: pd.DataFrame, span: int = 14) -> float:
+    """آخری کینڈل پر ATR (EWM span) کی قدر۔"""
+    tr = pd.concat([df['high'] - df['low'], abs(df['high'] - df['close'].shift()), abs(df['low'] - df['close'].shift())], axis=1).max(axis=1)
+    return tr.ewm(span=span, adjust=False).mean().iloc[-1]
+
 def find_realistic_tp_sl(df: pd.DataFrame, signal_type: str, symbol_personality: Dict) -> Optional[Tuple[float, float]]:
     """
     ATR اور حالیہ سوئنگ پوائنٹس کی بنیاد پر ایک حقیقت پسندانہ TP/SL کا تعین کرتا ہے۔
@@ -16,8 +21,7 @@ def find_realistic_tp_sl(df: pd.DataFrame, signal_type: str, symbol_personality:
 
     last_close = df['close'].iloc[-1]
     
-    tr = pd.concat([df['high'] - df['low'], abs(df['high'] - df['close'].shift()), abs(df['low'] - df['close'].shift())], axis=1).max(axis=1)
-    atr = tr.ewm(span=14, adjust=False).mean().iloc[-1]
+    atr = calculate_atr(df)
     
     if atr == 0:
         return None
@@ -45,4 +49,38 @@ def find_realistic_tp_sl(df: pd.DataFrame, signal_type: str, symbol_personality:
         
     logger.info(f"حقیقت پسندانہ TP/SL ملا: TP={take_profit:.5f}, SL={stop_loss:.5f} (RR: {min_rr_ratio})")
     return take_profit, stop_loss
-    
+
+def resolve_intrabar_outcome(
+    signal_type: str,
+    tp: float,
+    sl: float,
+    bar_open: float,
+    bar_high: float,
+    bar_low: float,
+    ambiguity_policy: str = "sl_first"
+) -> Optional[str]:
+    """
+    ایک کینڈل کے high/low سے طے کرتا ہے کہ TP یا SL میں سے کون سی سطح چھوئی گئی۔
+    اگر دونوں ایک ہی کینڈل میں چھو جائیں تو پالیسی فیصلہ کرتی ہے:
+    - sl_first: محتاط فرض کہ SL پہلے لگا
+    - tp_first: TP پہلے لگا
+    - nearest_open: کینڈل کے open سے قریب ترین سطح پہلے لگی
+    Returns: 'tp_hit'، 'sl_hit' یا None
+    """
+    if signal_type == 'buy':
+        tp_touched, sl_touched = bar_high >= tp, bar_low <= sl
+    else:
+        tp_touched, sl_touched = bar_low <= tp, bar_high >= sl
+
+    if tp_touched and not sl_touched:
+        return "tp_hit"
+    if sl_touched and not tp_touched:
+        return "sl_hit"
+    if not tp_touched:
+        return None
+
+    if ambiguity_policy == "tp_first":
+        return "tp_hit"
+    if ambiguity_policy == "nearest_open":
+        return "tp_hit" if abs(bar_open - tp) < abs(bar_open - sl) else "sl_hit"
+    return "sl_hit"
@@ -0,0 +1,178 @@
+# filename: load_test.py
+
+"""
+REST اینڈ پوائنٹس کی تاخیر (p50/p95/p99) کا لوڈ ٹیسٹ، جبکہ ساتھ ہی ایک شکار کا دور ڈیٹا بیس میں لکھ رہا ہو۔
+
+ایپ اسی پروسیس اور اسی ایونٹ لوپ میں (ASGI ٹرانسپورٹ کے ذریعے) چلتی ہے، جیسے پروڈکشن کا ایک ورکر۔
+لکھنے والا دور یا تو پرانے sync راستے (database_crud) سے چلتا ہے یا نئے async راستے (async_crud) سے،
+تاکہ دونوں کا موازنہ ہو سکے کہ ڈیٹا بیس کی لکھائی ایونٹ لوپ کو کتنا روکتی ہے۔ لکھنے والا نشریات کے بغیر سیدھا
+crud کو بلاتا ہے، اس لیے ہر لکھائی کے بعد جوابی کیش اسی طرح خالی کیا جاتا ہے جیسے پروڈکشن میں متعلقہ نشریہ کرتا؛
+ورنہ ٹیسٹ صرف کیش ہٹس ناپتا۔
+
+ٹیسٹ DATABASE_URL والے ڈیٹا بیس میں جعلی سگنلز لکھتا ہے، اس لیے اسے صرف الگ (scratch) ڈیٹا بیس پر چلائیں:
+--scratch-database میں اسی ڈیٹا بیس کا نام دینا لازمی ہے۔ جعلی سگنلز غیر ٹریڈنگ نتیجے (load_test) کے ساتھ
+آرکائیو ہوتے ہیں، اس لیے لرننگ لاگ میں نہیں جاتے، اور ٹیسٹ ختم ہونے پر ان کی تمام قطاریں حذف کر دی جاتی ہیں۔
+
+استعمال:
+    DATABASE_URL=postgresql://.../scalp_loadtest python load_test.py --scratch-database scalp_loadtest --mode both
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+import numpy as np
+from sqlalchemy import delete, make_url
+
+import async_crud
+import database_crud as crud
+from app import app
+from models import (ActiveSignal, AsyncSessionLocal, CompletedTrade, SessionLocal, TradeStatsHourly,
+                    create_db_and_tables, db_url_str)
+from response_cache import response_cache
+from signal_registry import registry
+
+logger = logging.getLogger(__name__)
+
+ENDPOINTS = ("/api/daily-stats", "/api/history", "/api/active-signals")
+SYMBOLS_PER_CYCLE = 20
+# جعلی علامتوں کا سابقہ؛ صفائی انہی قطاروں کو حذف کرتی ہے
+SYMBOL_PREFIX = "LOADTEST_"
+# غیر ٹریڈنگ نتیجہ: ون ریٹ اور لرننگ لاگ (reconcile_with_trades) میں شمار نہیں ہوتا
+LOAD_TEST_OUTCOME = "load_test"
+
+def _cycle_symbols(cycle: str) -> List[str]:
+    # signal_id سیکنڈ کی درستگی والے وقت سے بنتا ہے، اس لیے ہر دور کی علامتیں الگ رکھی گئی ہیں
+    return [f"{SYMBOL_PREFIX}{cycle}_{i:02d}/USD" for i in range(SYMBOLS_PER_CYCLE)]
+
+def _fake_signal(symbol: str) -> Dict:
+    price = 1.0
+    return {
+        "symbol": symbol, "signal": "buy", "price": price, "tp": price + 0.003, "sl": price - 0.002,
+        "confidence": 80.0, "reason": "load test", "timeframe": "15min",
+        "component_scores": {"scalper_score": 1, "cautious_score": 1, "atr": 0.001},
+    }
+
+async def _hunt_cycle_sync(cycle: str):
+    # پرانا راستہ: ہر کوئری ایونٹ لوپ پر ہی رکاوٹ ڈالتی ہے
+    db = SessionLocal()
+    try:
+        symbols = _cycle_symbols(cycle)
+        for symbol in symbols:
+            crud.add_or_update_active_signal(db, _fake_signal(symbol))
+            response_cache.invalidate_for_event("new_signal")
+            await asyncio.sleep(0)
+        ids = [s.signal_id for s in registry.all() if s.symbol in symbols]
+        crud.bulk_close_and_archive_signals(db, ids, LOAD_TEST_OUTCOME, "load test")
+        response_cache.invalidate_for_event("signals_closed")
+    finally:
+        db.close()
+
+async def _hunt_cycle_async(cycle: str):
+    async with AsyncSessionLocal() as db:
+        symbols = _cycle_symbols(cycle)
+        for symbol in symbols:
+            await async_crud.add_or_update_active_signal(db, _fake_signal(symbol))
+            response_cache.invalidate_for_event("new_signal")
+        ids = [s.signal_id for s in registry.all() if s.symbol in symbols]
+        await async_crud.bulk_close_and_archive_signals(db, ids, LOAD_TEST_OUTCOME, "load test")
+        response_cache.invalidate_for_event("signals_closed")
+
+async def _writer(mode: str, stop: asyncio.Event) -> int:
+    cycle_fn = _hunt_cycle_sync if mode == "sync" else _hunt_cycle_async
+    cycles = 0
+    while not stop.is_set():
+        await cycle_fn(f"{mode}{int(time.time())}_{cycles}")
+        cycles += 1
+    return cycles
+
+async def _client(http: httpx.AsyncClient, stop: asyncio.Event, latencies: List[float], errors: List[int]):
+    i = 0
+    while not stop.is_set():
+        path = ENDPOINTS[i % len(ENDPOINTS)]
+        started = time.perf_counter()
+        response = await http.get(path)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            errors.append(response.status_code)
+        i += 1
+
+def _percentiles(latencies: List[float]) -> Dict[str, float]:
+    arr = np.asarray(latencies)
+    return {
+        "requests": int(arr.size),
+        "p50_ms": round(float(np.percentile(arr, 50)), 2),
+        "p95_ms": round(float(np.percentile(arr, 95)), 2),
+        "p99_ms": round(float(np.percentile(arr, 99)), 2),
+        "max_ms": round(float(arr.max()), 2),
+    }
+
+async def run_load_test(mode: str, duration: float, clients: int) -> Dict:
+    """ایک موڈ ('sync' یا 'async' لکھائی) کے لیے لوڈ ٹیسٹ چلاتا ہے اور تاخیر کے اعداد واپس کرتا ہے۔"""
+    stop = asyncio.Event()
+    latencies: List[float] = []
+    errors: List[int] = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as http:
+        writer = asyncio.create_task(_writer(mode, stop))
+        client_tasks = [asyncio.create_task(_client(http, stop, latencies, errors)) for _ in range(clients)]
+        await asyncio.sleep(duration)
+        stop.set()
+        cycles = await writer
+        await asyncio.gather(*client_tasks)
+    return {"write_mode": mode, "hunt_cycles": cycles, "errors": len(errors), **_percentiles(latencies)}
+
+def cleanup_load_test_rows() -> int:
+    """ٹیسٹ کی تمام جعلی قطاریں (فعال، آرکائیو شدہ اور گھنٹہ وار خلاصہ) حذف کرتا ہے۔"""
+    db = SessionLocal()
+    try:
+        deleted = 0
+        for model in (ActiveSignal, CompletedTrade, TradeStatsHourly):
+            deleted += db.execute(delete(model).where(model.symbol.startswith(SYMBOL_PREFIX, autoescape=True))).rowcount
+        db.commit()
+        registry.rebuild(db)
+        return deleted
+    finally:
+        db.close()
+
+async def _main(args):
+    create_db_and_tables()
+    db = SessionLocal()
+    try:
+        registry.rebuild(db)
+    finally:
+        db.close()
+    modes = ("sync", "async") if args.mode == "both" else (args.mode,)
+    try:
+        results = [await run_load_test(mode, args.duration, args.clients) for mode in modes]
+    finally:
+        logger.warning(f"🧹 لوڈ ٹیسٹ کی {cleanup_load_test_rows()} قطاریں حذف کی گئیں۔")
+    print(json.dumps(results, indent=2))
+
+def main():
+    parser = argparse.ArgumentParser(description="شکار کے دور کی لکھائی کے دوران REST تاخیر کا لوڈ ٹیسٹ")
+    parser.add_argument("--mode", default="both", choices=("sync", "async", "both"))
+    parser.add_argument("--duration", type=float, default=20.0, help="ہر موڈ کا دورانیہ (سیکنڈ)")
+    parser.add_argument("--clients", type=int, default=20, help="بیک وقت REST کلائنٹس")
+    parser.add_argument(
+        "--scratch-database", required=True,
+        help="DATABASE_URL والے ڈیٹا بیس کا نام؛ تصدیق کہ ٹیسٹ الگ (scratch) ڈیٹا بیس پر چل رہا ہے",
+    )
+    args = parser.parse_args()
+    configured = make_url(db_url_str).database
+    if args.scratch_database != configured:
+        sys.exit(
+            f"--scratch-database '{args.scratch_database}' موجودہ DATABASE_URL کے ڈیٹا بیس '{configured}' سے نہیں ملتا؛ "
+            "لوڈ ٹیسٹ صرف الگ (scratch) ڈیٹا بیس پر چلائیں۔"
+        )
+    # app.py لاگنگ INFO پر ترتیب دیتا ہے؛ لوڈ کے دوران صرف انتباہات
+    logging.getLogger().setLevel(logging.WARNING)
+    asyncio.run(_main(args))
+
+if __name__ == "__main__":
+    main()
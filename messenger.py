@@ -1,12 +1,11 @@
 # filename: messenger.py
 
 import logging
-from typing import Dict, Any
-
-import httpx
+from typing import Dict, Any, Optional
 
 # مقامی امپورٹس
 from config import api_settings
+from telegram_dispatcher import telegram_dispatcher
 
 logger = logging.getLogger(__name__)
 
@@ -30,26 +29,15 @@ def _normalize_signal_data(signal_data: Dict[str, Any]) -> Dict[str, Any]:
         "reason": signal_data.get('reason', 'کوئی وجہ فراہم نہیں کی گئی۔'),
     }
 
-async def _send_message(message: str, symbol: str, alert_type: str):
+def _send_message(message: str, symbol: str, alert_type: str, digest_key: Optional[str] = None):
     """
-    ٹیلیگرام API کو ایک پیغام بھیجنے کے لیے مرکزی فنکشن۔
+    الرٹ کو ٹیلیگرام ڈسپیچر کی قطار میں ڈالتا ہے (فوراً واپس آتا ہے)۔ شرح کی حد، دوبارہ کوشش اور ڈائجسٹ
+    telegram_dispatcher سنبھالتا ہے۔
     """
     if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
         logger.warning("ٹیلیگرام بوٹ ٹوکن یا چیٹ آئی ڈی سیٹ نہیں ہے۔ الرٹ نہیں بھیجا جا رہا۔")
         return
-
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    params = {'chat_id': TELEGRAM_CHAT_ID, 'text': message, 'parse_mode': 'Markdown'}
-
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=params)
-            response.raise_for_status()
-        logger.info(f"'{symbol}' کے لیے ٹیلیگرام {alert_type} الرٹ کامیابی سے بھیجا گیا۔")
-    except httpx.HTTPStatusError as e:
-        logger.error(f"ٹیلیگرام API سے خرابی ({e.response.status_code}): {e.response.text}")
-    except Exception as e:
-        logger.error(f"ٹیلیگرام {alert_type} الرٹ بھیجنے میں ناکام: {e}", exc_info=True)
+    telegram_dispatcher.submit(message, symbol, alert_type, digest_key=digest_key)
 
 async def send_telegram_alert(signal_data: Dict[str, Any]):
     """ایک نئے سگنل کے لیے فارمیٹ شدہ ٹیلیگرام الرٹ بھیجتا ہے۔"""
@@ -67,7 +55,7 @@ async def send_telegram_alert(signal_data: Dict[str, Any]):
         f"📝 *AI وجہ:* _{norm_data['reason']}_"
     )
     
-    await _send_message(message, norm_data['symbol'], "نیا سگنل")
+    _send_message(message, norm_data['symbol'], "نیا سگنل")
 
 async def send_signal_update_alert(updated_signal: Dict[str, Any]):
     """ایک اپ ڈیٹ شدہ سگنل کے لیے فارمیٹ شدہ ٹیلیگرام الرٹ بھیجتا ہے۔"""
@@ -81,5 +69,6 @@ async def send_signal_update_alert(updated_signal: Dict[str, Any]):
         f"📝 *تازہ ترین AI وجہ:* _{norm_data['reason']}_"
     )
     
-    await _send_message(message, norm_data['symbol'], "سگنل اپ ڈیٹ")
+    # ایک ہی علامت کی اپ ڈیٹس ڈائجسٹ موڈ میں ضم ہو سکتی ہیں
+    _send_message(message, norm_data['symbol'], "سگنل اپ ڈیٹ", digest_key=norm_data['symbol'])
     
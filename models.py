@@ -3,9 +3,10 @@
 import logging
 from datetime import datetime
 
-from sqlalchemy import (Boolean, Column, DateTime, Float, Integer, JSON,
-                        String, create_engine, event)
+from sqlalchemy import (Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, JSON,
+                        String, create_engine, event, make_url, text)
 from sqlalchemy.exc import DisconnectionError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 # مقامی امپورٹس
@@ -34,6 +35,24 @@ engine = create_engine(
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# --- غیر مطابقت پذیر (async) کنکشن ---
+# API اینڈ پوائنٹس اور پس منظر کی جابز ایونٹ لوپ کو روکے بغیر ڈیٹا بیس استعمال کرتی ہیں:
+# PostgreSQL کے لیے asyncpg اور مقامی SQLite کے لیے aiosqlite
+
+def _async_engine_config(url: str):
+    """sync URL سے async ڈرائیور والا URL اور کنکشن کے دلائل۔"""
+    sync_url = make_url(url)
+    if is_sqlite:
+        return sync_url.set(drivername="sqlite+aiosqlite"), {}
+    # asyncpg 'sslmode' نہیں سمجھتا، اسے 'ssl' میں بدلیں
+    sslmode = sync_url.query.get("sslmode")
+    async_url = sync_url.set(drivername="postgresql+asyncpg").difference_update_query(["sslmode"])
+    return async_url, ({"ssl": sslmode} if sslmode else {})
+
+_async_url, _async_connect_args = _async_engine_config(db_url_str)
+async_engine = create_async_engine(_async_url, connect_args=_async_connect_args, **engine_args)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 # --- ڈیٹا بیس ماڈلز ---
@@ -80,6 +99,12 @@ class CompletedTrade(Base):
     # ★★★ خرابی کا حل یہاں ہے ★★★
     created_at = Column(DateTime, default=datetime.utcnow) # یہ لائن شامل کی گئی ہے
     closed_at = Column(DateTime, default=datetime.utcnow)
+
+    # /api/history کی keyset صفحہ بندی (closed_at, id) کے لیے؛ علامت والا انڈیکس فلٹر شدہ صفحات کے لیے
+    __table_args__ = (
+        Index("ix_completed_trades_closed_at_id", "closed_at", "id"),
+        Index("ix_completed_trades_symbol_closed_at_id", "symbol", "closed_at", "id"),
+    )
     
     def as_dict(self):
         d = {c.name: getattr(self, c.name) for c in self.__table__.columns}
@@ -89,11 +114,106 @@ class CompletedTrade(Base):
             d['closed_at'] = d['closed_at'].isoformat()
         return d
 
-class CachedNews(Base):
-    __tablename__ = "cached_news"
+class TradeStatsHourly(Base):
+    """
+    بند ٹریڈز کا گھنٹہ وار خلاصہ (hour, symbol, outcome)۔ آرکائیو کی ٹرانزیکشن میں ہی اپ ڈیٹ ہوتا ہے،
+    اس لیے اعداد و شمار کی کوئریز completed_trades کو گننے کے بجائے یہاں سے چند قطاریں پڑھتی ہیں۔
+    """
+    __tablename__ = "trade_stats_hourly"
+    hour = Column(DateTime, primary_key=True)
+    symbol = Column(String, primary_key=True)
+    outcome = Column(String, primary_key=True)
+    trade_count = Column(Integer, nullable=False, default=0)
+
+class NewsArticleRecord(Base):
+    """ایک خبر فی قطار، فراہم کنندہ کی شناخت (article_id) پر منفرد۔ published_at naive UTC ہے۔"""
+    __tablename__ = "news_articles"
+    article_id = Column(String, primary_key=True)
+    title = Column(String)
+    url = Column(String)
+    source = Column(String)
+    snippet = Column(String)
+    published_at = Column(DateTime, index=True, nullable=False)
+    is_high_impact = Column(Boolean, default=False, nullable=False)
+    fetched_at = Column(DateTime, default=datetime.utcnow)
+
+class NewsArticleSymbol(Base):
+    """
+    خبر اور علامت (مثلاً USD، EUR) کا ربط۔ اثر اور وقت یہاں بھی رکھے گئے ہیں تاکہ
+    "USD کی کوئی اعلیٰ اثر والی خبر T1 اور T2 کے درمیان" ایک ہی انڈیکس رینج پڑھ لے۔
+    """
+    __tablename__ = "news_article_symbols"
+    article_id = Column(String, ForeignKey("news_articles.article_id", ondelete="CASCADE"), primary_key=True)
+    symbol = Column(String, primary_key=True)
+    is_high_impact = Column(Boolean, default=False, nullable=False)
+    published_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_news_article_symbols_symbol_impact_published", "symbol", "is_high_impact", "published_at"),
+    )
+
+class CandleRecord(Base):
+    """
+    ایک OHLCV کینڈل فی قطار۔ بنیادی کلید (symbol, timeframe, ts) ہی رینج پڑھائی کا انڈیکس ہے، اس لیے
+    کسی علامت کی کھڑکی ایک ہی انڈیکس اسکین میں پڑھی جاتی ہے۔ ts کینڈل کے آغاز کا naive UTC وقت ہے۔
+    """
+    __tablename__ = "candles"
+    symbol = Column(String, primary_key=True)
+    timeframe = Column(String, primary_key=True)
+    ts = Column(DateTime, primary_key=True)
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    volume = Column(Float)
+
+class WebhookSubscription(Base):
+    """
+    بیرونی سسٹم (مثلاً ایکزیکیوشن بوٹ) کی webhook سبسکرپشن۔ symbols / event_types خالی (NULL) ہوں تو سب۔
+    secret سے ہر ترسیل HMAC سے دستخط شدہ ہوتی ہے۔
+    """
+    __tablename__ = "webhook_subscriptions"
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String, nullable=False)
+    secret = Column(String, nullable=False)
+    symbols = Column(JSON)
+    event_types = Column(JSON)
+    max_concurrency = Column(Integer, nullable=False, default=4)
+    is_active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class WebhookDelivery(Base):
+    """
+    ناکام webhook ترسیلات کی پائیدار قطار: status 'pending' (next_attempt_at پر دوبارہ کوشش) یا 'dead'
+    (کوششیں ختم؛ dead-letter)۔ body وہی بائٹس ہیں جو پہلی بار دستخط ہوئیں، تاکہ دوبارہ کوشش بالکل یکساں ہو۔
+    """
+    __tablename__ = "webhook_deliveries"
     id = Column(Integer, primary_key=True, index=True)
-    content = Column(JSON)
-    updated_at = Column(DateTime, default=datetime.utcnow)
+    subscription_id = Column(Integer, ForeignKey("webhook_subscriptions.id", ondelete="CASCADE"), nullable=False)
+    event_id = Column(String, nullable=False)
+    event_type = Column(String, nullable=False)
+    body = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False)
+    last_error = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_webhook_deliveries_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+def ensure_indexes(bind=None):
+    """
+    create_all صرف نئی ٹیبلز کے انڈیکس بناتا ہے؛ یہ موجودہ ٹیبلز پر بعد میں شامل کیے گئے انڈیکس بھی بناتا ہے۔
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind or engine, checkfirst=True)
+
+# اسکیما بنانے کا لاک: کئی gunicorn ورکرز ایک ساتھ شروع ہوں تو create_all آپس میں نہ ٹکرائیں
+SCHEMA_LOCK_KEY = 7_404_500
 
 def create_db_and_tables():
     """
@@ -101,7 +221,15 @@ def create_db_and_tables():
     """
     try:
         logger.info("ڈیٹا بیس اور ٹیبلز کی حالت کی تصدیق کی جا رہی ہے...")
-        Base.metadata.create_all(bind=engine)
+        if is_sqlite:
+            Base.metadata.create_all(bind=engine)
+            ensure_indexes()
+        else:
+            # ٹرانزیکشن لاک: باقی ورکرز انتظار کرتے ہیں اور پھر سب کچھ پہلے سے موجود پاتے ہیں
+            with engine.begin() as connection:
+                connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+                Base.metadata.create_all(bind=connection)
+                ensure_indexes(connection)
         logger.info("ٹیبلز کامیابی سے بنائے یا تصدیق کیے گئے۔")
     except Exception as e:
         logger.critical(f"ڈیٹا بیس بنانے میں ایک سنگین خرابی پیش آئی: {e}", exc_info=True)
@@ -0,0 +1,79 @@
+# filename: news_index.py
+
+"""
+اعلیٰ اثر والی خبروں کے اوقات کا پروسیس کے اندر انڈیکس۔
+
+فیوژن انجن ہر ممکنہ سگنل کے لیے اور TrainerAI ہر بند ٹریڈ کے لیے پوچھتا ہے کہ "کیا اس علامت کی کوئی اعلیٰ اثر
+والی خبر [T1, T2] میں ہے؟"۔ ہر کرنسی کے لیے ایسی خبروں کے اوقات ترتیب شدہ فہرست میں رکھے جاتے ہیں، اس لیے یہ
+سوال ڈیٹا بیس کے بجائے bisect سے O(log n) میں حل ہوتا ہے۔ خبروں کے ہر ریفریش پر پورا انڈیکس نئے سرے سے بنا
+کر ایک ہی اسائنمنٹ میں بدلا جاتا ہے، اس لیے پڑھنے والے کبھی آدھا بنا انڈیکس نہیں دیکھتے۔
+"""
+
+import logging
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+import async_crud
+import database_crud as crud
+
+logger = logging.getLogger(__name__)
+
+class _SymbolEvents(NamedTuple):
+    """ایک علامت کی اعلیٰ اثر والی خبریں، وقت کے لحاظ سے ترتیب شدہ (naive UTC)۔"""
+    times: List[datetime]
+    titles: List[str]
+
+class HighImpactNewsIndex:
+    """علامت کے لحاظ سے اعلیٰ اثر والی خبروں کے ترتیب شدہ اوقات۔"""
+    def __init__(self):
+        self._events: Dict[str, _SymbolEvents] = {}
+        self.is_loaded = False
+
+    def rebuild(self, events: Iterable[Tuple[str, datetime, Optional[str]]]) -> int:
+        """(symbol, published_at, title) قطاروں سے نیا انڈیکس بنا کر پرانے کی جگہ رکھتا ہے۔"""
+        grouped: Dict[str, List[Tuple[datetime, str]]] = {}
+        count = 0
+        for symbol, published_at, title in events:
+            grouped.setdefault(symbol, []).append((published_at, title or ""))
+            count += 1
+        index = {}
+        for symbol, pairs in grouped.items():
+            pairs.sort(key=lambda pair: pair[0])
+            index[symbol] = _SymbolEvents([t for t, _ in pairs], [title for _, title in pairs])
+        # ایک ہی اسائنمنٹ: پڑھنے والے یا تو پرانا انڈیکس دیکھتے ہیں یا نیا
+        self._events = index
+        self.is_loaded = True
+        logger.info(f"📰 اعلیٰ اثر والی خبروں کا انڈیکس بنایا گیا: {len(index)} علامتیں، {count} خبریں۔")
+        return count
+
+    def load(self, db: Session) -> int:
+        """ڈیٹا بیس سے انڈیکس بناتا ہے (اسٹارٹ اپ پر)۔"""
+        return self.rebuild(crud.get_high_impact_news_events(db) or [])
+
+    async def refresh(self, db: AsyncSession) -> int:
+        """خبروں کے ریفریش کے بعد انڈیکس دوبارہ بناتا ہے۔ پڑھائی ناکام ہو تو پرانا انڈیکس برقرار رہتا ہے۔"""
+        events = await async_crud.get_high_impact_news_events(db)
+        if events is None:
+            return 0
+        return self.rebuild(events)
+
+    def find(self, symbols: Iterable[str], start: datetime, end: datetime) -> Optional[str]:
+        """[start, end] (naive UTC) میں ان علامتوں کی سب سے پہلی اعلیٰ اثر والی خبر کا عنوان، ورنہ None۔"""
+        index = self._events
+        earliest: Optional[Tuple[datetime, str]] = None
+        for symbol in symbols:
+            events = index.get(symbol)
+            if not events:
+                continue
+            i = bisect_left(events.times, start)
+            if i < len(events.times) and events.times[i] <= end:
+                if earliest is None or events.times[i] < earliest[0]:
+                    earliest = (events.times[i], events.titles[i])
+        return earliest[1] if earliest else None
+
+# انڈیکس کا عالمی نمونہ
+news_index = HighImpactNewsIndex()
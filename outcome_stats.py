@@ -0,0 +1,220 @@
+# filename: outcome_stats.py
+
+"""
+ٹریڈز کے نتائج کے آن لائن، وقت کے ساتھ کمزور ہونے والے (time-decayed) مجموعے۔
+
+ہر کلید (symbol, grade, regime, strategy_type) کے لیے صرف چند اعداد رکھے جاتے ہیں: کمزور شدہ وزن، جیتیں،
+اور R-ملٹیپل کا مجموعہ۔ ہر نیا نتیجہ O(1) میں شامل ہوتا ہے اور ہر تلاش بھی O(1) ہے، اس لیے فیوژن انجن
+تاریخ کو اسکین کیے بغیر اعتماد کی انشانکن کر سکتا ہے۔ ہر نتیجہ ایک عمومی کلید (symbol = "*") میں بھی
+شامل کیا جاتا ہے تاکہ کسی جوڑے کا ڈیٹا کم ہو تو تمام جوڑوں کا مجموعہ استعمال ہو سکے۔
+"""
+
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from config import strategy_settings
+
+logger = logging.getLogger(__name__)
+
+ANY_SYMBOL = "*"
+StatsKey = Tuple[str, str, str, str]
+
+class OutcomeStats(NamedTuple):
+    """ایک کلید کے کمزور شدہ اعداد و شمار، تلاش کے وقت تک کمزور کیے گئے۔"""
+    weight: float               # کمزور شدہ نتائج کی مؤثر تعداد
+    win_rate: float
+    expectancy_r: Optional[float]
+    count: int                  # کل نتائج (بغیر کمزوری کے)
+
+class _Aggregate:
+    __slots__ = ("weight", "wins", "r_weight", "r_sum", "count", "updated_at")
+
+    def __init__(self):
+        self.weight = 0.0
+        self.wins = 0.0
+        self.r_weight = 0.0
+        self.r_sum = 0.0
+        self.count = 0
+        self.updated_at: Optional[datetime] = None
+
+def r_multiple(outcome: str, entry: Optional[float], tp: Optional[float], sl: Optional[float]) -> Optional[float]:
+    """TP پر +انعام/خطرہ، SL پر -1۔ قیمتیں نہ ہوں تو None۔"""
+    if outcome == "sl_hit":
+        return -1.0
+    if outcome != "tp_hit" or None in (entry, tp, sl):
+        return None
+    risk = abs(entry - sl)
+    return abs(tp - entry) / risk if risk > 0 else None
+
+def realized_r_multiple(
+    outcome: str, signal_type: Optional[str], entry: Optional[float], close: Optional[float],
+    tp: Optional[float], sl: Optional[float],
+) -> Optional[float]:
+    """بند ہونے کی اصل قیمت سے R: (close − entry) / خطرہ، سمت کے مطابق۔ close یا سمت نہ ہو تو r_multiple۔"""
+    if close is None or entry is None or sl is None or signal_type not in ("buy", "sell"):
+        return r_multiple(outcome, entry, tp, sl)
+    risk = abs(entry - sl)
+    if risk <= 0:
+        return None
+    return ((close - entry) if signal_type == "buy" else (entry - close)) / risk
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).replace(tzinfo=None)
+        except ValueError:
+            return None
+    return None
+
+class OutcomeStatsStore:
+    """
+    کلید کے لحاظ سے کمزور شدہ مجموعے۔ ہر اپ ڈیٹ پر پچھلے اعداد کو 0.5^(Δt / half_life) سے
+    ضرب دے کر نیا نتیجہ جوڑا جاتا ہے۔
+    """
+    def __init__(self, half_life_days: float = strategy_settings.OUTCOME_HALF_LIFE_DAYS):
+        self.half_life_seconds = half_life_days * 86400
+        self._aggregates: Dict[StatsKey, _Aggregate] = {}
+        self._lock = threading.Lock()
+
+    def _decay(self, since: Optional[datetime], now: datetime) -> float:
+        if since is None or now <= since:
+            return 1.0
+        return 0.5 ** ((now - since).total_seconds() / self.half_life_seconds)
+
+    def _update(self, key: StatsKey, win: bool, r: Optional[float], at: datetime):
+        agg = self._aggregates.get(key)
+        if agg is None:
+            agg = self._aggregates[key] = _Aggregate()
+        if agg.updated_at is not None and at < agg.updated_at:
+            # ترتیب سے ہٹ کر آیا پرانا نتیجہ: مجموعہ وہیں رہے، نیا نتیجہ اپنی عمر کے مطابق کمزور وزن سے
+            factor, added = 1.0, self._decay(at, agg.updated_at)
+        else:
+            factor, added = self._decay(agg.updated_at, at), 1.0
+        agg.weight = agg.weight * factor + added
+        agg.wins = agg.wins * factor + (added if win else 0.0)
+        agg.r_weight *= factor
+        agg.r_sum *= factor
+        if r is not None:
+            agg.r_weight += added
+            agg.r_sum += r * added
+        agg.count += 1
+        agg.updated_at = max(at, agg.updated_at) if agg.updated_at else at
+
+    def record(
+        self, symbol: str, grade: str, regime: str, strategy_type: str,
+        outcome: str, r: Optional[float] = None, at: Optional[datetime] = None
+    ):
+        """ایک نتیجہ جوڑے کی کلید اور عمومی کلید دونوں میں شامل کرتا ہے۔"""
+        if outcome not in ("tp_hit", "sl_hit"):
+            return
+        at = at or datetime.utcnow()
+        win = outcome == "tp_hit"
+        with self._lock:
+            self._update((symbol, grade, regime, strategy_type), win, r, at)
+            self._update((ANY_SYMBOL, grade, regime, strategy_type), win, r, at)
+
+    def record_entry(self, entry: Dict[str, Any]) -> bool:
+        """
+        لرننگ لاگ کا ایک اندراج شامل کرتا ہے۔ جن اندراجات کے component_scores میں گریڈ وغیرہ نہ ہوں
+        (پرانے یا بحال شدہ) وہ نظر انداز ہوتے ہیں۔
+        """
+        scores = entry.get("component_scores")
+        if isinstance(scores, str):
+            try:
+                scores = json.loads(scores)
+            except json.JSONDecodeError:
+                scores = None
+        if not isinstance(scores, dict) or "signal_grade" not in scores:
+            return False
+        r = entry.get("r_multiple")
+        self.record(
+            entry.get("symbol"), scores["signal_grade"], scores.get("market_regime", "Unknown"),
+            scores.get("strategy_type", "Unknown"), entry.get("outcome"),
+            r if isinstance(r, (int, float)) and r == r else None,
+            _parse_timestamp(entry.get("timestamp")),
+        )
+        return True
+
+    def get(self, key: StatsKey, now: Optional[datetime] = None) -> Optional[OutcomeStats]:
+        """O(1) تلاش، موجودہ وقت تک کمزور کیے گئے اعداد کے ساتھ۔"""
+        agg = self._aggregates.get(key)
+        if agg is None or agg.weight <= 0:
+            return None
+        factor = self._decay(agg.updated_at, now or datetime.utcnow())
+        weight = agg.weight * factor
+        return OutcomeStats(
+            weight=weight,
+            win_rate=agg.wins / agg.weight,
+            expectancy_r=agg.r_sum / agg.r_weight if agg.r_weight > 0 else None,
+            count=agg.count,
+        )
+
+    def lookup(self, symbol: str, grade: str, regime: str, strategy_type: str) -> Optional[OutcomeStats]:
+        """پہلے جوڑے کی کلید، اور اگر اس کا وزن کم ہو تو عمومی کلید۔"""
+        specific = self.get((symbol, grade, regime, strategy_type))
+        if specific and specific.weight >= strategy_settings.CALIBRATION_PRIOR_WEIGHT:
+            return specific
+        pooled = self.get((ANY_SYMBOL, grade, regime, strategy_type))
+        if specific is None or (pooled and pooled.weight > specific.weight * 2):
+            return pooled
+        return specific
+
+    def calibrate_confidence(
+        self, base_confidence: float, symbol: str, grade: str, regime: str, strategy_type: str,
+        risk_reward: Optional[float] = None, threshold: float = strategy_settings.FINAL_CONFIDENCE_THRESHOLD,
+    ) -> float:
+        """
+        گریڈ کے مقررہ اعتماد کو تجرباتی توقع (expectancy، R میں) کی طرف سکیڑتا ہے: s = n / (n + K)۔
+        تجرباتی اعتماد = threshold + E × CALIBRATION_CONFIDENCE_PER_R، یعنی breakeven سیٹ اپ ٹھیک تھریشولڈ پر
+        اور منافع بخش سیٹ اپ اس سے اوپر، چاہے بڑے RR کی وجہ سے جیت کی شرح 50% سے کم ہو۔ E اس سیٹ اپ کے RR اور
+        جیت کی شرح سے (p × RR − (1 − p))، اور RR معلوم نہ ہو تو ماضی کی ٹریڈز کی expectancy_r سے۔
+        کم ڈیٹا پر نتیجہ تقریباً مقررہ قدر ہی رہتا ہے۔
+        """
+        stats = self.lookup(symbol, grade, regime, strategy_type)
+        if stats is None:
+            return base_confidence
+        if risk_reward and risk_reward > 0:
+            expectancy = stats.win_rate * risk_reward - (1 - stats.win_rate)
+        else:
+            expectancy = stats.expectancy_r
+        if expectancy is None:
+            return base_confidence
+        observed = min(100.0, max(0.0, threshold + expectancy * strategy_settings.CALIBRATION_CONFIDENCE_PER_R))
+        shrink = stats.weight / (stats.weight + strategy_settings.CALIBRATION_PRIOR_WEIGHT)
+        return base_confidence * (1 - shrink) + observed * shrink
+
+    def seed_from_learning_log(self) -> int:
+        """اسٹارٹ اپ پر لرننگ لاگ (اسنیپ شاٹ + JSONL) سے مجموعے دوبارہ بناتا ہے۔"""
+        from learning_store import learning_store
+
+        entries = learning_store.read_entries()
+        if entries.empty:
+            return 0
+        if "timestamp" in entries:
+            entries = entries.sort_values("timestamp", kind="stable")
+        seeded = sum(self.record_entry(entry) for entry in entries.to_dict("records"))
+        logger.info(f"📈 نتائج کے مجموعے لرننگ لاگ سے بنائے گئے: {seeded} نتائج، {len(self._aggregates)} کلیدیں۔")
+        return seeded
+
+    def get_summary(self) -> Dict[str, Any]:
+        """API کے لیے تمام کلیدوں کے موجودہ اعداد۔"""
+        now = datetime.utcnow()
+        rows = []
+        for key in list(self._aggregates):
+            stats = self.get(key, now)
+            if stats:
+                rows.append({
+                    "symbol": key[0], "grade": key[1], "regime": key[2], "strategy_type": key[3],
+                    "weight": round(stats.weight, 2), "win_rate": round(stats.win_rate, 4),
+                    "expectancy_r": round(stats.expectancy_r, 4) if stats.expectancy_r is not None else None,
+                    "count": stats.count,
+                })
+        return {"half_life_days": self.half_life_seconds / 86400, "stats": rows}
+
+# مجموعوں کا عالمی نمونہ
+outcome_stats = OutcomeStatsStore()
@@ -0,0 +1,266 @@
+# filename: param_sweep.py
+
+"""
+TechnicalAnalysisSettings اور اثاثوں کی شخصیات (volatility_multiplier, min_rr_ratio) کے لیے متوازی پیرامیٹر سویپ۔
+
+ہر ورکر ایک علامت کے لیے پیرامیٹر سیٹس کا ایک بیچ چلاتا ہے اور ایک ہی انڈیکیٹر کیش استعمال کرتا ہے،
+اس لیے مشترکہ arrays (مثلاً TR، ایک ہی مدت کا ATR یا EMA) ہر بیچ میں صرف ایک بار بنتی ہیں۔
+مکمل شدہ (پیرامیٹر سیٹ، علامت) جوڑے ایک JSONL چیک پوائنٹ میں محفوظ ہوتے ہیں تاکہ طویل سویپ دوبارہ شروع ہو سکے۔
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import logging
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtester import (_prepare_ohlc, compute_committee_signals, get_symbol_personality,
+                        load_asset_personalities, load_history_from_csv, simulate_trades,
+                        MIN_CANDLES_FOR_SIGNAL)
+from config import guardian_settings, tech_settings
+
+logger = logging.getLogger(__name__)
+
+# --- مستقل اقدار ---
+PERSONALITY_KEYS = ("volatility_multiplier", "min_rr_ratio")
+DEFAULT_CHECKPOINT_FILE = "sweep_checkpoint.jsonl"
+DEFAULT_BATCH_SIZE = 32
+MIN_TRADES_FOR_RANKING = 30
+
+# نوٹ: BBANDS اور STOCH کی سیٹنگز فی الحال کمیٹی استعمال نہیں کرتی، اس لیے ڈیفالٹ سپیس میں شامل نہیں۔
+DEFAULT_PARAM_SPACE: Dict[str, List[Any]] = {
+    "EMA_SHORT_PERIOD": [5, 8, 10, 13],
+    "EMA_LONG_PERIOD": [21, 30, 50],
+    "RSI_PERIOD": [7, 14, 21],
+    "SUPERTREND_ATR": [7, 10, 14],
+    "SUPERTREND_FACTOR": [2.0, 2.5, 3.0, 3.5],
+    "volatility_multiplier": [1.0, 1.2, 1.5, 2.0],
+    "min_rr_ratio": [1.0, 1.2, 1.5, 2.0],
+}
+
+# --- پیرامیٹر سیٹس ---
+
+def param_set_id(params: Dict[str, Any]) -> str:
+    """پیرامیٹر سیٹ کی ایک مستحکم شناخت (چیک پوائنٹ کے لیے)۔"""
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:12]
+
+def generate_param_sets(
+    space: Dict[str, List[Any]],
+    mode: str = "grid",
+    samples: int = 200,
+    seed: int = 42,
+) -> List[Dict[str, Any]]:
+    """مکمل گرڈ یا بے ترتیب نمونہ تیار کرتا ہے؛ EMA_SHORT >= EMA_LONG والے سیٹس خارج۔"""
+    keys = sorted(space)
+
+    def is_valid(params: Dict[str, Any]) -> bool:
+        short = params.get("EMA_SHORT_PERIOD", tech_settings.EMA_SHORT_PERIOD)
+        long_ = params.get("EMA_LONG_PERIOD", tech_settings.EMA_LONG_PERIOD)
+        return short < long_
+
+    if mode == "grid":
+        combos = (dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys)))
+        return [p for p in combos if is_valid(p)]
+
+    if mode == "random":
+        rng = random.Random(seed)
+        seen: Set[str] = set()
+        param_sets: List[Dict[str, Any]] = []
+        attempts = 0
+        while len(param_sets) < samples and attempts < samples * 20:
+            attempts += 1
+            params = {k: rng.choice(space[k]) for k in keys}
+            pid = param_set_id(params)
+            if pid in seen or not is_valid(params):
+                continue
+            seen.add(pid)
+            param_sets.append(params)
+        return param_sets
+
+    raise ValueError(f"نامعلوم سویپ موڈ: {mode}")
+
+def _split_params(params: Dict[str, Any], base_personality: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    tech_params = tech_settings.model_dump()
+    personality = dict(base_personality)
+    for key, value in params.items():
+        if key in PERSONALITY_KEYS:
+            personality[key] = value
+        else:
+            tech_params[key] = value
+    return tech_params, personality
+
+# --- ورکر ---
+
+def _sweep_batch_task(args: tuple) -> List[Dict[str, Any]]:
+    """
+    ایک علامت کے لیے پیرامیٹر سیٹس کا ایک بیچ چلاتا ہے۔ تمام سیٹس ایک ہی انڈیکیٹر کیش شیئر کرتے ہیں۔
+    ہر ٹریڈ کو صرف (exit_time_ns, r_multiple) کی شکل میں واپس کیا جاتا ہے۔
+    """
+    symbol, df, batch, base_personality, market_regime, ambiguous_policy = args
+    ohlc = _prepare_ohlc(df)
+    cache: Dict[tuple, np.ndarray] = {}
+    results = []
+    for pid, params in batch:
+        trades: List[List[float]] = []
+        if len(ohlc['close']) > MIN_CANDLES_FOR_SIGNAL:
+            tech_params, personality = _split_params(params, base_personality)
+            signals = compute_committee_signals(ohlc, tech_params, personality, market_regime, cache)
+            trades = [
+                [pd.Timestamp(t['exit_time']).value, round(t['r_multiple'], 6)]
+                for t in simulate_trades(symbol, ohlc, signals, ambiguous_policy)
+            ]
+        results.append({"param_id": pid, "symbol": symbol, "params": params, "trades": trades})
+    return results
+
+# --- چیک پوائنٹ ---
+
+def load_checkpoint(path: str) -> List[Dict[str, Any]]:
+    """چیک پوائنٹ پڑھتا ہے؛ ادھوری آخری لائن (کریش کی صورت میں) نظر انداز کی جاتی ہے۔"""
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning(f"چیک پوائنٹ '{path}' میں خراب لائن نظر انداز کی گئی۔")
+    return records
+
+def _append_checkpoint(f, records: Iterable[Dict[str, Any]]):
+    for record in records:
+        f.write(json.dumps(record) + "\n")
+    f.flush()
+    os.fsync(f.fileno())
+
+# --- درجہ بندی ---
+
+def summarize_r_series(exit_times: np.ndarray, r: np.ndarray) -> Dict[str, Any]:
+    """وقت کے لحاظ سے ترتیب شدہ R سیریز سے expectancy اور drawdown نکالتا ہے۔"""
+    if r.size == 0:
+        return {"trades": 0, "win_rate": 0.0, "expectancy_r": 0.0, "total_r": 0.0, "max_drawdown_r": 0.0}
+    r = r[np.argsort(exit_times, kind="stable")]
+    equity = np.cumsum(r)
+    drawdown = np.maximum.accumulate(np.concatenate(([0.0], equity)))[1:] - equity
+    return {
+        "trades": int(r.size),
+        "win_rate": round(float((r > 0).mean() * 100), 2),
+        "expectancy_r": round(float(r.mean()), 4),
+        "total_r": round(float(r.sum()), 4),
+        "max_drawdown_r": round(float(drawdown.max()), 4),
+    }
+
+def rank_results(records: List[Dict[str, Any]], min_trades: int = MIN_TRADES_FOR_RANKING) -> List[Dict[str, Any]]:
+    """
+    ہر پیرامیٹر سیٹ کے تمام علامتوں کے ٹریڈز کو ایک پورٹ فولیو میں ملا کر درجہ بندی کرتا ہے:
+    پہلے زیادہ expectancy، پھر کم drawdown۔
+    """
+    grouped: Dict[str, Dict[str, Any]] = {}
+    for record in records:
+        entry = grouped.setdefault(record["param_id"], {"params": record["params"], "trades": [], "symbols": 0})
+        entry["trades"].extend(record["trades"])
+        entry["symbols"] += 1
+
+    ranked = []
+    for pid, entry in grouped.items():
+        trades = np.array(entry["trades"], dtype=np.float64).reshape(-1, 2)
+        stats = summarize_r_series(trades[:, 0], trades[:, 1])
+        if stats["trades"] < min_trades:
+            continue
+        ranked.append({"param_id": pid, "params": entry["params"], "symbols": entry["symbols"], **stats})
+
+    ranked.sort(key=lambda x: (-x["expectancy_r"], x["max_drawdown_r"]))
+    return ranked
+
+# --- مرکزی رنر ---
+
+def run_sweep(
+    history: Dict[str, pd.DataFrame],
+    param_sets: List[Dict[str, Any]],
+    checkpoint_path: str = DEFAULT_CHECKPOINT_FILE,
+    personalities: Optional[Dict[str, Dict]] = None,
+    market_regime: str = "Calm Trend",
+    ambiguous_policy: str = guardian_settings.INTRABAR_AMBIGUITY_POLICY,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    workers: Optional[int] = None,
+    min_trades: int = MIN_TRADES_FOR_RANKING,
+) -> List[Dict[str, Any]]:
+    """
+    پروسیس پول پر سویپ چلاتا ہے۔ چیک پوائنٹ میں پہلے سے موجود (param_id, symbol) جوڑے دوبارہ نہیں چلتے۔
+    Returns: درجہ بند نتائج کی فہرست۔
+    """
+    personalities = personalities if personalities is not None else load_asset_personalities()
+    records = load_checkpoint(checkpoint_path)
+    done = {(r["param_id"], r["symbol"]) for r in records}
+    wanted = {param_set_id(p): p for p in param_sets}
+
+    tasks = []
+    remaining = 0
+    for symbol, df in history.items():
+        pending = [(pid, p) for pid, p in wanted.items() if (pid, symbol) not in done]
+        remaining += len(pending)
+        base_personality = get_symbol_personality(personalities, symbol)
+        for i in range(0, len(pending), batch_size):
+            tasks.append((symbol, df, pending[i:i + batch_size], base_personality, market_regime, ambiguous_policy))
+
+    logger.info(f"🔁 سویپ: {len(wanted)} پیرامیٹر سیٹس × {len(history)} علامتیں، "
+                f"{remaining} باقی ({len(tasks)} بیچز)۔")
+
+    with open(checkpoint_path, 'a') as checkpoint:
+        if workers == 1:
+            for task in tasks:
+                batch_records = _sweep_batch_task(task)
+                _append_checkpoint(checkpoint, batch_records)
+                records.extend(batch_records)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(_sweep_batch_task, task) for task in tasks]
+                for completed, future in enumerate(as_completed(futures), start=1):
+                    batch_records = future.result()
+                    _append_checkpoint(checkpoint, batch_records)
+                    records.extend(batch_records)
+                    if completed % 10 == 0 or completed == len(futures):
+                        logger.info(f"🔁 سویپ پیش رفت: {completed}/{len(futures)} بیچز مکمل۔")
+
+    return rank_results([r for r in records if r["param_id"] in wanted], min_trades)
+
+def main():
+    parser = argparse.ArgumentParser(description="کمیٹی کے پیرامیٹرز کا متوازی سویپ")
+    parser.add_argument("--data-dir", required=True, help="علامتوں کی CSV فائلوں والی ڈائرکٹری")
+    parser.add_argument("--symbols", nargs="*")
+    parser.add_argument("--space", help="پیرامیٹر سپیس کی JSON فائل (ڈیفالٹ: DEFAULT_PARAM_SPACE)")
+    parser.add_argument("--mode", default="random", choices=("grid", "random"))
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT_FILE)
+    parser.add_argument("--regime", default="Calm Trend")
+    parser.add_argument("--policy", default=guardian_settings.INTRABAR_AMBIGUITY_POLICY)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--min-trades", type=int, default=MIN_TRADES_FOR_RANKING)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [%(name)s] - %(message)s')
+    space = DEFAULT_PARAM_SPACE
+    if args.space:
+        with open(args.space, 'r') as f:
+            space = json.load(f)
+
+    history = load_history_from_csv(args.data_dir, args.symbols)
+    param_sets = generate_param_sets(space, args.mode, args.samples, args.seed)
+    ranked = run_sweep(
+        history, param_sets, args.checkpoint, market_regime=args.regime, ambiguous_policy=args.policy,
+        batch_size=args.batch_size, workers=args.workers, min_trades=args.min_trades,
+    )
+    print(json.dumps(ranked[:args.top], indent=2))
+
+if __name__ == "__main__":
+    main()
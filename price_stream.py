@@ -0,0 +1,73 @@
+# filename: price_stream.py
+
+"""
+ڈیش بورڈز کے لیے لائیو قیمت اور غیر حقیقی (unrealized) منافع/نقصان۔
+
+نگران انجن ہر جانچ میں جو قیمتیں پہلے ہی Twelve Data سے لیتا ہے، وہی یہاں سے ہر علامت کے "price_update"
+پیغام کی شکل میں نشر ہوتی ہیں؛ کوئی اضافی API کال نہیں ہوتی۔ یہ پیغامات عارضی ہیں: ان کا seq نہیں لگتا، یہ ری پلے
+بفر میں نہیں جاتے، اور ہر کلائنٹ کے پاس فی علامت صرف تازہ ترین قیمت رکھی جاتی ہے جو زیادہ سے زیادہ
+PRICE_MIN_INTERVAL_SECONDS میں ایک بار بھیجی جاتی ہے (websocket_manager)۔
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from signal_registry import ActiveSignalSnapshot, registry
+from websocket_manager import manager
+
+logger = logging.getLogger(__name__)
+
+PRICE_UPDATE_TYPE = "price_update"
+
+def _pct(part: float, whole: Optional[float]) -> Optional[float]:
+    return round(part / whole * 100, 4) if whole else None
+
+def unrealized_pnl(signal: ActiveSignalSnapshot, price: float) -> Dict[str, Any]:
+    """موجودہ قیمت پر سگنل کا منافع/نقصان (قیمت کی اکائی اور انٹری کا فیصد) اور TP/SL تک فاصلہ۔"""
+    direction = 1.0 if signal.signal_type == "buy" else -1.0
+    entry = signal.entry_price or 0.0
+    pnl = direction * (price - entry)
+    return {
+        "signal_id": signal.signal_id,
+        "signal_type": signal.signal_type,
+        "entry_price": signal.entry_price,
+        "pnl": round(pnl, 8),
+        "pnl_pct": _pct(pnl, entry),
+        # مثبت = ابھی باقی فاصلہ؛ TP کی طرف فاصلہ سمت کے لحاظ سے، SL کی طرف بھی
+        "distance_to_tp_pct": _pct(direction * (signal.tp_price - price), price) if signal.tp_price is not None else None,
+        "distance_to_sl_pct": _pct(direction * (price - signal.sl_price), price) if signal.sl_price is not None else None,
+    }
+
+def _quote_time(market_data: Dict[str, Any]) -> datetime:
+    timestamp = market_data.get("timestamp")
+    try:
+        return datetime.fromtimestamp(int(timestamp), tz=timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        return datetime.now(timezone.utc)
+
+def build_price_update(symbol: str, price: float, quoted_at: datetime, signals: Iterable[ActiveSignalSnapshot]) -> Dict[str, Any]:
+    return {"type": PRICE_UPDATE_TYPE, "data": {
+        "symbol": symbol,
+        "price": price,
+        "quoted_at": quoted_at.isoformat(),
+        "signals": [unrealized_pnl(signal, price) for signal in signals],
+    }}
+
+async def publish_quotes(quotes: Optional[Dict[str, Any]]):
+    """نگران کی لی ہوئی قیمتیں فعال سگنلز کے PnL کے ساتھ نشر کرتا ہے (ہر علامت کا ایک پیغام)۔"""
+    if not quotes:
+        return
+    published: List[str] = []
+    for symbol, market_data in quotes.items():
+        if not market_data or "price" not in market_data:
+            continue
+        try:
+            price = float(market_data["price"])
+        except (TypeError, ValueError):
+            continue
+        signal = registry.get_by_symbol(symbol)
+        await manager.broadcast(build_price_update(symbol, price, _quote_time(market_data), [signal] if signal else []))
+        published.append(symbol)
+    if published:
+        logger.debug(f"💹 {len(published)} علامتوں کی قیمتیں نشر کی گئیں: {', '.join(published)}")
@@ -0,0 +1,183 @@
+# filename: response_cache.py
+
+"""
+پڑھنے والے REST اینڈ پوائنٹس کے لیے read-through جوابی کیش۔
+
+ہر اینڈ پوائنٹ (اور اس کے کوئری پیرامیٹرز کے ہر مجموعے) کا جواب ایک بار بنا کر JSON bytes کی شکل میں رکھا
+جاتا ہے، ساتھ ETag اور Last-Modified کے۔ کیش ان ہی واقعات پر خالی ہوتا ہے جو websocket_manager نشر کرتا ہے
+(نیا/بند سگنل، خبروں کا ریفریش)، اور حفاظت کے لیے ہر اندراج کی ایک زیادہ سے زیادہ عمر بھی ہے۔ پول کرنے والے
+ڈیش بورڈز If-None-Match / If-Modified-Since بھیجیں تو انہیں 304 ملتا ہے۔
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+logger = logging.getLogger(__name__)
+
+# --- مستقل اقدار ---
+MAX_ENTRIES_PER_ENDPOINT = 256
+# اینڈ پوائنٹ -> زیادہ سے زیادہ عمر (سیکنڈ)۔ "آج" والے اعداد دن بدلنے پر بھی بدلتے ہیں، اس لیے کم عمر
+ENDPOINT_MAX_AGE: Dict[str, float] = {
+    "active-signals": 300.0,
+    "daily-stats": 60.0,
+    "stats": 60.0,
+    "history": 300.0,
+    "news": 900.0,
+}
+# نشر ہونے والے پیغام کی قسم -> کن اینڈ پوائنٹس کا کیش خالی کرنا ہے
+INVALIDATED_BY_EVENT: Dict[str, Tuple[str, ...]] = {
+    "new_signal": ("active-signals", "daily-stats"),
+    "signal_updated": ("active-signals",),
+    "signal_closed": ("active-signals", "daily-stats", "stats", "history"),
+    "signals_closed": ("active-signals", "daily-stats", "stats", "history"),
+    "news_updated": ("news",),
+}
+
+class CachedResponse(NamedTuple):
+    """پہلے سے سیریلائز شدہ جواب۔"""
+    body: bytes
+    etag: str
+    last_modified: datetime
+    headers: Dict[str, str]
+    built_at: float
+
+class ResponseCache:
+    """
+    اینڈ پوائنٹ کے لحاظ سے جوابی کیش۔ ہر اینڈ پوائنٹ کی ایک "نسل" (generation) ہے جو ہر invalidation پر بڑھتی ہے؛
+    اگر جواب بنتے دوران نسل بدل جائے تو وہ جواب کیش نہیں ہوتا، تاکہ پرانا ڈیٹا کیش میں نہ رہ جائے۔
+    ایک ہی کلید کے بیک وقت درخواستیں ایک ہی تعمیر کا انتظار کرتی ہیں (single-flight)۔
+    """
+    def __init__(self):
+        self._entries: Dict[str, "OrderedDict[Hashable, CachedResponse]"] = {}
+        self._generation: Dict[str, int] = {}
+        self._last_modified: Dict[str, datetime] = {}
+        self._inflight: Dict[Tuple[str, Hashable], asyncio.Task] = {}
+
+    def _changed_at(self, endpoint: str) -> datetime:
+        if endpoint not in self._last_modified:
+            self._last_modified[endpoint] = datetime.now(timezone.utc).replace(microsecond=0)
+        return self._last_modified[endpoint]
+
+    def invalidate(self, endpoint: str):
+        """ایک اینڈ پوائنٹ کے تمام کیش شدہ جوابات خالی کرتا ہے۔"""
+        self._generation[endpoint] = self._generation.get(endpoint, 0) + 1
+        self._last_modified[endpoint] = datetime.now(timezone.utc).replace(microsecond=0)
+        self._entries.pop(endpoint, None)
+
+    def invalidate_for_event(self, event_type: Optional[str]):
+        """نشر ہونے والے پیغام کی قسم کے مطابق متعلقہ اینڈ پوائنٹس خالی کرتا ہے۔"""
+        endpoints = INVALIDATED_BY_EVENT.get(event_type, ())
+        for endpoint in endpoints:
+            self.invalidate(endpoint)
+        if endpoints:
+            logger.debug(f"🗃️ '{event_type}' پر جوابی کیش خالی کیا گیا: {', '.join(endpoints)}")
+
+    def _lookup(self, endpoint: str, key: Hashable) -> Optional[CachedResponse]:
+        entries = self._entries.get(endpoint)
+        entry = entries.get(key) if entries else None
+        if entry is None:
+            return None
+        if time.monotonic() - entry.built_at > ENDPOINT_MAX_AGE.get(endpoint, 300.0):
+            entries.pop(key, None)
+            return None
+        return entry
+
+    def _store(self, endpoint: str, key: Hashable, entry: CachedResponse):
+        entries = self._entries.setdefault(endpoint, OrderedDict())
+        entries[key] = entry
+        entries.move_to_end(key)
+        while len(entries) > MAX_ENTRIES_PER_ENDPOINT:
+            entries.popitem(last=False)
+
+    async def get_or_build(
+        self,
+        endpoint: str,
+        key: Hashable,
+        builder: Callable[[], Awaitable[Tuple[Any, Dict[str, str]]]],
+        adapter: Optional[TypeAdapter] = None,
+    ) -> CachedResponse:
+        """
+        کیش شدہ جواب واپس کرتا ہے، یا builder سے (data, headers) لے کر اسے سیریلائز اور کیش کرتا ہے۔
+        adapter دیا گیا ہو تو سیریلائزیشن اسی response_model کے مطابق ہوتی ہے۔
+        تعمیر اپنے الگ ٹاسک میں چلتی ہے اور ہر درخواست (پہلی سمیت) اسے shield کے ساتھ انتظار کرتی ہے، اس لیے
+        کسی درخواست کی منسوخی (کلائنٹ کا چلے جانا) باقی انتظار کرنے والوں کو متاثر نہیں کرتی۔ اسی وجہ سے builder
+        کو درخواست کا DI سیشن نہیں بلکہ اپنا سیشن (AsyncSessionLocal) استعمال کرنا چاہیے۔
+        """
+        entry = self._lookup(endpoint, key)
+        if entry is not None:
+            return entry
+        inflight_key = (endpoint, key)
+        task = self._inflight.get(inflight_key)
+        if task is None:
+            task = asyncio.create_task(self._build(endpoint, key, builder, adapter))
+            # سب انتظار کرنے والے منسوخ ہو جائیں تو "never retrieved" انتباہ سے بچیں
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[inflight_key] = task
+        return await asyncio.shield(task)
+
+    async def _build(
+        self,
+        endpoint: str,
+        key: Hashable,
+        builder: Callable[[], Awaitable[Tuple[Any, Dict[str, str]]]],
+        adapter: Optional[TypeAdapter],
+    ) -> CachedResponse:
+        generation = self._generation.get(endpoint, 0)
+        try:
+            data, headers = await builder()
+            if adapter is not None:
+                body = adapter.dump_json(adapter.validate_python(data))
+            else:
+                body = json.dumps(jsonable_encoder(data), ensure_ascii=False).encode("utf-8")
+            entry = CachedResponse(
+                body=body,
+                etag='"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"',
+                last_modified=self._changed_at(endpoint),
+                headers=headers,
+                built_at=time.monotonic(),
+            )
+            if self._generation.get(endpoint, 0) == generation:
+                self._store(endpoint, key, entry)
+            return entry
+        finally:
+            self._inflight.pop((endpoint, key), None)
+
+    @staticmethod
+    def _not_modified(request: Request, entry: CachedResponse) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or entry.etag in tags
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return entry.last_modified <= parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def respond(self, request: Request, entry: CachedResponse) -> Response:
+        """کیش شدہ جواب سے HTTP جواب (یا 304) بناتا ہے۔"""
+        headers = {
+            "ETag": entry.etag,
+            "Last-Modified": format_datetime(entry.last_modified, usegmt=True),
+            "Cache-Control": "no-cache",
+            **entry.headers,
+        }
+        if self._not_modified(request, entry):
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+# کیش کا عالمی نمونہ
+response_cache = ResponseCache()
@@ -2,10 +2,8 @@ import logging
 from datetime import datetime
 from typing import List, Tuple, Set
 
-from sqlalchemy.orm import Session
-
-import database_crud as crud
 from config import trading_settings
+from signal_registry import registry
 
 logger = logging.getLogger(__name__)
 
@@ -32,16 +30,16 @@ def get_active_trading_pairs() -> List[str]:
     else:
         return get_forex_pairs()
 
-def get_hunting_roster(db: Session) -> List[str]:
+def get_hunting_roster() -> List[str]:
     """
     شکاری انجن کے لیے تجزیہ کرنے والے جوڑوں کی متحرک فہرست تیار کرتا ہے۔
     """
     active_pairs_for_today = get_active_trading_pairs()
     log_prefix = "کرپٹو" if datetime.utcnow().weekday() >= 5 else "فاریکس"
 
-    active_signals_in_db = {s.symbol for s in crud.get_all_active_signals_from_db(db)}
+    active_signal_symbols = set(registry.symbols())
     
-    available_to_hunt = [p for p in active_pairs_for_today if p not in active_signals_in_db]
+    available_to_hunt = [p for p in active_pairs_for_today if p not in active_signal_symbols]
     
     if not available_to_hunt:
         logger.info(f"🏹 شکاری روسٹر ({log_prefix}): تمام فعال جوڑوں کے سگنل لائیو ہیں۔")
@@ -68,6 +68,24 @@ class DailyStatsResponse(BaseModel):
     live_signals: int
     win_rate_today: float
 
+class SymbolStats(BaseModel):
+    """ایک علامت کے بند ٹریڈز کا خلاصہ۔"""
+    symbol: str
+    tp_hits: int
+    sl_hits: int
+    other_closures: int
+    win_rate: float
+
+class StatsResponse(BaseModel):
+    """/api/stats اینڈ پوائنٹ کے لیے رسپانس ماڈل (گھنٹہ وار خلاصے سے)۔"""
+    start: datetime
+    end: datetime
+    tp_hits: int
+    sl_hits: int
+    other_closures: int
+    win_rate: float
+    by_symbol: List[SymbolStats]
+
 class HistoryResponse(BaseModel):
     """/api/history اینڈ پوائنٹ کے لیے رسپانس ماڈل۔"""
     id: int
@@ -113,3 +131,36 @@ class SystemStatusResponse(BaseModel):
     database_status: str
     key_status: KeyStatusResponse
     
+
+class WebhookCreateRequest(BaseModel):
+    """نئی webhook سبسکرپشن۔ secret نہ دیا جائے تو سرور بناتا ہے (صرف اسی جواب میں واپس آتا ہے)۔"""
+    url: str
+    symbols: Optional[List[str]] = None
+    event_types: Optional[List[str]] = None
+    secret: Optional[str] = None
+    max_concurrency: int = Field(default=4, ge=1, le=64)
+
+class WebhookResponse(BaseModel):
+    """webhook سبسکرپشن (secret کے بغیر)۔"""
+    id: int
+    url: str
+    symbols: Optional[List[str]] = None
+    event_types: Optional[List[str]] = None
+    max_concurrency: int
+    is_active: bool
+    created_at: Optional[datetime] = None
+
+class WebhookCreatedResponse(WebhookResponse):
+    secret: str
+
+class WebhookDeliveryResponse(BaseModel):
+    """پائیدار قطار میں ایک ناکام یا dead-letter ترسیل۔"""
+    id: int
+    subscription_id: int
+    event_id: str
+    event_type: str
+    status: str
+    attempts: int
+    next_attempt_at: datetime
+    last_error: Optional[str] = None
+    created_at: Optional[datetime] = None
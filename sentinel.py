@@ -1,16 +1,20 @@
 # filename: sentinel.py
 
 import asyncio
+import hashlib
 import logging
+import re
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Set
 
 import httpx
 from sqlalchemy.orm import Session
 
 # مقامی امپورٹس
-from database_crud import get_cached_news, update_news_cache_in_db
-from models import SessionLocal
+from async_crud import find_high_impact_news, upsert_news_articles
+from models import AsyncSessionLocal
+from news_index import news_index
+from websocket_manager import manager
 # اصلاح: 'news_settings' کو صحیح طریقے سے امپورٹ کیا گیا
 from config import api_settings, news_settings
 
@@ -42,48 +46,101 @@ async def fetch_news_from_marketaux(client: httpx.AsyncClient) -> Optional[Dict[
         logger.error(f"MarketAux سے خبریں حاصل کرنے میں نامعلوم خرابی: {e}", exc_info=True)
         return None
 
+def _article_id(item: Dict[str, Any]) -> Optional[str]:
+    """MarketAux کی uuid، یا اس کی غیر موجودگی میں URL کا hash۔"""
+    if item.get('uuid'):
+        return str(item['uuid'])
+    if item.get('url'):
+        return hashlib.sha1(item['url'].encode('utf-8')).hexdigest()
+    return None
+
+class KeywordMatcher:
+    """
+    تمام کرنسیوں کے کلیدی الفاظ سے ایک بار بنا ہوا ایک ہی regex (alternation، لفظ کی حدود کے ساتھ)۔
+    ایک ہی گزر میں متن کی تمام متاثرہ کرنسیاں دیتا ہے؛ 'fed' لفظ 'federal' میں اور 'boc' لفظ 'bocce' میں
+    نہیں ملتا۔ آخر میں جمع کا اختیاری 's' چلتا ہے ('etf' لفظ 'ETFs' میں ملتا ہے)۔ کئی الفاظ والے کلیدی الفاظ
+    ('crypto ban') کے درمیان کوئی بھی خالی جگہ چلتی ہے۔
+    """
+    def __init__(self, keywords_by_currency: Dict[str, Iterable[str]]):
+        self._currencies: Dict[str, Set[str]] = {}
+        for currency, keywords in keywords_by_currency.items():
+            for keyword in keywords:
+                normalized = " ".join(keyword.lower().split())
+                if normalized:
+                    self._currencies.setdefault(normalized, set()).add(currency)
+        # لمبے الفاظ پہلے، تاکہ کسی دوسرے کلیدی لفظ سے شروع ہونے والا لمبا لفظ پورا ملے
+        alternatives = sorted(self._currencies, key=len, reverse=True)
+        # پہلے حرف کی lookahead سے ہر مقام پر پوری alternation آزمائے بغیر آگے بڑھا جاتا ہے؛ متن پہلے ہی
+        # چھوٹے حروف میں بدلا جاتا ہے کیونکہ re.IGNORECASE اس پیٹرن کو کئی گنا سست کر دیتا ہے
+        first_letters = "".join(sorted({re.escape(keyword[0]) for keyword in alternatives}))
+        # واحد گروپ صرف کلیدی لفظ پکڑتا ہے (جمع کے 's' کے بغیر)، اس لیے findall کا نتیجہ سیدھا _currencies کی کلید ہے
+        self._pattern = re.compile(
+            rf"\b(?=[{first_letters}])("
+            + "|".join(r"\s+".join(map(re.escape, keyword.split())) for keyword in alternatives)
+            + r")s?\b"
+        ) if alternatives else None
+
+    def currencies(self, text: str) -> Set[str]:
+        """متن میں ملنے والے تمام کلیدی الفاظ کی کرنسیاں (کوئی نہ ملے تو خالی)۔"""
+        if self._pattern is None or not text:
+            return set()
+        matched: Set[str] = set()
+        for keyword in {" ".join(match.split()) for match in self._pattern.findall(text.lower())}:
+            matched |= self._currencies[keyword]
+        return matched
+
+# کلیدی الفاظ کا میچر؛ ماڈیول لوڈ ہونے پر ایک ہی بار کمپائل ہوتا ہے
+high_impact_matcher = KeywordMatcher(HIGH_IMPACT_KEYWORDS)
+
+def _impact_currencies(item: Dict[str, Any]) -> Set[str]:
+    """وہ کرنسیاں جن کے اعلیٰ اثر والے کلیدی الفاظ خبر کے عنوان یا خلاصے میں ہیں۔"""
+    return high_impact_matcher.currencies(f"{item.get('title') or ''}\n{item.get('snippet') or ''}")
+
+def _build_article_rows(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    API کے جواب کو ڈیٹا بیس کی قطاروں میں بدلتا ہے۔ تاریخ یہیں ایک بار پارس ہو کر naive UTC بنتی ہے؛
+    جس خبر کی شناخت یا تاریخ نہ ہو وہ چھوڑ دی جاتی ہے۔ ایک ہی جواب میں دہرائی گئی خبر ایک بار آتی ہے۔
+    """
+    rows: Dict[str, Dict[str, Any]] = {}
+    for item in items:
+        article_id = _article_id(item)
+        published_time = _parse_datetime_string(item.get('published_at'))
+        if not article_id or not published_time:
+            continue
+        impact_currencies = _impact_currencies(item)
+        symbols = [
+            entity['symbol'].strip().upper()
+            for entity in item.get('entities', []) if entity.get('symbol')
+        ]
+        rows[article_id] = {
+            'article_id': article_id,
+            'title': item.get('title'),
+            'url': item.get('url'),
+            'source': item.get('source'),
+            'snippet': item.get('snippet'),
+            'published_at': published_time.replace(tzinfo=None),
+            'is_high_impact': bool(impact_currencies),
+            # خبر ان تمام کرنسیوں سے بھی منسلک ہو جن پر وہ اثر ڈالتی ہے، تاکہ ان کے جوڑوں کی جانچ میں ملے
+            'symbols': symbols + sorted(impact_currencies - set(symbols)),
+        }
+    return list(rows.values())
+
 async def update_economic_calendar_cache():
-    """خبروں کو حاصل کرتا ہے، ان کی درجہ بندی کرتا ہے، اور ڈیٹا بیس میں کیش کرتا ہے۔"""
+    """خبروں کو حاصل کرتا ہے، ان کی درجہ بندی کرتا ہے، اور ڈیٹا بیس میں محفوظ کرتا ہے۔"""
     logger.info(">>> خبروں کا کیش اپ ڈیٹ کرنے کا کام شروع ہو رہا ہے...")
     async with httpx.AsyncClient() as client:
         news_data = await fetch_news_from_marketaux(client)
         
     if news_data and 'data' in news_data and news_data['data']:
-        categorized_articles = {}
-        for item in news_data['data']:
-            title = item.get('title', '').lower()
-            snippet = item.get('snippet', '').lower()
-            content = title + " " + snippet
-            impact = "Low"
-            
-            # کلیدی الفاظ کی بنیاد پر خبر کے اثر کا تعین کریں
-            for currency, keywords in HIGH_IMPACT_KEYWORDS.items():
-                if any(keyword in content for keyword in keywords):
-                    impact = "High"
-                    break
-            
-            article_data = {
-                'title': item.get('title'),
-                'url': item.get('url'),
-                'source': item.get('source'),
-                'snippet': item.get('snippet'),
-                'published_at': item.get('published_at'),
-                'impact': impact,
-                'entities': [entity.get('symbol') for entity in item.get('entities', [])]
-            }
-            
-            # خبر کو اس سے متعلقہ تمام علامتوں کے تحت محفوظ کریں
-            for entity_symbol in article_data['entities']:
-                if entity_symbol not in categorized_articles:
-                    categorized_articles[entity_symbol] = []
-                categorized_articles[entity_symbol].append(article_data)
-                
-        db = SessionLocal()
-        try:
-            update_news_cache_in_db(db, {"articles_by_symbol": categorized_articles})
-            logger.info(f"خبروں کا کیش کامیابی سے {len(categorized_articles)} علامتوں کے لیے اپ ڈیٹ ہو گیا۔")
-        finally:
-            db.close()
+        articles = _build_article_rows(news_data['data'])
+        async with AsyncSessionLocal() as db:
+            saved = await upsert_news_articles(db, articles, news_settings.RETENTION_DAYS)
+            if saved:
+                await news_index.refresh(db)
+        if saved:
+            logger.info(f"خبروں کا کیش کامیابی سے اپ ڈیٹ ہو گیا: {len(articles)} خبریں محفوظ ہوئیں۔")
+            # ہر ورکر کا /api/news کیش ایونٹ بس کے ذریعے خالی ہوتا ہے
+            await manager.broadcast({"type": "news_updated", "data": {"count": len(articles)}})
     else:
         logger.warning("MarketAux سے کوئی خبر نہیں ملی یا جواب خالی تھا۔ کیش اپ ڈیٹ نہیں ہوا۔")
 
@@ -104,74 +161,34 @@ def _parse_datetime_string(datetime_str: str) -> Optional[datetime]:
         logger.warning(f"خبر کی تاریخ پارس کرنے میں خرابی: {e} - '{datetime_str}'")
         return None
 
+def _symbol_parts(symbol: str) -> List[str]:
+    return [s.strip().upper() for s in symbol.split('/')]
+
+async def _find_high_impact_news(symbol: str, start: datetime, end: datetime) -> Optional[str]:
+    """پہلے پروسیس کا انڈیکس؛ اگر وہ ابھی نہیں بنا (مثلاً اسکرپٹس میں) تو ڈیٹا بیس۔"""
+    if news_index.is_loaded:
+        return news_index.find(_symbol_parts(symbol), start, end)
+    async with AsyncSessionLocal() as db:
+        return await find_high_impact_news(db, _symbol_parts(symbol), start, end)
+
 async def get_news_analysis_for_symbol(symbol: str) -> Dict[str, Any]:
     """کسی مخصوص علامت کے لیے حالیہ یا آنے والی اعلیٰ اثر والی خبروں کا تجزیہ کرتا ہے۔"""
-    db = SessionLocal()
-    try:
-        all_news_content = get_cached_news(db)
-        if not all_news_content or 'articles_by_symbol' not in all_news_content:
-            return {"impact": "Clear", "reason": "خبروں کا کیش خالی یا غلط فارمیٹ میں ہے۔"}
-    finally:
-        db.close()
-        
-    symbol_parts = [s.strip().upper() for s in symbol.split('/')]
-    relevant_articles = []
-    for part in symbol_parts:
-        relevant_articles.extend(all_news_content['articles_by_symbol'].get(part, []))
-        
-    if not relevant_articles:
-        return {"impact": "Clear", "reason": "اس علامت کے لیے کوئی متعلقہ خبر نہیں ملی۔"}
-        
-    now_utc = datetime.now(timezone.utc)
-    for article in relevant_articles:
-        if article.get('impact') != "High":
-            continue
-            
-        published_time = _parse_datetime_string(article.get('published_at'))
-        if not published_time:
-            continue
-            
-        # چیک کریں کہ آیا خبر پچھلے 1 گھنٹے سے لے کر اگلے 4 گھنٹے کے اندر ہے
-        if now_utc - timedelta(hours=1) <= published_time <= now_utc + timedelta(hours=4):
-            return {
-                "impact": "High",
-                "reason": f"ایک اعلیٰ اثر والی خبر ملی: '{article.get('title', '')[:60]}...'"
-            }
-            
+    # چیک کریں کہ آیا خبر پچھلے 1 گھنٹے سے لے کر اگلے 4 گھنٹے کے اندر ہے
+    now_utc = datetime.utcnow()
+    title = await _find_high_impact_news(symbol, now_utc - timedelta(hours=1), now_utc + timedelta(hours=4))
+    if title is not None:
+        return {
+            "impact": "High",
+            "reason": f"ایک اعلیٰ اثر والی خبر ملی: '{(title or '')[:60]}...'"
+        }
     return {"impact": "Clear", "reason": "اس علامت کے لیے کوئی حالیہ یا آنے والی اعلیٰ اثر والی خبر نہیں ملی۔"}
 
 async def check_news_at_time_of_trade(symbol: str, trade_start_time: datetime, trade_end_time: datetime) -> bool:
     """چیک کرتا ہے کہ آیا کسی ٹریڈ کے دوران کوئی اعلیٰ اثر والی خبر جاری ہوئی تھی۔"""
-    db = SessionLocal()
-    try:
-        all_news_content = get_cached_news(db)
-        if not all_news_content or 'articles_by_symbol' not in all_news_content:
-            return False
-    finally:
-        db.close()
-        
-    symbol_parts = [s.strip().upper() for s in symbol.split('/')]
-    relevant_articles = []
-    for part in symbol_parts:
-        relevant_articles.extend(all_news_content['articles_by_symbol'].get(part, []))
-        
-    if not relevant_articles:
-        return False
-        
-    start_time_utc = trade_start_time.replace(tzinfo=timezone.utc)
-    end_time_utc = trade_end_time.replace(tzinfo=timezone.utc)
-    
-    for article in relevant_articles:
-        if article.get('impact') != "High":
-            continue
-            
-        published_time = _parse_datetime_string(article.get('published_at'))
-        if not published_time:
-            continue
-            
-        if start_time_utc <= published_time <= end_time_utc:
-            logger.info(f"ٹریڈ {symbol} کے دوران ایک اعلیٰ اثر والی خبر ملی: '{article.get('title', '')[:60]}...'")
-            return True
-            
+    title = await _find_high_impact_news(
+        symbol, trade_start_time.replace(tzinfo=None), trade_end_time.replace(tzinfo=None)
+    )
+    if title is not None:
+        logger.info(f"ٹریڈ {symbol} کے دوران ایک اعلیٰ اثر والی خبر ملی: '{(title or '')[:60]}...'")
+        return True
     return False
-                                         
@@ -0,0 +1,174 @@
+# filename: signal_registry.py
+
+"""
+فعال سگنلز کا پروسیس کے اندر مستند انڈیکس۔
+
+فعال سگنلز کی تعداد بہت کم ہوتی ہے، اس لیے ہنٹر، نگران اور API انہیں ہر بار ڈیٹا بیس سے پڑھنے کے بجائے
+یہاں سے پڑھتے ہیں۔ database_crud اور async_crud ہر کامیاب کمٹ کے بعد اس رجسٹری کو اپ ڈیٹ کرتا ہے (write-through)،
+اسٹارٹ اپ پر یہ ڈیٹا بیس سے دوبارہ بنتی ہے، اور ایک شیڈولڈ جاب وقفے وقفے سے ڈیٹا بیس سے اس کا موازنہ کرتی ہے۔
+"""
+
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from models import ActiveSignal, SessionLocal
+
+logger = logging.getLogger(__name__)
+
+class ActiveSignalSnapshot(NamedTuple):
+    """ActiveSignal قطار کی ایک ناقابلِ تغیر کاپی (سیشن سے آزاد)۔"""
+    id: int
+    signal_id: str
+    symbol: str
+    timeframe: Optional[str]
+    signal_type: Optional[str]
+    entry_price: Optional[float]
+    tp_price: Optional[float]
+    sl_price: Optional[float]
+    confidence: Optional[float]
+    reason: Optional[str]
+    component_scores: Optional[Dict[str, Any]]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    is_new: bool
+
+    @classmethod
+    def from_model(cls, signal: ActiveSignal) -> "ActiveSignalSnapshot":
+        return cls(**{field: getattr(signal, field) for field in cls._fields})
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ActiveSignalSnapshot":
+        """as_dict کا الٹ (دوسرے ورکر سے ایونٹ بس پر آیا ہوا سگنل)۔"""
+        values = {field: data.get(field) for field in cls._fields}
+        for key in ("created_at", "updated_at"):
+            if isinstance(values[key], str):
+                values[key] = datetime.fromisoformat(values[key])
+        values["is_new"] = bool(values["is_new"])
+        return cls(**values)
+
+    def as_dict(self) -> Dict[str, Any]:
+        d = self._asdict()
+        for key, value in d.items():
+            if isinstance(value, datetime):
+                d[key] = value.isoformat()
+        return d
+
+class ActiveSignalRegistry:
+    """
+    signal_id اور symbol دونوں کے لحاظ سے انڈیکس شدہ فعال سگنلز۔
+    تمام تبدیلیاں ایک لاک کے تحت ہوتی ہیں تاکہ تھریڈز سے بھی محفوظ رہے۔
+    """
+    def __init__(self):
+        self._by_id: Dict[str, ActiveSignalSnapshot] = {}
+        self._id_by_symbol: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.is_loaded = False
+
+    def rebuild(self, db: Session) -> int:
+        """ڈیٹا بیس سے پوری رجسٹری دوبارہ بناتا ہے۔"""
+        snapshots = [ActiveSignalSnapshot.from_model(s) for s in db.query(ActiveSignal).all()]
+        with self._lock:
+            self._by_id = {s.signal_id: s for s in snapshots}
+            self._id_by_symbol = {s.symbol: s.signal_id for s in snapshots}
+            self.is_loaded = True
+        logger.info(f"🗂️ فعال سگنلز کی رجسٹری ڈیٹا بیس سے بنائی گئی: {len(snapshots)} سگنلز۔")
+        return len(snapshots)
+
+    def upsert(self, signal: ActiveSignal) -> ActiveSignalSnapshot:
+        """کمٹ شدہ سگنل کو رجسٹری میں شامل یا اپ ڈیٹ کرتا ہے۔"""
+        return self.upsert_snapshot(ActiveSignalSnapshot.from_model(signal))
+
+    def upsert_snapshot(self, snapshot: ActiveSignalSnapshot) -> ActiveSignalSnapshot:
+        with self._lock:
+            previous_id = self._id_by_symbol.get(snapshot.symbol)
+            if previous_id and previous_id != snapshot.signal_id:
+                self._by_id.pop(previous_id, None)
+            self._by_id[snapshot.signal_id] = snapshot
+            self._id_by_symbol[snapshot.symbol] = snapshot.signal_id
+        return snapshot
+
+    def remove(self, signal_ids: Iterable[str]) -> None:
+        """بند ہونے والے سگنلز کو رجسٹری سے ہٹاتا ہے۔"""
+        with self._lock:
+            for signal_id in signal_ids:
+                snapshot = self._by_id.pop(signal_id, None)
+                if snapshot and self._id_by_symbol.get(snapshot.symbol) == signal_id:
+                    del self._id_by_symbol[snapshot.symbol]
+
+    def apply_event(self, message: Dict[str, Any]) -> bool:
+        """
+        دوسرے ورکر کا نشر کردہ پیغام لاگو کرتا ہے (وہاں کمٹ ہو چکا، یہاں صرف میموری اپ ڈیٹ)۔
+        Returns: True اگر پیغام رجسٹری سے متعلق تھا۔
+        """
+        data = message.get("data") or {}
+        message_type = message.get("type")
+        if message_type in ("new_signal", "signal_updated") and data.get("signal_id"):
+            self.upsert_snapshot(ActiveSignalSnapshot.from_dict(data))
+        elif message_type == "signal_closed" and data.get("signal_id"):
+            self.remove([data["signal_id"]])
+        elif message_type == "signals_closed":
+            self.remove(data.get("signal_ids") or [])
+        else:
+            return False
+        return True
+
+    def get(self, signal_id: str) -> Optional[ActiveSignalSnapshot]:
+        return self._by_id.get(signal_id)
+
+    def get_by_symbol(self, symbol: str) -> Optional[ActiveSignalSnapshot]:
+        signal_id = self._id_by_symbol.get(symbol)
+        return self._by_id.get(signal_id) if signal_id else None
+
+    def all(self) -> List[ActiveSignalSnapshot]:
+        return list(self._by_id.values())
+
+    def symbols(self) -> List[str]:
+        return list(self._id_by_symbol.keys())
+
+    def count(self) -> int:
+        return len(self._by_id)
+
+    def verify_against_db(self, db: Session) -> bool:
+        """
+        رجسٹری کا ڈیٹا بیس سے موازنہ کرتا ہے۔ فرق کی صورت میں اسے لاگ کر کے رجسٹری دوبارہ بناتا ہے۔
+        Returns: True اگر دونوں یکساں تھے۔
+        """
+        db_snapshots = {s.signal_id: ActiveSignalSnapshot.from_model(s) for s in db.query(ActiveSignal).all()}
+        memory_snapshots = dict(self._by_id)
+
+        missing = db_snapshots.keys() - memory_snapshots.keys()
+        extra = memory_snapshots.keys() - db_snapshots.keys()
+        stale = [sid for sid in db_snapshots.keys() & memory_snapshots.keys() if db_snapshots[sid] != memory_snapshots[sid]]
+
+        if not (missing or extra or stale):
+            logger.debug(f"🗂️ رجسٹری کی جانچ کامیاب: {len(memory_snapshots)} سگنلز ڈیٹا بیس سے مطابقت رکھتے ہیں۔")
+            return True
+
+        logger.warning(
+            f"🗂️ رجسٹری اور ڈیٹا بیس میں فرق ملا: غائب={sorted(missing)}, اضافی={sorted(extra)}, "
+            f"پرانے={sorted(stale)}۔ رجسٹری دوبارہ بنائی جا رہی ہے۔"
+        )
+        self.rebuild(db)
+        return False
+
+def _verify_registry_sync():
+    db = SessionLocal()
+    try:
+        registry.verify_against_db(db)
+    except SQLAlchemyError as e:
+        logger.error(f"🗂️ رجسٹری کی جانچ میں ڈیٹا بیس کی خرابی: {e}", exc_info=True)
+    finally:
+        db.close()
+
+async def verify_registry_job():
+    """شیڈولڈ جاب: رجسٹری کی ڈیٹا بیس کے خلاف جانچ (ایونٹ لوپ کو روکے بغیر، الگ تھریڈ میں)۔"""
+    await asyncio.to_thread(_verify_registry_sync)
+
+# رجسٹری کا ایک عالمی نمونہ جو پوری ایپلیکیشن میں استعمال ہوتا ہے
+registry = ActiveSignalRegistry()
@@ -5,7 +5,7 @@ import pandas as pd
 import numpy as np # <--- numpy کو شامل کریں
 
 from config import tech_settings
-from level_analyzer import find_realistic_tp_sl
+from level_analyzer import calculate_atr, find_realistic_tp_sl
 
 logger = logging.getLogger(__name__)
 
@@ -145,6 +145,12 @@ def run_trading_committee(df: pd.DataFrame, market_regime: Dict, symbol_personal
         "sl": sl,
         "strategy_type": strategy_used,
         "signal_grade": signal_grade, # ★★★ نیا فیلڈ
+        # نگران انجن کا شیڈولر TP/SL سے فاصلہ ATR اکائیوں میں ناپنے کے لیے atr استعمال کرتا ہے
+        "component_scores": {
+            "scalper_score": int(scalper_score),
+            "cautious_score": int(cautious_score),
+            "atr": float(calculate_atr(df)),
+        },
         "reason": f"{signal_grade}-Grade signal based on {strategy_used} strategy. Scalper: {scalper_vote}, Cautious: {cautious_vote}."
     }
 
@@ -0,0 +1,301 @@
+# filename: telegram_dispatcher.py
+
+"""
+ٹیلیگرام الرٹس بھیجنے والی پس منظر کی سروس۔
+
+messenger الرٹ تیار کر کے submit() کرتا ہے جو فوراً واپس آتا ہے؛ ایک ہی رائٹر ٹاسک ایک مشترکہ (pooled)
+httpx کلائنٹ سے پیغامات بھیجتا ہے۔
+- قطار محدود ہے؛ بھر جائے تو نیا الرٹ گرایا اور گنا جاتا ہے۔
+- ہر چیٹ کا اپنا ٹوکن بکٹ ہے، تاکہ سگنلز کا ریلا ٹیلیگرام کی فی چیٹ حد سے نہ ٹکرائے۔
+- 429 پر ٹیلیگرام کا retry_after مانا جاتا ہے (اس دوران اس چیٹ کا کوئی پیغام نہیں جاتا)؛ نیٹ ورک اور 5xx
+  خرابیوں پر exponential backoff کے ساتھ دوبارہ کوشش؛ باقی 4xx مستقل ناکامی ہیں۔
+- ڈائجسٹ موڈ (DIGEST_WINDOW_SECONDS > 0): ایک ہی علامت کی اپ ڈیٹس تھوڑی دیر روکی جاتی ہیں اور زیرِ التوا اپ ڈیٹ
+  کی جگہ تازہ ترین اپ ڈیٹ لیتی ہے، ساتھ ضم شدہ اپ ڈیٹس کی گنتی۔
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Set, Tuple
+
+import httpx
+
+from config import api_settings, telegram_settings
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_API_URL = "https://api.telegram.org"
+
+class TokenBucket:
+    """فی چیٹ شرح کی حد: rate ٹوکن فی سیکنڈ، زیادہ سے زیادہ burst؛ retry_after پر چیٹ عارضی طور پر بند۔"""
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """اگلا ٹوکن دستیاب ہونے تک کے سیکنڈ (0 = ابھی)۔"""
+        self._refill(now)
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        return max(wait, self.blocked_until - now, 0.0)
+
+    def consume(self):
+        self.tokens -= 1
+
+    def block(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+class _Alert:
+    __slots__ = ("chat_id", "text", "symbol", "alert_type", "digest_key", "enqueued_at", "not_before", "attempts", "merged")
+
+    def __init__(self, chat_id: str, text: str, symbol: str, alert_type: str, digest_key: Optional[str], not_before: float):
+        self.chat_id = chat_id
+        self.text = text
+        self.symbol = symbol
+        self.alert_type = alert_type
+        self.digest_key = digest_key
+        self.enqueued_at = time.monotonic()
+        self.not_before = not_before
+        self.attempts = 0
+        self.merged = 0
+
+    def render(self) -> str:
+        if not self.merged:
+            return self.text
+        return f"{self.text}\n\n_(+{self.merged} پچھلی اپ ڈیٹس اس میں ضم)_"
+
+class TelegramDispatcher:
+    """محدود قطار، فی چیٹ ٹوکن بکٹ، retry/backoff اور اختیاری ڈائجسٹ کے ساتھ ٹیلیگرام الرٹس۔"""
+    def __init__(
+        self,
+        bot_token: str = api_settings.TELEGRAM_BOT_TOKEN,
+        default_chat_id: str = api_settings.TELEGRAM_CHAT_ID,
+        queue_size: int = telegram_settings.QUEUE_SIZE,
+        rate: float = telegram_settings.PER_CHAT_RATE,
+        burst: int = telegram_settings.PER_CHAT_BURST,
+        max_retries: int = telegram_settings.MAX_RETRIES,
+        digest_window: float = telegram_settings.DIGEST_WINDOW_SECONDS,
+        base_url: str = TELEGRAM_API_URL,
+    ):
+        self.bot_token = bot_token
+        self.default_chat_id = default_chat_id
+        self.queue_size = queue_size
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.digest_window = digest_window
+        self.base_url = base_url
+        self._queue: Deque[_Alert] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._worker_task: Optional[asyncio.Task] = None
+        # --- پیمائش ---
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+        self.retried = 0
+        self.merged = 0
+        self.rate_limited = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self._latency_total = 0.0
+
+    @property
+    def is_configured(self) -> bool:
+        return bool(self.bot_token and self.default_chat_id)
+
+    @property
+    def is_running(self) -> bool:
+        return self._worker_task is not None and not self._worker_task.done()
+
+    async def start(self):
+        """مشترکہ کلائنٹ اور رائٹر ٹاسک شروع کرتا ہے (ایونٹ لوپ کے اندر بلایا جائے)۔"""
+        if self.is_running:
+            return
+        self._wakeup = asyncio.Event()
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=telegram_settings.REQUEST_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=4),
+        )
+        self._worker_task = asyncio.create_task(self._run_worker())
+        logger.info(f"✉️ ٹیلیگرام ڈسپیچر شروع: قطار = {self.queue_size}، فی چیٹ {self.rate}/سیکنڈ (burst {self.burst})۔")
+
+    async def stop(self, drain_timeout: float = 10.0):
+        """زیرِ التوا الرٹس کو drain_timeout تک بھیجنے کا موقع دے کر بند کرتا ہے۔"""
+        if not self.is_running:
+            return
+        deadline = time.monotonic() + drain_timeout
+        while self._queue and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if self._queue:
+            logger.warning(f"✉️ ٹیلیگرام ڈسپیچر بند ہوتے وقت {len(self._queue)} الرٹس نہیں بھیجے جا سکے۔")
+        self._worker_task.cancel()
+        try:
+            await self._worker_task
+        except asyncio.CancelledError:
+            pass
+        self._worker_task = None
+        await self._client.aclose()
+        self._client = None
+
+    def submit(
+        self, text: str, symbol: str, alert_type: str,
+        chat_id: Optional[str] = None, digest_key: Optional[str] = None,
+    ) -> bool:
+        """
+        الرٹ قطار میں ڈالتا ہے اور فوراً واپس آتا ہے۔ digest_key والے الرٹس (اپ ڈیٹس) ڈائجسٹ موڈ میں ضم ہو سکتے ہیں۔
+        Returns: False اگر الرٹ گرایا گیا (ڈسپیچر نہیں چل رہا یا قطار بھری ہے)۔
+        """
+        chat_id = chat_id or self.default_chat_id
+        if not self.is_running:
+            logger.warning(f"✉️ ٹیلیگرام ڈسپیچر نہیں چل رہا؛ '{symbol}' کا {alert_type} الرٹ گرایا گیا۔")
+            self.dropped += 1
+            return False
+        if self.digest_window > 0 and digest_key:
+            for pending in self._queue:
+                if pending.chat_id == chat_id and pending.digest_key == digest_key and pending.attempts == 0:
+                    pending.text = text
+                    pending.merged += 1
+                    self.merged += 1
+                    return True
+        if len(self._queue) >= self.queue_size:
+            logger.warning(f"✉️ ٹیلیگرام کی قطار بھری ہے ({self.queue_size})؛ '{symbol}' کا {alert_type} الرٹ گرایا گیا۔")
+            self.dropped += 1
+            return False
+        hold = self.digest_window if digest_key else 0.0
+        self._queue.append(_Alert(chat_id, text, symbol, alert_type, digest_key, time.monotonic() + hold))
+        self._wakeup.set()
+        return True
+
+    def _bucket(self, chat_id: str) -> TokenBucket:
+        if chat_id not in self._buckets:
+            self._buckets[chat_id] = TokenBucket(self.rate, self.burst)
+        return self._buckets[chat_id]
+
+    def _take_ready(self) -> Tuple[Optional[_Alert], Optional[float]]:
+        """
+        قطار میں پہلا الرٹ جو ابھی بھیجا جا سکے، ورنہ اگلے الرٹ کے قابل ہونے تک کا انتظار۔
+        دوبارہ کوشش کا انتظار کرنے والے الرٹ کے بعد اسی چیٹ کے الرٹس آگے نہیں نکلتے (ترتیب برقرار)۔
+        """
+        now = time.monotonic()
+        wait: Optional[float] = None
+        held_chats: Set[str] = set()
+        for alert in self._queue:
+            if alert.chat_id in held_chats:
+                continue
+            remaining = max(alert.not_before - now, self._bucket(alert.chat_id).delay(now))
+            if remaining <= 0:
+                self._queue.remove(alert)
+                return alert, None
+            if alert.attempts:
+                held_chats.add(alert.chat_id)
+            wait = remaining if wait is None else min(wait, remaining)
+        return None, wait
+
+    async def _run_worker(self):
+        while True:
+            alert, wait = self._take_ready()
+            if alert is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._bucket(alert.chat_id).consume()
+            try:
+                await self._send(alert)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"✉️ ٹیلیگرام الرٹ بھیجنے میں غیر متوقع خرابی: {e}", exc_info=True)
+                self.failed += 1
+
+    async def _send(self, alert: _Alert):
+        payload = {"chat_id": alert.chat_id, "text": alert.render(), "parse_mode": "Markdown"}
+        try:
+            response = await self._client.post(f"/bot{self.bot_token}/sendMessage", json=payload)
+        except httpx.TransportError as e:
+            self._retry(alert, None, f"نیٹ ورک کی خرابی: {e!r}")
+            return
+
+        if response.status_code == 429:
+            self.rate_limited += 1
+            retry_after = _retry_after(response)
+            self._bucket(alert.chat_id).block(retry_after)
+            self._retry(alert, retry_after, f"ریٹ لمٹ (retry_after={retry_after})")
+            return
+        if response.status_code >= 500:
+            self._retry(alert, None, f"سرور کی خرابی ({response.status_code})")
+            return
+        if response.status_code >= 400:
+            logger.error(f"ٹیلیگرام API سے خرابی ({response.status_code}): {response.text}")
+            self.failed += 1
+            return
+
+        latency = time.monotonic() - alert.enqueued_at
+        self.sent += 1
+        self.last_latency = latency
+        self.max_latency = max(self.max_latency, latency)
+        self._latency_total += latency
+        logger.info(f"'{alert.symbol}' کے لیے ٹیلیگرام {alert.alert_type} الرٹ کامیابی سے بھیجا گیا ({latency:.2f} سیکنڈ)۔")
+
+    def _retry(self, alert: _Alert, delay: Optional[float], reason: str):
+        alert.attempts += 1
+        if alert.attempts > self.max_retries:
+            logger.error(f"✉️ '{alert.symbol}' کا {alert.alert_type} الرٹ {self.max_retries} کوششوں کے بعد ناکام: {reason}")
+            self.failed += 1
+            return
+        if delay is None:
+            backoff = telegram_settings.BACKOFF_BASE_SECONDS * 2 ** (alert.attempts - 1)
+            delay = min(telegram_settings.BACKOFF_MAX_SECONDS, backoff) * random.uniform(0.8, 1.2)
+        alert.not_before = time.monotonic() + delay
+        self.retried += 1
+        logger.warning(f"✉️ '{alert.symbol}' کا الرٹ {delay:.1f} سیکنڈ بعد دوبارہ بھیجا جائے گا (کوشش {alert.attempts}): {reason}")
+        # قطار کے شروع میں، تاکہ اسی چیٹ کے بعد والے الرٹس اس سے آگے نہ نکلیں
+        self._queue.appendleft(alert)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "running": self.is_running,
+            "configured": self.is_configured,
+            "queue_depth": len(self._queue),
+            "queue_size": self.queue_size,
+            "digest_window_seconds": self.digest_window,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "retried": self.retried,
+            "merged": self.merged,
+            "rate_limited": self.rate_limited,
+            "last_latency_ms": round(self.last_latency * 1000, 1),
+            "avg_latency_ms": round(self._latency_total / self.sent * 1000, 1) if self.sent else 0.0,
+            "max_latency_ms": round(self.max_latency * 1000, 1),
+            "oldest_pending_ms": round((now - min(a.enqueued_at for a in self._queue)) * 1000, 1) if self._queue else 0.0,
+            "chats_blocked": [chat for chat, bucket in self._buckets.items() if bucket.blocked_until > now],
+        }
+
+def _retry_after(response: httpx.Response) -> float:
+    """ٹیلیگرام 429 جواب کا parameters.retry_after (یا Retry-After ہیڈر)، سیکنڈز میں۔"""
+    try:
+        return float(response.json()["parameters"]["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        pass
+    try:
+        return float(response.headers.get("retry-after", telegram_settings.BACKOFF_BASE_SECONDS))
+    except ValueError:
+        return telegram_settings.BACKOFF_BASE_SECONDS
+
+# ڈسپیچر کا عالمی نمونہ؛ app.py اسٹارٹ اپ پر اسے شروع کرتا ہے
+telegram_dispatcher = TelegramDispatcher()
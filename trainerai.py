@@ -1,21 +1,19 @@
 # filename: trainerai.py
 
-import json
 import logging
-import threading
 from typing import Dict, Any
 from datetime import datetime  # <--- سب سے اہم اور شرمناک اصلاح
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from models import ActiveSignal
+from learning_store import learning_store
+from outcome_stats import outcome_stats, r_multiple
+from signal_registry import ActiveSignalSnapshot
 from sentinel import check_news_at_time_of_trade
 
 logger = logging.getLogger(__name__)
 
-LEARNING_DATA_FILE = "learning_data.json"
-learning_lock = threading.Lock()
-
 def get_confidence(
     db: Session, 
     core_signal: str, 
@@ -51,7 +49,7 @@ def get_confidence(
     
     return round(confidence, 2)
 
-async def learn_from_outcome(db: Session, signal: ActiveSignal, outcome: str):
+async def learn_from_outcome(db: AsyncSession, signal: ActiveSignalSnapshot, outcome: str):
     """
     ٹریڈ کے نتیجے (TP/SL) سے سیکھتا ہے اور مستقبل کے فیصلوں کے لیے ڈیٹا محفوظ کرتا ہے۔
     """
@@ -71,22 +69,15 @@ async def learn_from_outcome(db: Session, signal: ActiveSignal, outcome: str):
             "reason": signal.reason,
             "component_scores": signal.component_scores,
             "news_at_trade_time": trade_had_high_impact_news,
+            "r_multiple": r_multiple(outcome, signal.entry_price, signal.tp_price, signal.sl_price),
             "timestamp": datetime.utcnow().isoformat(),
         }
 
-        with learning_lock:
-            try:
-                with open(LEARNING_DATA_FILE, 'r') as f:
-                    data = json.load(f)
-            except (FileNotFoundError, json.JSONDecodeError):
-                data = []
-            
-            data.append(learning_entry)
-            
-            with open(LEARNING_DATA_FILE, 'w') as f:
-                json.dump(data, f, indent=4)
-            
-            logger.info(f"🧠 [{signal.symbol}] کا نتیجہ کامیابی سے لرننگ فائل میں محفوظ کر لیا گیا۔")
+        outcome_stats.record_entry(learning_entry)
+
+        # فائل میں لکھائی پس منظر کا بیچ رائٹر کرتا ہے؛ یہاں صرف قطار میں ڈالا جاتا ہے
+        learning_store.record(learning_entry)
+        logger.info(f"🧠 [{signal.symbol}] کا نتیجہ لرننگ لاگ کی قطار میں شامل کر دیا گیا۔")
 
     except Exception as e:
         logger.error(f"سیکھنے کے عمل کے دوران ایک غیر متوقع خرابی پیش آئی: {e}", exc_info=True)
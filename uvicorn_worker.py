@@ -0,0 +1,13 @@
+# filename: uvicorn_worker.py
+
+"""
+Gunicorn کے لیے Uvicorn ورکر، WebSocket کے لیے 'websockets' نفاذ اور permessage-deflate کے ساتھ۔
+
+براؤزر ہر کنکشن پر permessage-deflate پیش کرتے ہیں؛ یہ ورکر اسے واضح طور پر قبول کرتا ہے تاکہ بڑے
+(batch) فریمز کمپریس ہو کر جائیں، چاہے Uvicorn کے ڈیفالٹس بدل جائیں۔
+"""
+
+from uvicorn.workers import UvicornWorker
+
+class DeflateUvicornWorker(UvicornWorker):
+    CONFIG_KWARGS = {**UvicornWorker.CONFIG_KWARGS, "ws": "websockets", "ws_per_message_deflate": True}
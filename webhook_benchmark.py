@@ -0,0 +1,138 @@
+# filename: webhook_benchmark.py
+
+"""
+webhook ڈسپیچر کی تھرو پٹ اور تاخیر (p50/p95/p99) کا بینچ مارک۔
+
+ہزاروں سبسکرائبرز میموری میں بنائے جاتے ہیں (ڈیٹا بیس میں نہیں) جو سب مقامی وصول کنندہ
+(webhook_receiver) کی طرف اشارہ کرتے ہیں؛ وصول کنندہ اسی پروسیس میں ASGI ٹرانسپورٹ کے ذریعے چلتا ہے، اس لیے
+نتیجہ ڈسپیچر (انڈیکس، serialization، دستخط، ورکرز کا پول) کی لاگت دکھاتا ہے، نیٹ ورک کی نہیں۔ --url دینے پر
+ایک الگ چلتے ہوئے وصول کنندہ کو حقیقی HTTP پر بھیجا جاتا ہے۔ --fail-rate > 0 پر ناکام ترسیلات ڈیٹا بیس کی
+قطار میں جاتی ہیں۔
+
+استعمال:
+    python webhook_benchmark.py --subscribers 5000 --events 20 --workers 64
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from models import create_db_and_tables
+from webhook_dispatcher import WebhookDispatcher, WebhookTarget
+from webhook_receiver import create_receiver_app
+
+logger = logging.getLogger(__name__)
+
+SECRET = "benchmark-secret"
+SYMBOLS = ("EUR/USD", "GBP/USD", "USD/JPY", "XAU/USD", "BTC/USD", "ETH/USD", "AUD/USD", "USD/CAD")
+
+def _targets(count: int, base_url: str, symbol_filtered: float, max_concurrency: int) -> List[WebhookTarget]:
+    # کچھ سبسکرائبرز صرف ایک علامت چاہتے ہیں، باقی سب
+    filtered = int(count * symbol_filtered)
+    return [
+        WebhookTarget.create(
+            i, f"{base_url}/hooks/sub{i}", SECRET,
+            symbols=[SYMBOLS[i % len(SYMBOLS)]] if i < filtered else None,
+            max_concurrency=max_concurrency,
+        )
+        for i in range(count)
+    ]
+
+def _event(i: int) -> Dict:
+    symbol = SYMBOLS[i % len(SYMBOLS)]
+    if i % 4 == 3:
+        return {"type": "signals_closed", "data": {"signal_ids": [f"{s}_bench{i}" for s in SYMBOLS[:3]], "symbols": list(SYMBOLS[:3]), "outcome": "tp_hit"}}
+    return {"type": "new_signal", "data": {
+        "signal_id": f"{symbol}_bench{i}", "symbol": symbol, "signal_type": "buy", "entry_price": 1.0,
+        "tp_price": 1.003, "sl_price": 0.998, "confidence": 80.0, "timeframe": "15min",
+    }}
+
+def _percentiles(seconds: List[float]) -> Dict[str, float]:
+    arr = np.asarray(seconds) * 1000
+    if not arr.size:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    return {
+        "p50_ms": round(float(np.percentile(arr, 50)), 2),
+        "p95_ms": round(float(np.percentile(arr, 95)), 2),
+        "p99_ms": round(float(np.percentile(arr, 99)), 2),
+        "max_ms": round(float(arr.max()), 2),
+    }
+
+async def run_benchmark(
+    subscribers: int, events: int, workers: int, max_concurrency: int, symbol_filtered: float,
+    fail_rate: float, latency_ms: float, url: Optional[str],
+) -> Dict:
+    """ایک بینچ مارک چلاتا ہے اور تھرو پٹ اور تاخیر کے اعداد واپس کرتا ہے۔"""
+    if url:
+        transport, base_url = None, url.rstrip("/")
+    else:
+        receiver = create_receiver_app(SECRET, fail_rate=fail_rate, latency_ms=latency_ms, seed=0)
+        transport, base_url = httpx.ASGITransport(app=receiver), "http://receiver"
+    dispatcher = WebhookDispatcher(
+        workers=workers, queue_size=subscribers * events + 1, transport=transport, allow_private_urls=True,
+    )
+    dispatcher.set_targets(_targets(subscribers, base_url, symbol_filtered, max_concurrency))
+    await dispatcher.start()
+    try:
+        started = time.perf_counter()
+        publish_times = []
+        expected = 0
+        for i in range(events):
+            publish_started = time.perf_counter()
+            expected += dispatcher.publish(_event(i))
+            publish_times.append(time.perf_counter() - publish_started)
+        await dispatcher._queue.join()
+        elapsed = time.perf_counter() - started
+        metrics = dispatcher.get_metrics()
+        latencies = list(dispatcher._latencies)
+    finally:
+        await dispatcher.stop()
+    result = {
+        "subscribers": subscribers,
+        "events": events,
+        "workers": workers,
+        "deliveries": expected,
+        "delivered": metrics["delivered"],
+        "failed_attempts": metrics["failed_attempts"],
+        "deferred_by_breaker": metrics["deferred_by_breaker"],
+        "elapsed_s": round(elapsed, 3),
+        "deliveries_per_second": round(metrics["delivered"] / elapsed, 1) if elapsed else 0.0,
+        "publish_p99_ms": _percentiles(publish_times)["p99_ms"],
+        **_percentiles(latencies),
+    }
+    if not url:
+        result["receiver"] = receiver.state.stats.as_dict()
+    return result
+
+async def _main(args):
+    if args.fail_rate > 0:
+        # ناکام ترسیلات webhook_deliveries میں لکھی جاتی ہیں
+        create_db_and_tables()
+    result = await run_benchmark(
+        args.subscribers, args.events, args.workers, args.max_concurrency, args.symbol_filtered,
+        args.fail_rate, args.latency_ms, args.url,
+    )
+    print(json.dumps(result, indent=2))
+
+def main():
+    parser = argparse.ArgumentParser(description="webhook ڈسپیچر کا تھرو پٹ بینچ مارک")
+    parser.add_argument("--subscribers", type=int, default=2000)
+    parser.add_argument("--events", type=int, default=20, help="شائع ہونے والے سگنل ایونٹس")
+    parser.add_argument("--workers", type=int, default=32, help="ترسیل کرنے والے ورکرز")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="فی سبسکرائبر بیک وقت درخواستیں")
+    parser.add_argument("--symbol-filtered", type=float, default=0.5, help="صرف ایک علامت چاہنے والے سبسکرائبرز کا تناسب")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="وصول کنندہ پر 503 کا تناسب")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="وصول کنندہ کی مصنوعی تاخیر")
+    parser.add_argument("--url", default=None, help="الگ چلتے وصول کنندہ کا بنیادی URL (مثلاً http://localhost:9000)")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    asyncio.run(_main(args))
+
+if __name__ == "__main__":
+    main()
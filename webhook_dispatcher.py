@@ -0,0 +1,566 @@
+# filename: webhook_dispatcher.py
+
+"""
+بیرونی سسٹمز (ایکزیکیوشن بوٹس، ڈیش بورڈز) کو سگنل ایونٹس کی webhook ترسیل۔
+
+ایونٹ بس پر شائع ہونے والا ہر سگنل پیغام (new_signal، signal_updated، signal_closed، signals_closed) شائع
+کرنے والے ورکر میں publish() تک پہنچتا ہے، جو اسے مطابقت رکھنے والی سبسکرپشنز کے لیے ترسیلات میں بدل کر
+ایک محدود قطار میں ڈالتا ہے اور فوراً واپس آتا ہے۔
+- علامت کے انڈیکس سے صرف متعلقہ سبسکرپشنز دیکھی جاتی ہیں؛ ایک ہی شکل کی باڈی ایک بار serialize ہوتی ہے۔
+- ورکرز کا پول ایک مشترکہ httpx کلائنٹ سے POST کرتا ہے؛ ہر درخواست HMAC-SHA256 سے دستخط شدہ ہوتی ہے
+  (X-Webhook-Signature = "sha256=" + HMAC(secret, "<timestamp>." + body))۔
+- ہر اینڈ پوائنٹ کی بیک وقت درخواستیں max_concurrency تک محدود ہیں؛ اضافی ترسیلات اسی اینڈ پوائنٹ کی
+  مقامی قطار میں رکتی ہیں اور ورکر اگلی ترسیل پر چلا جاتا ہے، تاکہ ایک سست اینڈ پوائنٹ پورا پول نہ روکے۔
+- لگاتار ناکامیوں پر اینڈ پوائنٹ کا سرکٹ کھل جاتا ہے: اس دوران ترسیلات بھیجے بغیر مؤخر ہوتی ہیں، پھر ایک
+  آزمائشی ترسیل سرکٹ بند کرتی ہے یا دوبارہ کھولتی ہے۔
+- ناکام اور مؤخر ترسیلات ڈیٹا بیس (webhook_deliveries) میں جاتی ہیں؛ لیڈر انہیں exponential backoff کے
+  مطابق دوبارہ قطار میں ڈالتا ہے، اور کوششیں ختم ہونے (یا مستقل 4xx) پر وہ dead-letter بن جاتی ہیں۔
+- نجی، loopback اور link-local پتوں والے URL رجسٹریشن پر بھی رد ہوتے ہیں اور ترسیل سے پہلے بھی (DNS بدل
+  سکتا ہے)، تاکہ سرور سے اندرونی نیٹ ورک کو درخواستیں (SSRF) نہ بھیجی جا سکیں۔
+"""
+
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import logging
+import random
+import socket
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+import numpy as np
+import orjson
+
+import async_crud
+from config import app_settings, webhook_settings
+from models import AsyncSessionLocal
+from websocket_manager import Subscription, _normalize_symbols, message_symbols
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_EVENT_TYPES = ("new_signal", "signal_updated", "signal_closed", "signals_closed")
+
+ID_HEADER = "X-Webhook-Id"
+EVENT_HEADER = "X-Webhook-Event"
+TIMESTAMP_HEADER = "X-Webhook-Timestamp"
+SIGNATURE_HEADER = "X-Webhook-Signature"
+
+PERSIST_INTERVAL_SECONDS = 1.0
+LATENCY_SAMPLES = 10_000
+
+def sign_payload(secret: str, timestamp: str, body: bytes) -> str:
+    """X-Webhook-Signature ہیڈر کی قدر۔"""
+    digest = hmac.new(secret.encode("utf-8"), timestamp.encode("ascii") + b"." + body, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+def verify_signature(
+    secret: str, timestamp: str, body: bytes, signature: str,
+    tolerance: int = webhook_settings.SIGNATURE_TOLERANCE_SECONDS, now: Optional[float] = None,
+) -> bool:
+    """وصول کنندہ کی طرف جانچ: دستخط درست ہو اور ٹائم اسٹیمپ tolerance سے پرانا نہ ہو (replay سے بچاؤ)۔"""
+    try:
+        sent_at = int(timestamp)
+    except (TypeError, ValueError):
+        return False
+    if abs((now if now is not None else time.time()) - sent_at) > tolerance:
+        return False
+    return hmac.compare_digest(sign_payload(secret, timestamp, body), signature or "")
+
+async def check_webhook_url(url: str) -> Optional[str]:
+    """
+    None اگر url ایک عوامی http(s) پتہ ہو؛ ورنہ رد کرنے کی وجہ۔ host کے تمام DNS پتے عوامی ہونے چاہئیں:
+    نجی، loopback، link-local، مخصوص (reserved) اور multicast پتے رد ہوتے ہیں۔
+    """
+    try:
+        parsed = urlsplit(url)
+        port = parsed.port
+    except ValueError:
+        return "url درست نہیں۔"
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        return "url کو http:// یا https:// اور host کے ساتھ ہونا چاہیے۔"
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(
+            parsed.hostname, port or (443 if parsed.scheme == "https" else 80), type=socket.SOCK_STREAM
+        )
+    except (socket.gaierror, UnicodeError) as e:
+        return f"host '{parsed.hostname}' حل نہیں ہو سکا: {e}"
+    for _, _, _, _, sockaddr in infos:
+        address = ipaddress.ip_address(sockaddr[0])
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            return f"host '{parsed.hostname}' غیر عوامی پتے ({address}) پر ہے؛ اس کی اجازت نہیں۔"
+    return None
+
+class WebhookTarget(NamedTuple):
+    """ایک فعال سبسکرپشن کی میموری میں تصویر۔"""
+    id: int
+    url: str
+    secret: str
+    max_concurrency: int
+    subscription: Subscription
+
+    @classmethod
+    def create(
+        cls, id: int, url: str, secret: str, symbols: Optional[Iterable[str]] = None,
+        event_types: Optional[Iterable[str]] = None, max_concurrency: int = 4,
+    ) -> "WebhookTarget":
+        subscription = Subscription()
+        subscription.symbols = _normalize_symbols(symbols) if symbols else None
+        subscription.types = set(event_types) & set(WEBHOOK_EVENT_TYPES) if event_types else set(WEBHOOK_EVENT_TYPES)
+        return cls(id, url, secret, max(1, int(max_concurrency or 1)), subscription)
+
+    @classmethod
+    def from_model(cls, row) -> "WebhookTarget":
+        return cls.create(row.id, row.url, row.secret, row.symbols, row.event_types, row.max_concurrency)
+
+class CircuitBreaker:
+    """ایک اینڈ پوائنٹ کا سرکٹ: closed → (لگاتار ناکامیاں) open → (وقفے کے بعد) half_open → closed/open۔"""
+    def __init__(
+        self,
+        failure_threshold: int = webhook_settings.BREAKER_FAILURE_THRESHOLD,
+        reset_seconds: float = webhook_settings.BREAKER_RESET_SECONDS,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._probing = False
+
+    def blocked_until(self, now: float) -> Optional[float]:
+        """None = ابھی بھیجا جا سکتا ہے؛ ورنہ وہ وقت (epoch سیکنڈ) جب تک اس اینڈ پوائنٹ کو کچھ نہ بھیجا جائے۔"""
+        if self.state == "open":
+            reopen_at = self.opened_at + self.reset_seconds
+            if now < reopen_at:
+                return reopen_at
+            self.state, self._probing = "half_open", False
+        if self.state == "half_open":
+            # آزمائش کے دوران صرف ایک درخواست
+            if self._probing:
+                return now + self.reset_seconds
+            self._probing = True
+        return None
+
+    def record_success(self):
+        self.state, self.failures, self._probing = "closed", 0, False
+
+    def record_failure(self, now: float):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.trips += 1
+            self.state, self.opened_at, self._probing = "open", now, False
+
+class _Delivery:
+    __slots__ = ("target_id", "event_id", "event_type", "body", "attempts", "row_id", "enqueued_at")
+
+    def __init__(self, target_id: int, event_id: str, event_type: str, body: bytes, attempts: int = 0, row_id: Optional[int] = None):
+        self.target_id = target_id
+        self.event_id = event_id
+        self.event_type = event_type
+        self.body = body
+        self.attempts = attempts
+        self.row_id = row_id
+        self.enqueued_at = time.monotonic()
+
+class _Endpoint:
+    """ایک سبسکرپشن کی چلتی حالت: جاری درخواستیں، حد سے زائد ترسیلات کی مقامی قطار اور سرکٹ۔"""
+    __slots__ = ("inflight", "backlog", "breaker", "delivered", "failed")
+
+    def __init__(self):
+        self.inflight = 0
+        self.backlog: Deque[_Delivery] = deque()
+        self.breaker = CircuitBreaker()
+        self.delivered = 0
+        self.failed = 0
+
+class WebhookDispatcher:
+    """سبسکرپشنز کا انڈیکس، ورکرز کا پول، فی اینڈ پوائنٹ حدیں/سرکٹ اور ڈیٹا بیس میں retry/dead-letter قطار۔"""
+    def __init__(
+        self,
+        workers: int = webhook_settings.WORKERS,
+        queue_size: int = webhook_settings.QUEUE_SIZE,
+        max_attempts: int = webhook_settings.MAX_ATTEMPTS,
+        timeout: float = webhook_settings.REQUEST_TIMEOUT_SECONDS,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        allow_private_urls: bool = webhook_settings.ALLOW_PRIVATE_URLS,
+    ):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.transport = transport
+        self.allow_private_urls = allow_private_urls
+        # url → (کب تک درست، رد کرنے کی وجہ یا None)
+        self._url_checks: Dict[str, Tuple[float, Optional[str]]] = {}
+        self._targets: Dict[int, WebhookTarget] = {}
+        self._by_symbol: Dict[str, Set[int]] = {}
+        self._all_symbols: Set[int] = set()
+        self._endpoints: Dict[int, _Endpoint] = {}
+        self._queue: Optional["asyncio.Queue[_Delivery]"] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._persist_task: Optional[asyncio.Task] = None
+        # ڈیٹا بیس میں جانے والی تبدیلیاں؛ persister انہیں ہر سیکنڈ ایک ٹرانزیکشن میں لکھتا ہے
+        self._to_persist: List[Tuple[_Delivery, str, datetime, Optional[str]]] = []
+        self._delivered_rows: List[int] = []
+        # --- پیمائش ---
+        self.events = 0
+        self.enqueued = 0
+        self.delivered = 0
+        self.failed_attempts = 0
+        self.deferred = 0
+        self.dead_lettered = 0
+        self.blocked_urls = 0
+        self.spilled = 0
+        self.requeued = 0
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._worker_tasks)
+
+    async def start(self):
+        """مشترکہ کلائنٹ، ورکرز اور persister شروع کرتا ہے (ایونٹ لوپ کے اندر بلایا جائے)۔"""
+        if self.is_running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            transport=self.transport,
+            limits=httpx.Limits(max_connections=self.workers * 4, max_keepalive_connections=self.workers * 2),
+            headers={"User-Agent": f"{app_settings.PROJECT_NAME} webhooks", "Content-Type": "application/json"},
+        )
+        self._worker_tasks = [asyncio.create_task(self._run_worker()) for _ in range(self.workers)]
+        self._persist_task = asyncio.create_task(self._run_persister())
+        logger.info(f"🪝 webhook ڈسپیچر شروع: {self.workers} ورکرز، قطار = {self.queue_size}۔")
+
+    async def stop(self, drain_timeout: float = 10.0):
+        """قطار کو drain_timeout تک خالی ہونے دیتا ہے؛ باقی ترسیلات ڈیٹا بیس میں، تاکہ لیڈر انہیں بعد میں بھیجے۔"""
+        if not self.is_running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"🪝 webhook ڈسپیچر بند ہوتے وقت {self._queue.qsize()} ترسیلات ڈیٹا بیس کی قطار میں منتقل۔")
+        tasks, self._worker_tasks = self._worker_tasks + [self._persist_task], []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._persist_task = None
+        retry_at = datetime.utcnow()
+        while not self._queue.empty():
+            self._to_persist.append((self._queue.get_nowait(), "pending", retry_at, "سرور بند ہونے پر مؤخر"))
+        for endpoint in self._endpoints.values():
+            while endpoint.backlog:
+                self._to_persist.append((endpoint.backlog.popleft(), "pending", retry_at, "سرور بند ہونے پر مؤخر"))
+        await self.flush()
+        await self._client.aclose()
+        self._client = None
+
+    # --- سبسکرپشنز ---
+
+    def set_targets(self, targets: Iterable[WebhookTarget]):
+        """میموری کا انڈیکس نئی فہرست سے بدلتا ہے؛ ہٹائی گئی سبسکرپشنز کی مقامی قطاریں ختم۔"""
+        targets = {target.id: target for target in targets}
+        by_symbol: Dict[str, Set[int]] = {}
+        all_symbols: Set[int] = set()
+        for target in targets.values():
+            if target.subscription.symbols is None:
+                all_symbols.add(target.id)
+                continue
+            for symbol in target.subscription.symbols:
+                by_symbol.setdefault(symbol, set()).add(target.id)
+        self._targets, self._by_symbol, self._all_symbols = targets, by_symbol, all_symbols
+        for removed in set(self._endpoints) - set(targets):
+            del self._endpoints[removed]
+        urls = {target.url for target in targets.values()}
+        self._url_checks = {url: check for url, check in self._url_checks.items() if url in urls}
+
+    async def refresh(self):
+        """فعال سبسکرپشنز ڈیٹا بیس سے دوبارہ لوڈ کرتا ہے۔"""
+        async with AsyncSessionLocal() as db:
+            rows = await async_crud.get_webhook_subscriptions(db)
+        if rows is None:
+            return
+        self.set_targets(WebhookTarget.from_model(row) for row in rows)
+        logger.info(f"🪝 {len(self._targets)} فعال webhook سبسکرپشنز لوڈ ہوئیں۔")
+
+    def _endpoint(self, target_id: int) -> _Endpoint:
+        if target_id not in self._endpoints:
+            self._endpoints[target_id] = _Endpoint()
+        return self._endpoints[target_id]
+
+    # --- شائع کرنا ---
+
+    def publish(self, message: Dict[str, Any]) -> int:
+        """
+        سگنل پیغام کو مطابقت رکھنے والی سبسکرپشنز کی ترسیلات میں بدل کر قطار میں ڈالتا ہے (بلاک نہیں کرتا)۔
+        Returns: بنائی گئی ترسیلات کی تعداد۔
+        """
+        event_type = message.get("type")
+        if event_type not in WEBHOOK_EVENT_TYPES or not self._targets or not self.is_running:
+            return 0
+        symbols = message_symbols(message)
+        if symbols is None:
+            candidates: Iterable[int] = self._targets
+        else:
+            candidates = set(self._all_symbols)
+            for symbol in symbols:
+                candidates |= self._by_symbol.get(symbol, set())
+
+        self.events += 1
+        event_id = uuid.uuid4().hex
+        created_at = datetime.utcnow().isoformat()
+        # signals_closed کو علامتوں تک محدود کرنے سے مختلف شکلیں بنتی ہیں؛ ہر شکل ایک ہی بار serialize
+        bodies: Dict[Any, bytes] = {}
+        count = 0
+        for target_id in candidates:
+            target = self._targets[target_id]
+            view = target.subscription.view(message)
+            if view is None:
+                continue
+            shape = None if view is message else tuple(view["data"].get("signal_ids", ()))
+            body = bodies.get(shape)
+            if body is None:
+                body = bodies[shape] = orjson.dumps(
+                    {"id": event_id, "type": event_type, "created_at": created_at, "data": view.get("data")}, default=str,
+                )
+            self._enqueue(_Delivery(target_id, event_id, event_type, body))
+            count += 1
+        return count
+
+    def _enqueue(self, delivery: _Delivery) -> bool:
+        try:
+            self._queue.put_nowait(delivery)
+        except asyncio.QueueFull:
+            # ضائع نہیں ہوتی: ڈیٹا بیس کی قطار سے لیڈر اسے بھیجے گا
+            self.spilled += 1
+            self._to_persist.append((delivery, "pending", datetime.utcnow(), "میموری کی قطار بھری تھی"))
+            return False
+        self.enqueued += 1
+        return True
+
+    # --- ترسیل ---
+
+    async def _run_worker(self):
+        while True:
+            delivery = await self._queue.get()
+            try:
+                await self._process(delivery)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"🪝 webhook ترسیل میں غیر متوقع خرابی: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, delivery: _Delivery):
+        target = self._targets.get(delivery.target_id)
+        if target is None:
+            # سبسکرپشن حذف یا غیر فعال ہو چکی
+            if delivery.row_id is not None:
+                self._delivered_rows.append(delivery.row_id)
+            return
+        endpoint = self._endpoint(target.id)
+        if endpoint.inflight >= target.max_concurrency:
+            # جاری درخواستوں میں سے کوئی اسے مکمل ہونے پر اٹھائے گی
+            endpoint.backlog.append(delivery)
+            return
+        endpoint.inflight += 1
+        try:
+            while delivery is not None:
+                blocked_until = endpoint.breaker.blocked_until(time.time())
+                if blocked_until is not None:
+                    self._defer(endpoint, delivery, blocked_until)
+                    while endpoint.backlog:
+                        self._defer(endpoint, endpoint.backlog.popleft(), blocked_until)
+                    return
+                await self._attempt(target, endpoint, delivery)
+                delivery = endpoint.backlog.popleft() if endpoint.backlog else None
+        finally:
+            endpoint.inflight -= 1
+
+    async def _url_rejection(self, url: str) -> Optional[str]:
+        """ترسیل سے پہلے url کی جانچ (check_webhook_url)، URL_CHECK_TTL_SECONDS تک یاد رکھی ہوئی۔"""
+        if self.allow_private_urls:
+            return None
+        now = time.monotonic()
+        cached = self._url_checks.get(url)
+        if cached and cached[0] > now:
+            return cached[1]
+        reason = await check_webhook_url(url)
+        self._url_checks[url] = (now + webhook_settings.URL_CHECK_TTL_SECONDS, reason)
+        return reason
+
+    async def _attempt(self, target: WebhookTarget, endpoint: _Endpoint, delivery: _Delivery):
+        rejection = await self._url_rejection(target.url)
+        if rejection:
+            # رجسٹریشن کے بعد DNS نجی پتے پر چلا گیا؛ بھیجا نہیں جاتا
+            self.blocked_urls += 1
+            self.dead_lettered += 1
+            logger.warning(f"🪝 '{target.url}' کو {delivery.event_type} ({delivery.event_id[:8]}) روکا گیا: {rejection}")
+            self._to_persist.append((delivery, "dead", datetime.utcnow(), rejection))
+            return
+        timestamp = str(int(time.time()))
+        headers = {
+            ID_HEADER: delivery.event_id,
+            EVENT_HEADER: delivery.event_type,
+            TIMESTAMP_HEADER: timestamp,
+            SIGNATURE_HEADER: sign_payload(target.secret, timestamp, delivery.body),
+        }
+        retry_after: Optional[float] = None
+        try:
+            response = await self._client.post(target.url, content=delivery.body, headers=headers)
+        except httpx.HTTPError as e:
+            status, error = None, f"نیٹ ورک کی خرابی: {e!r}"
+        else:
+            status, error = response.status_code, f"HTTP {response.status_code}"
+            if status < 300:
+                endpoint.breaker.record_success()
+                endpoint.delivered += 1
+                self.delivered += 1
+                self._latencies.append(time.monotonic() - delivery.enqueued_at)
+                if delivery.row_id is not None:
+                    self._delivered_rows.append(delivery.row_id)
+                return
+            if status == 429:
+                retry_after = _retry_after(response)
+
+        delivery.attempts += 1
+        endpoint.failed += 1
+        self.failed_attempts += 1
+        # 408/429 کے علاوہ 4xx وصول کنندہ کا مستقل انکار ہے؛ دوبارہ بھیجنا بے فائدہ، اور اینڈ پوائنٹ کی صحت کا مسئلہ نہیں
+        permanent = status is not None and 400 <= status < 500 and status not in (408, 429)
+        if permanent:
+            # اینڈ پوائنٹ نے جواب دیا، یعنی وہ زندہ ہے
+            endpoint.breaker.record_success()
+        else:
+            endpoint.breaker.record_failure(time.time())
+        if permanent or delivery.attempts >= self.max_attempts:
+            self.dead_lettered += 1
+            logger.warning(f"🪝 '{target.url}' کو {delivery.event_type} ({delivery.event_id[:8]}) dead-letter: {error} ({delivery.attempts} کوششیں)")
+            self._to_persist.append((delivery, "dead", datetime.utcnow(), error))
+            return
+        if retry_after is None:
+            backoff = webhook_settings.BACKOFF_BASE_SECONDS * 2 ** (delivery.attempts - 1)
+            retry_after = min(webhook_settings.BACKOFF_MAX_SECONDS, backoff) * random.uniform(0.8, 1.2)
+        self._to_persist.append((delivery, "pending", datetime.utcnow() + timedelta(seconds=retry_after), error))
+
+    def _defer(self, endpoint: _Endpoint, delivery: _Delivery, until: float):
+        """کھلے سرکٹ کی وجہ سے بھیجے بغیر مؤخر؛ کوشش شمار نہیں ہوتی۔"""
+        self.deferred += 1
+        self._to_persist.append((delivery, "pending", datetime.utcfromtimestamp(until), f"سرکٹ کھلا ہے ({endpoint.breaker.failures} لگاتار ناکامیاں)"))
+
+    # --- ڈیٹا بیس کی قطار ---
+
+    async def _run_persister(self):
+        while True:
+            await asyncio.sleep(PERSIST_INTERVAL_SECONDS)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"🪝 webhook قطار محفوظ کرنے میں غیر متوقع خرابی: {e}", exc_info=True)
+
+    async def flush(self):
+        """جمع شدہ ناکامیاں/مؤخر ترسیلات اور مکمل شدہ قطاریں ایک ٹرانزیکشن میں ڈیٹا بیس میں لکھتا ہے۔"""
+        pending, self._to_persist = self._to_persist, []
+        delivered_rows, self._delivered_rows = self._delivered_rows, []
+        if not pending and not delivered_rows:
+            return
+        now = datetime.utcnow()
+        new_rows: List[Dict[str, Any]] = []
+        updates: List[Dict[str, Any]] = []
+        for delivery, status, next_attempt_at, error in pending:
+            values = {
+                "status": status, "attempts": delivery.attempts, "next_attempt_at": next_attempt_at,
+                "last_error": error, "updated_at": now,
+            }
+            if delivery.row_id is None:
+                new_rows.append({
+                    **values, "subscription_id": delivery.target_id, "event_id": delivery.event_id,
+                    "event_type": delivery.event_type, "body": delivery.body.decode("utf-8"), "created_at": now,
+                })
+            else:
+                updates.append({**values, "id": delivery.row_id})
+        async with AsyncSessionLocal() as db:
+            saved = await async_crud.save_webhook_deliveries(db, new_rows, updates, delivered_rows)
+        if not saved:
+            # اگلی بار دوبارہ کوشش؛ ترسیلات ضائع نہ ہوں
+            self._to_persist[:0] = pending
+            self._delivered_rows[:0] = delivered_rows
+
+    async def retry_due(self, limit: int = webhook_settings.RETRY_BATCH_SIZE) -> int:
+        """لیڈر کی جاب: واجب الادا ترسیلات ڈیٹا بیس سے اٹھا کر ورکرز کی قطار میں ڈالتا ہے۔"""
+        if not self.is_running:
+            return 0
+        await self.flush()
+        room = self.queue_size - self._queue.qsize()
+        if room <= 0:
+            return 0
+        async with AsyncSessionLocal() as db:
+            rows = await async_crud.claim_due_webhook_deliveries(db, webhook_settings.RETRY_LEASE_SECONDS, min(limit, room))
+        requeued = 0
+        for row in rows:
+            delivery = _Delivery(row.subscription_id, row.event_id, row.event_type, row.body.encode("utf-8"), row.attempts, row.id)
+            try:
+                self._queue.put_nowait(delivery)
+            except asyncio.QueueFull:
+                # lease ختم ہونے پر دوبارہ اٹھائی جائے گی
+                break
+            requeued += 1
+        self.requeued += requeued
+        if requeued:
+            logger.info(f"🪝 {requeued} webhook ترسیلات دوبارہ کوشش کے لیے قطار میں۔")
+        return requeued
+
+    # --- پیمائش ---
+
+    def get_metrics(self) -> Dict[str, Any]:
+        latencies = np.asarray(self._latencies) * 1000 if self._latencies else None
+        return {
+            "running": self.is_running,
+            "workers": self.workers,
+            "subscriptions": len(self._targets),
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_size": self.queue_size,
+            "events": self.events,
+            "enqueued": self.enqueued,
+            "delivered": self.delivered,
+            "failed_attempts": self.failed_attempts,
+            "deferred_by_breaker": self.deferred,
+            "dead_lettered": self.dead_lettered,
+            "blocked_urls": self.blocked_urls,
+            "spilled_to_db": self.spilled,
+            "requeued_from_db": self.requeued,
+            "pending_writes": len(self._to_persist) + len(self._delivered_rows),
+            "latency_p50_ms": round(float(np.percentile(latencies, 50)), 1) if latencies is not None else 0.0,
+            "latency_p95_ms": round(float(np.percentile(latencies, 95)), 1) if latencies is not None else 0.0,
+            "latency_p99_ms": round(float(np.percentile(latencies, 99)), 1) if latencies is not None else 0.0,
+            "backlogged_endpoints": sum(1 for endpoint in self._endpoints.values() if endpoint.backlog),
+            "open_circuits": [
+                {"subscription_id": target_id, "url": self._targets[target_id].url, "failures": endpoint.breaker.failures}
+                for target_id, endpoint in self._endpoints.items()
+                if endpoint.breaker.state != "closed" and target_id in self._targets
+            ],
+        }
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """429 جواب کا Retry-After ہیڈر (سیکنڈز)، اگر موجود ہو۔"""
+    try:
+        return min(float(response.headers["retry-after"]), webhook_settings.BACKOFF_MAX_SECONDS)
+    except (KeyError, ValueError):
+        return None
+
+# ڈسپیچر کا عالمی نمونہ؛ app.py اسٹارٹ اپ پر اسے شروع کرتا ہے
+webhook_dispatcher = WebhookDispatcher()
@@ -0,0 +1,99 @@
+# filename: webhook_receiver.py
+
+"""
+webhook ترسیل کی جانچ کے لیے مقامی وصول کنندہ (stand-in)۔
+
+ہر درخواست کا دستخط webhook_dispatcher.verify_signature سے جانچتا ہے، ترسیلات گنتا ہے (فی راستہ، دہرائی گئی
+X-Webhook-Id سمیت) اور اختیاری طور پر تاخیر اور ناکامیاں (5xx) شامل کرتا ہے، تاکہ retry، سرکٹ بریکر اور
+dead-letter کا رویہ دیکھا جا سکے۔ webhook_benchmark اسے اسی پروسیس میں httpx.ASGITransport سے چلاتا ہے؛
+الگ سرور کے طور پر بھی چل سکتا ہے:
+
+    python webhook_receiver.py --port 9000 --secret <secret> --fail-rate 0.1
+    # پھر ALLOW_PRIVATE_URLS=true کے ساتھ چلتی ایپ میں /api/webhooks پر (X-Admin-Token ہیڈر کے ساتھ)
+    # url = http://localhost:9000/hooks/bot1 والی سبسکرپشن بنائیں
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+from typing import Any, Dict, Optional, Set, Tuple
+
+from fastapi import FastAPI, Request, Response
+
+from webhook_dispatcher import ID_HEADER, SIGNATURE_HEADER, TIMESTAMP_HEADER, verify_signature
+
+class ReceiverStats:
+    """وصول کنندہ کی گنتی۔"""
+    def __init__(self):
+        self.received = 0
+        self.accepted = 0
+        self.rejected_signature = 0
+        self.injected_failures = 0
+        self.duplicates = 0
+        self.by_path: Counter = Counter()
+        self._seen: Set[Tuple[str, str]] = set()
+        self.started = time.monotonic()
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started
+        return {
+            "received": self.received,
+            "accepted": self.accepted,
+            "rejected_signature": self.rejected_signature,
+            "injected_failures": self.injected_failures,
+            "duplicates": self.duplicates,
+            "paths": len(self.by_path),
+            "accepted_per_second": round(self.accepted / elapsed, 1) if elapsed else 0.0,
+        }
+
+def create_receiver_app(secret: str, fail_rate: float = 0.0, latency_ms: float = 0.0, seed: Optional[int] = None) -> FastAPI:
+    """
+    وصول کنندہ کی ایپ۔ fail_rate کے تناسب سے درخواستیں 503 پاتی ہیں؛ latency_ms ہر جواب سے پہلے انتظار۔
+    /hooks/fail/... والے راستے ہمیشہ 503 دیتے ہیں (سرکٹ بریکر کی جانچ کے لیے)۔
+    """
+    app = FastAPI(title="webhook receiver")
+    app.state.stats = ReceiverStats()
+    rng = random.Random(seed)
+
+    @app.post("/hooks/{path:path}")
+    async def receive(path: str, request: Request):
+        stats: ReceiverStats = app.state.stats
+        stats.received += 1
+        body = await request.body()
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        if not verify_signature(secret, request.headers.get(TIMESTAMP_HEADER, ""), body, request.headers.get(SIGNATURE_HEADER, "")):
+            stats.rejected_signature += 1
+            return Response(status_code=401)
+        if path.startswith("fail/") or (fail_rate and rng.random() < fail_rate):
+            stats.injected_failures += 1
+            return Response(status_code=503)
+        key = (path, request.headers.get(ID_HEADER, ""))
+        if key in stats._seen:
+            stats.duplicates += 1
+        stats._seen.add(key)
+        stats.accepted += 1
+        stats.by_path[path] += 1
+        return Response(status_code=204)
+
+    @app.get("/stats")
+    async def get_stats():
+        return app.state.stats.as_dict()
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="webhook ترسیل کی جانچ کے لیے مقامی وصول کنندہ")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--secret", required=True, help="سبسکرپشن کا secret")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="503 پانے والی درخواستوں کا تناسب")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="ہر جواب سے پہلے مصنوعی تاخیر")
+    args = parser.parse_args()
+    import uvicorn
+    uvicorn.run(create_receiver_app(args.secret, args.fail_rate, args.latency_ms), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
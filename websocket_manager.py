@@ -1,61 +1,621 @@
 # filename: websocket_manager.py
 
+"""
+WebSocket کنکشنز، فی کنکشن بھیجنے والی قطاریں، بیچ شدہ نشریات اور موضوع (topic) کی سبسکرپشنز۔
+
+کلائنٹ کا پروٹوکول (کلائنٹ سے سرور، JSON):
+    {"action": "subscribe", "symbols": ["EUR/USD"], "types": ["new_signal"], "min_confidence": 75}
+    {"action": "unsubscribe", "symbols": ["EUR/USD"], "types": ["new_signal"]}
+- کوئی سبسکرپشن نہ بھیجنے والا کلائنٹ سب کچھ وصول کرتا ہے (ڈیش بورڈ)۔
+- "symbols": ["*"] یا "types": ["*"] دوبارہ سب کچھ کر دیتا ہے۔
+- ہر درخواست کا جواب {"type": "subscription", "data": {...}} میں موجودہ سبسکرپشن ہے۔
+
+کئی ورکرز:
+- broadcast ایونٹ بس (event_bus) پر جاتا ہے اور ہر ورکر اپنے کلائنٹس کو deliver کرتا ہے۔ epoch اور seq ہر ورکر
+  کے اپنے ہیں؛ کلائنٹ کسی دوسرے ورکر سے جڑ جائے تو epoch نہیں ملتا اور اسے مکمل اسنیپ شاٹ ملتا ہے۔
+
+لائیو قیمتیں:
+- "price_update" پیغامات (price_stream) عارضی ہیں: ان پر seq نہیں لگتا اور یہ ری پلے بفر میں نہیں جاتے۔
+- ہر کلائنٹ کے پاس فی علامت صرف تازہ ترین قیمت رکھی جاتی ہے (نئی قیمت پرانی کی جگہ لیتی ہے) اور وہ فی علامت
+  زیادہ سے زیادہ PRICE_MIN_INTERVAL_SECONDS میں ایک بار بھیجی جاتی ہے، اس لیے ٹکس کا ریلا قطار نہیں بڑھاتا۔
+
+دوبارہ جڑنا (resync):
+- ہر نشر ہونے والے پیغام میں ایک بڑھتا ہوا "seq" ہوتا ہے، اور کنکشن پر سرور {"type": "hello", "data": {"epoch", "seq"}}
+  بھیجتا ہے۔ epoch ہر سرور پروسیس کے لیے نیا ہے، اس لیے ری اسٹارٹ کے بعد پرانے seq بے معنی ہو جاتے ہیں۔
+- کلائنٹ {"action": "resume", "epoch": "...", "last_seq": N} بھیجے تو اگر N ری پلے بفر کے اندر ہو تو صرف
+  چھوٹے ہوئے پیغامات ایک batch فریم میں ملتے ہیں، ورنہ {"type": "snapshot", "data": {...}} میں مکمل حالت۔
+- کلائنٹ seq <= آخری وصول شدہ seq والے پیغامات نظر انداز کرے۔
+- نئے کنکشن کے لائیو فریمز resume کا جواب (batch یا snapshot) قطار میں جانے تک روکے جاتے ہیں، تاکہ کلائنٹ
+  ری پلے سے پہلے نئے seq نہ دیکھے اور بیچ کے پیغامات "پرانے" سمجھ کر رد نہ کرے۔ resume کے بجائے کوئی اور پیغام
+  بھیجنے والے، یا کچھ نہ بھیجنے والے (RESUME_WAIT_SECONDS کے بعد) کلائنٹس کو روکے ہوئے فریمز پھر ملتے ہیں۔
+"""
+
 import asyncio
-import json
 import logging
-from typing import List, Dict, Any
+import time
+import uuid
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
 
+import orjson
 from fastapi import WebSocket
 
+from config import websocket_settings
+from response_cache import response_cache
+
 logger = logging.getLogger(__name__)
 
+OVERFLOW_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+# ان پیغامات میں صرف سگنل کی تازہ ترین حالت اہم ہے، اس لیے ایک ہی سگنل کے زیرِ التوا پیغامات ضم کیے جا سکتے ہیں
+COALESCIBLE_TYPES = ("new_signal", "signal_updated")
+# ان پیغامات کی صرف تازہ ترین قدر اہم ہے: یہ قطار کے بجائے فی علامت ایک خانے میں رکھے جاتے ہیں
+LATEST_VALUE_TYPES = ("price_update",)
+
+class _Outbound(NamedTuple):
+    enqueued_at: float
+    coalesce_key: Optional[Tuple[str, str]]
+    payload: str
+
+def _coalesce_key(message: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    if message.get("type") not in COALESCIBLE_TYPES:
+        return None
+    signal_id = (message.get("data") or {}).get("signal_id")
+    return ("signal", signal_id) if signal_id else None
+
+def _merge_batch(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    ایک ہی سگنل کے کئی new_signal/signal_updated پیغامات میں سے صرف تازہ ترین، اپنی (آخری) جگہ پر؛ پرانا
+    پیغام ہٹ جاتا ہے تاکہ تازہ حالت بیچ کے پیغامات (مثلاً signal_closed) سے آگے نہ نکلے۔
+    """
+    keys = [_coalesce_key(message) for message in messages]
+    latest = {key: index for index, key in enumerate(keys) if key is not None}
+    return [message for index, (message, key) in enumerate(zip(messages, keys)) if key is None or latest[key] == index]
+
+def message_symbols(message: Dict[str, Any]) -> Optional[Set[str]]:
+    """پیغام کن علامتوں سے متعلق ہے؛ None کا مطلب ہے کسی علامت سے مخصوص نہیں (سب کو جاتا ہے)۔"""
+    data = message.get("data") or {}
+    if "symbols" in data:
+        return set(data["symbols"])
+    if "symbol" in data:
+        return {data["symbol"]}
+    return None
+
+def _normalize_symbols(values: Iterable[Any]) -> Set[str]:
+    return {str(value).strip().upper() for value in values if str(value).strip()}
+
+class Subscription:
+    """ایک کلائنٹ کی دلچسپی: علامتیں، پیغام کی اقسام (None = سب) اور کم از کم اعتماد۔"""
+    __slots__ = ("symbols", "types", "min_confidence")
+
+    def __init__(self):
+        self.symbols: Optional[Set[str]] = None
+        self.types: Optional[Set[str]] = None
+        self.min_confidence = 0.0
+
+    def view(self, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        اس کلائنٹ کو جانے والی پیغام کی شکل، یا None۔ کئی سگنلز والے signals_closed کو صرف
+        سبسکرائب شدہ علامتوں تک محدود کیا جاتا ہے۔
+        """
+        if self.types is not None and message.get("type") not in self.types:
+            return None
+        data = message.get("data") or {}
+        confidence = data.get("confidence")
+        if self.min_confidence and isinstance(confidence, (int, float)) and confidence < self.min_confidence:
+            return None
+        if self.symbols is None:
+            return message
+        if "symbols" in data and "signal_ids" in data:
+            pairs = [(i, s) for i, s in zip(data["signal_ids"], data["symbols"]) if s in self.symbols]
+            if not pairs:
+                return None
+            if len(pairs) == len(data["signal_ids"]):
+                return message
+            ids, symbols = zip(*pairs)
+            return {**message, "data": {**data, "signal_ids": list(ids), "symbols": list(symbols)}}
+        symbols = message_symbols(message)
+        if symbols is not None and not (symbols & self.symbols):
+            return None
+        return message
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "symbols": sorted(self.symbols) if self.symbols is not None else ["*"],
+            "types": sorted(self.types) if self.types is not None else ["*"],
+            "min_confidence": self.min_confidence,
+        }
+
+class ClientConnection:
+    """
+    ایک WebSocket کلائنٹ: ایک محدود بھیجنے والی قطار اور اسے خالی کرنے والا اپنا رائٹر ٹاسک۔
+    سست کلائنٹ صرف اپنی قطار بھرتا ہے؛ باقی کلائنٹس اور نشر کرنے والے اس کا انتظار نہیں کرتے۔
+    """
+    def __init__(self, websocket: WebSocket, manager: "ConnectionManager"):
+        self.websocket = websocket
+        self._manager = manager
+        self._queue: Deque[_Outbound] = deque()
+        self._wakeup = asyncio.Event()
+        self._writer_task: Optional[asyncio.Task] = None
+        self.subscription = Subscription()
+        self.connected_at = time.time()
+        # فی علامت تازہ ترین قیمت جو ابھی بھیجی نہیں گئی، اور ہر علامت کی آخری ترسیل کا وقت
+        self._latest: Dict[str, str] = {}
+        self._latest_sent_at: Dict[str, float] = {}
+        # resume کے جواب تک روکے گئے لائیو فریمز (None = روک نہیں)
+        self._held: Optional[Deque[Tuple[str, Optional[Tuple[str, str]]]]] = None
+        self.hold_task: Optional[asyncio.Task] = None
+        # --- پیمائش ---
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.prices_sent = 0
+        self.prices_coalesced = 0
+
+    def start(self):
+        self._writer_task = asyncio.create_task(self._run_writer())
+
+    def stop(self):
+        if self._writer_task and self._writer_task is not asyncio.current_task():
+            self._writer_task.cancel()
+        if self.hold_task and self.hold_task is not asyncio.current_task():
+            self.hold_task.cancel()
+
+    def hold(self):
+        """اب سے لائیو فریمز release() تک قطار کے بجائے الگ رکھے جاتے ہیں (پہلے سے روک ہو تو کچھ نہیں)۔"""
+        if self._held is None:
+            self._held = deque(maxlen=self._manager.queue_size)
+
+    def release(self) -> bool:
+        """
+        روکے گئے لائیو فریمز قطار میں ڈال کر روک ختم کرتا ہے (دوسری بار کچھ نہیں کرتا)۔
+        Returns: False اگر اوور فلو پالیسی 'disconnect' کے تحت کنکشن بند کرنا ہو۔
+        """
+        held, self._held = self._held, None
+        ok = True
+        for payload, coalesce_key in held or ():
+            ok = self.enqueue(payload, coalesce_key) and ok
+        return ok
+
+    def enqueue_live(self, payload: str, coalesce_key: Optional[Tuple[str, str]]) -> bool:
+        """نشریاتی فریم: روک ہو تو الگ رکھا جاتا ہے (زیادہ ہوں تو پرانے گرتے ہیں، وہ ری پلے میں ہیں)، ورنہ enqueue۔"""
+        if self._held is not None:
+            self._held.append((payload, coalesce_key))
+            return True
+        return self.enqueue(payload, coalesce_key)
+
+    def enqueue(self, payload: str, coalesce_key: Optional[Tuple[str, str]]) -> bool:
+        """
+        پیغام قطار میں ڈالتا ہے اور فوراً واپس آتا ہے۔
+        Returns: False اگر اوور فلو پالیسی 'disconnect' کے تحت کنکشن بند کرنا ہو۔
+        """
+        policy = self._manager.overflow_policy
+        now = time.monotonic()
+        if policy == "coalesce" and coalesce_key is not None:
+            for i, pending in enumerate(self._queue):
+                if pending.coalesce_key == coalesce_key:
+                    # پرانا فریم ہٹا کر نیا آخر میں، تاکہ seq بڑھتی ترتیب میں رہے (کلائنٹ چھوٹے seq والے فریم
+                    # رد کر دیتا ہے)؛ وقت پرانا رہے تاکہ تاخیر کی پیمائش درست رہے
+                    del self._queue[i]
+                    self._queue.append(pending._replace(payload=payload))
+                    self.coalesced += 1
+                    self._wakeup.set()
+                    return True
+        if len(self._queue) >= self._manager.queue_size:
+            if policy == "disconnect":
+                return False
+            self._queue.popleft()
+            self.dropped += 1
+        self._queue.append(_Outbound(now, coalesce_key, payload))
+        self._wakeup.set()
+        return True
+
+    def offer_latest(self, symbol: str, payload: str):
+        """علامت کی تازہ ترین قیمت رکھتا ہے (پچھلی نہ بھیجی گئی قیمت کی جگہ)؛ قطار اور اوور فلو پالیسی سے الگ۔"""
+        if symbol in self._latest:
+            self.prices_coalesced += 1
+        self._latest[symbol] = payload
+        self._wakeup.set()
+
+    def _take_due_latest(self) -> Tuple[Optional[str], Optional[float]]:
+        """(بھیجنے کے قابل قیمت، None) یا (None، اگلی قیمت کے قابل ہونے تک انتظار)۔"""
+        now = time.monotonic()
+        interval = self._manager.price_interval
+        wait = None
+        for symbol in self._latest:
+            remaining = self._latest_sent_at.get(symbol, 0.0) + interval - now
+            if remaining <= 0:
+                self._latest_sent_at[symbol] = now
+                return self._latest.pop(symbol), None
+            wait = remaining if wait is None else min(wait, remaining)
+        return None, wait
+
+    @property
+    def pending(self) -> int:
+        return len(self._queue)
+
+    def current_lag(self) -> float:
+        """سب سے پرانے زیرِ التوا پیغام کی عمر (سیکنڈ)۔"""
+        return time.monotonic() - self._queue[0].enqueued_at if self._queue else 0.0
+
+    async def _run_writer(self):
+        try:
+            while True:
+                if not self._queue:
+                    # قطار خالی ہو تو وقت پر پہنچی قیمتیں؛ باقی کے لیے اگلی کے وقت تک (یا نئے پیغام تک) انتظار
+                    payload, wait = self._take_due_latest() if self._latest else (None, None)
+                    if payload is not None:
+                        await asyncio.wait_for(self.websocket.send_text(payload), timeout=self._manager.send_timeout)
+                        self.prices_sent += 1
+                        continue
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                item = self._queue.popleft()
+                await asyncio.wait_for(
+                    self.websocket.send_text(item.payload), timeout=self._manager.send_timeout
+                )
+                self.sent += 1
+                self.last_lag = time.monotonic() - item.enqueued_at
+                self.max_lag = max(self.max_lag, self.last_lag)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"ایک کنکشن کو پیغام بھیجنے میں ناکامی: {e!r}۔ کنکشن کو ہٹایا جا رہا ہے۔")
+            await self._manager.evict(self.websocket)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        client = self.websocket.client
+        return {
+            "client": f"{client.host}:{client.port}" if client else None,
+            "connected_seconds": round(time.time() - self.connected_at, 1),
+            "pending": self.pending,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "current_lag_ms": round(self.current_lag() * 1000, 1),
+            "last_lag_ms": round(self.last_lag * 1000, 1),
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "held": len(self._held) if self._held is not None else 0,
+            "prices_pending": len(self._latest),
+            "prices_sent": self.prices_sent,
+            "prices_coalesced": self.prices_coalesced,
+            "subscription": self.subscription.as_dict(),
+        }
+
 class ConnectionManager:
     """
     WebSocket کنکشنز کو منظم کرنے کے لیے مرکزی کلاس۔
     یہ نئے کنکشنز کو قبول کرتی ہے، منقطع کرتی ہے، اور تمام فعال کنکشنز کو پیغامات نشر کرتی ہے۔
+    ہر کنکشن کی اپنی محدود قطار ہے، اس لیے broadcast کبھی کسی کلائنٹ کا انتظار نہیں کرتا۔
+    ایک مختصر وقفے (batch window) میں نشر ہونے والے پیغامات ایک فریم {"type": "batch", "messages": [...]} میں
+    جمع ہو کر ایک ہی بار سیریلائز ہوتے ہیں؛ اکیلا پیغام پہلے کی طرح اپنی اصل شکل میں جاتا ہے۔
     """
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    def __init__(
+        self,
+        queue_size: int = websocket_settings.SEND_QUEUE_SIZE,
+        overflow_policy: str = websocket_settings.OVERFLOW_POLICY,
+        send_timeout: float = websocket_settings.SEND_TIMEOUT_SECONDS,
+        batch_window: float = websocket_settings.BATCH_WINDOW_SECONDS,
+        replay_size: int = websocket_settings.REPLAY_BUFFER_SIZE,
+        price_interval: float = websocket_settings.PRICE_MIN_INTERVAL_SECONDS,
+        resume_wait: float = websocket_settings.RESUME_WAIT_SECONDS,
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            logger.warning(f"نامعلوم اوور فلو پالیسی '{overflow_policy}'، 'drop_oldest' استعمال ہوگی۔")
+            overflow_policy = "drop_oldest"
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.send_timeout = send_timeout
+        self.batch_window = batch_window
+        self.price_interval = price_interval
+        self.resume_wait = resume_wait
+        self.active_connections: Dict[WebSocket, ClientConnection] = {}
+        # موضوع کا انڈیکس: علامت -> دلچسپی رکھنے والے کنکشنز؛ بغیر علامت فلٹر والے الگ سیٹ میں
+        self._by_symbol: Dict[str, Set[WebSocket]] = {}
+        self._all_symbols: Set[WebSocket] = set()
+        self.evicted = 0
+        self.frames_sent = 0
+        self.messages_sent = 0
+        self._pending: List[Dict[str, Any]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        # --- ترتیب نمبر اور ری پلے ---
+        self.epoch = uuid.uuid4().hex
+        self.seq = 0
+        self._replay: Deque[Dict[str, Any]] = deque(maxlen=replay_size)
+        # مکمل حالت بنانے والا فنکشن (app.py سیٹ کرتا ہے)، تاکہ یہ ماڈیول ڈیٹا بیس سے آزاد رہے
+        self.snapshot_provider: Optional[Callable[[], Awaitable[Dict[str, Any]]]] = None
+        # ورکرز کے درمیان ایونٹ بس (app.py سیٹ کرتا ہے)؛ None ہو تو نشریات صرف اسی پروسیس میں
+        self.bus: Optional[Any] = None
 
     async def connect(self, websocket: WebSocket):
         """ایک نئے WebSocket کنکشن کو قبول کرتا ہے اور اسے فعال فہرست میں شامل کرتا ہے۔"""
         await websocket.accept()
-        self.active_connections.append(websocket)
+        connection = ClientConnection(websocket, self)
+        self.active_connections[websocket] = connection
+        self._all_symbols.add(websocket)
+        # لائیو فریمز resume کے جواب کے بعد؛ hello پر موجود seq سے آگے کے فریمز روکے جاتے ہیں
+        connection.hold()
+        connection.hold_task = asyncio.create_task(self._release_after_wait(websocket))
+        connection.start()
+        connection.enqueue(orjson.dumps({"type": "hello", "data": {"epoch": self.epoch, "seq": self.seq}}).decode("utf-8"), None)
         logger.info(f"🔌 نیا WebSocket کنکشن قائم ہوا۔ کل فعال کنکشنز: {len(self.active_connections)}")
 
     def disconnect(self, websocket: WebSocket):
         """ایک WebSocket کنکشن کو فعال فہرست سے ہٹاتا ہے۔"""
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        connection = self.active_connections.pop(websocket, None)
+        if connection:
+            self._unindex(websocket, connection.subscription)
+            connection.stop()
             logger.info(f"🔌 WebSocket کنکشن منقطع ہوا۔ کل فعال کنکشنز: {len(self.active_connections)}")
 
+    async def evict(self, websocket: WebSocket):
+        """سست یا ناکام کلائنٹ کو ہٹا کر اس کا ساکٹ بند کرتا ہے (endpoint کا receive لوپ پھر خود ختم ہو جاتا ہے)۔"""
+        if websocket not in self.active_connections:
+            return
+        self.evicted += 1
+        self.disconnect(websocket)
+        try:
+            await websocket.close(code=1013)  # Try Again Later
+        except Exception:
+            pass
+
+    async def _release(self, websocket: WebSocket):
+        connection = self.active_connections.get(websocket)
+        if connection is not None and not connection.release():
+            logger.warning("ایک سست کلائنٹ کی قطار بھر گئی (پالیسی: disconnect)۔ کنکشن کو ہٹایا جا رہا ہے۔")
+            await self.evict(websocket)
+
+    async def _release_after_wait(self, websocket: WebSocket):
+        """resume نہ بھیجنے والا کلائنٹ بھی آخرکار لائیو فریمز پائے۔"""
+        await asyncio.sleep(self.resume_wait)
+        await self._release(websocket)
+
     async def broadcast(self, message: Dict[str, Any]):
-        """تمام فعال کنکشنز کو ایک JSON پیغام بھیجتا ہے۔"""
+        """
+        پیغام تمام ورکرز میں نشر کرتا ہے: ایونٹ بس لگی ہو تو اس پر شائع (جو ہر ورکر میں deliver تک پہنچاتی ہے)،
+        ورنہ سیدھا اسی پروسیس میں deliver۔
+        """
+        if self.bus is None:
+            await self.deliver(message)
+            return
+        await self.bus.publish(message)
+
+    async def deliver(self, message: Dict[str, Any]):
+        """
+        پیغام کو اس ورکر کے اگلے فریم کے لیے جمع کرتا ہے اور فوراً واپس آتا ہے؛ اسی واقعے پر REST جوابی کیش خالی کرتا ہے۔
+        فریم batch window کے بعد تمام کنکشنز کی قطاروں میں ڈالا جاتا ہے۔
+        """
+        if message.get("type") in LATEST_VALUE_TYPES:
+            self._offer_latest(message)
+            return
+        response_cache.invalidate_for_event(message.get("type"))
+        # کوئی کنکشن نہ ہو تب بھی پیغام ری پلے بفر میں جاتا ہے، تاکہ دوبارہ جڑنے والا کلائنٹ اسے حاصل کر سکے
+        self._pending.append(message)
+        if self.batch_window <= 0:
+            await self.flush()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_after_window())
+
+    def _offer_latest(self, message: Dict[str, Any]):
+        """عارضی پیغام (قیمت) دلچسپی رکھنے والے کنکشنز کے فی علامت خانے میں؛ ایک ہی بار سیریلائز۔"""
+        symbol = (message.get("data") or {}).get("symbol")
+        if not symbol:
+            return
+        payload = None
+        for websocket in self._interested(message):
+            connection = self.active_connections.get(websocket)
+            if connection is None or connection.subscription.view(message) is None:
+                continue
+            if payload is None:
+                payload = orjson.dumps(message, default=str).decode("utf-8")
+            connection.offer_latest(symbol, payload)
+
+    async def _flush_after_window(self):
+        await asyncio.sleep(self.batch_window)
+        await self.flush()
+
+    # --- سبسکرپشنز ---
+
+    def _unindex(self, websocket: WebSocket, subscription: Subscription):
+        if subscription.symbols is None:
+            self._all_symbols.discard(websocket)
+            return
+        for symbol in subscription.symbols:
+            subscribers = self._by_symbol.get(symbol)
+            if subscribers:
+                subscribers.discard(websocket)
+                if not subscribers:
+                    del self._by_symbol[symbol]
+
+    def _index(self, websocket: WebSocket, subscription: Subscription):
+        if subscription.symbols is None:
+            self._all_symbols.add(websocket)
+            return
+        for symbol in subscription.symbols:
+            self._by_symbol.setdefault(symbol, set()).add(websocket)
+
+    def update_subscription(self, websocket: WebSocket, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        subscribe/unsubscribe درخواست لاگو کرتا ہے اور نئی سبسکرپشن واپس کرتا ہے۔
+        غلط درخواست پر ValueError۔
+        """
+        connection = self.active_connections.get(websocket)
+        if connection is None:
+            raise ValueError("کنکشن فعال نہیں۔")
+        action = request.get("action")
+        if action not in ("subscribe", "unsubscribe"):
+            raise ValueError(f"نامعلوم action: {action!r}")
+        symbols = request.get("symbols")
+        types = request.get("types")
+        if symbols is not None and not isinstance(symbols, list) or types is not None and not isinstance(types, list):
+            raise ValueError("'symbols' اور 'types' فہرستیں ہونی چاہئیں۔")
+
+        subscription = connection.subscription
+        self._unindex(websocket, subscription)
+        if action == "subscribe":
+            if symbols is not None:
+                wanted = _normalize_symbols(symbols)
+                subscription.symbols = None if "*" in wanted else (subscription.symbols or set()) | wanted
+            if types is not None:
+                wanted_types = {str(t) for t in types}
+                subscription.types = None if "*" in wanted_types else (subscription.types or set()) | wanted_types
+            if request.get("min_confidence") is not None:
+                subscription.min_confidence = float(request["min_confidence"])
+        else:
+            if symbols is not None and subscription.symbols is not None:
+                subscription.symbols -= _normalize_symbols(symbols)
+            elif symbols is not None:
+                # "سب" میں سے کچھ ہٹانا ممکن نہیں؛ فہرست معلوم نہیں، اس لیے کچھ بھی نہیں
+                subscription.symbols = set()
+            if types is not None and subscription.types is not None:
+                subscription.types -= {str(t) for t in types}
+            elif types is not None:
+                subscription.types = set()
+        self._index(websocket, subscription)
+        return subscription.as_dict()
+
+    async def handle_client_message(self, websocket: WebSocket, text: str):
+        """کلائنٹ کا پیغام پروسیس کر کے جواب صرف اسی کلائنٹ کی قطار میں ڈالتا ہے۔"""
+        connection = self.active_connections.get(websocket)
+        if connection is None:
+            return
+        try:
+            request = orjson.loads(text)
+            if not isinstance(request, dict):
+                raise ValueError("پیغام ایک JSON آبجیکٹ ہونا چاہیے۔")
+            if request.get("action") == "resume":
+                await self.resume(websocket, request.get("epoch"), request.get("last_seq"))
+                return
+            reply = {"type": "subscription", "data": self.update_subscription(websocket, request)}
+        except (ValueError, TypeError) as e:
+            reply = {"type": "error", "data": {"detail": str(e)}}
+        connection.enqueue(orjson.dumps(reply).decode("utf-8"), None)
+        # resume نہ کرنے والا کلائنٹ: اس کا پہلا پیغام ہی روک ختم کرتا ہے
+        await self._release(websocket)
+
+    # --- دوبارہ جڑنا ---
+
+    async def resume(self, websocket: WebSocket, epoch: Optional[str], last_seq: Any):
+        """چھوٹے ہوئے پیغامات (ری پلے بفر سے) یا مکمل اسنیپ شاٹ اسی کلائنٹ کی قطار میں ڈالتا ہے۔"""
+        connection = self.active_connections.get(websocket)
+        if connection is None:
+            return
+        oldest = self._replay[0]["seq"] if self._replay else self.seq + 1
+        if epoch == self.epoch and isinstance(last_seq, int) and oldest - 1 <= last_seq <= self.seq:
+            # بفر سے پڑھائی اور قطار میں ڈالنا بغیر await کے، اس لیے بیچ میں کوئی فریم نہیں چھوٹتا
+            missed = [
+                view for view in (connection.subscription.view(m) for m in self._replay if m["seq"] > last_seq)
+                if view is not None
+            ]
+            frame = {"type": "batch", "messages": missed}
+            connection.enqueue(orjson.dumps(frame, default=str).decode("utf-8"), None)
+        else:
+            # اسنیپ شاٹ بنتے وقت (پہلے سے جڑے کلائنٹ کے بھی) لائیو فریمز اسنیپ شاٹ سے پہلے نہ جائیں
+            connection.hold()
+            await self._send_snapshot(connection)
+        # روکے گئے فریمز جواب کے بعد؛ ان میں جو ری پلے میں آ چکے وہ کلائنٹ seq سے رد کر دیتا ہے
+        await self._release(websocket)
+
+    async def _send_snapshot(self, connection: ClientConnection):
+        """
+        اسنیپ شاٹ، پھر ری پلے بفر سے اس کے seq کے بعد والے پیغامات۔ seq پڑھائی سے پہلے لیا جاتا ہے، اس لیے
+        اسنیپ شاٹ بنتے وقت نشر ہونے والی ہر تبدیلی اسنیپ شاٹ کے بعد دوبارہ لاگو ہوتی ہے (کلائنٹ پر upsert/حذف، جو
+        پہلے سے شامل تبدیلی پر بے اثر ہے) اور پرانی پڑھائی اسے مٹا نہیں سکتی۔
+        """
+        seq = self.seq
+        try:
+            data = await self.snapshot_provider() if self.snapshot_provider else {}
+        except Exception as e:
+            logger.error(f"WebSocket اسنیپ شاٹ بنانے میں خرابی: {e}", exc_info=True)
+            connection.enqueue(orjson.dumps({"type": "error", "data": {"detail": "اسنیپ شاٹ دستیاب نہیں۔"}}).decode("utf-8"), None)
+            return
+        frame = {"type": "snapshot", "data": {"epoch": self.epoch, "seq": seq, **data}}
+        connection.enqueue(orjson.dumps(frame, default=str).decode("utf-8"), None)
+        since = [
+            view for view in (connection.subscription.view(m) for m in self._replay if m["seq"] > seq)
+            if view is not None
+        ]
+        if since:
+            connection.enqueue(orjson.dumps({"type": "batch", "messages": since}, default=str).decode("utf-8"), None)
+
+    def _interested(self, message: Dict[str, Any]) -> Set[WebSocket]:
+        """صرف وہ کنکشنز جن کی علامتیں اس پیغام سے ملتی ہیں (انڈیکس سے، سب کنکشنز اسکین کیے بغیر)۔"""
+        symbols = message_symbols(message)
+        if symbols is None:
+            return set(self.active_connections)
+        interested = set(self._all_symbols)
+        for symbol in symbols:
+            interested |= self._by_symbol.get(symbol, set())
+        return interested
+
+    async def flush(self):
+        """
+        جمع شدہ پیغامات کو فریمز میں سیریلائز کر کے دلچسپی رکھنے والے کنکشنز کی قطاروں میں ڈالتا ہے۔
+        ایک جیسے پیغامات پانے والے کلائنٹس ایک ہی سیریلائز شدہ فریم شیئر کرتے ہیں۔
+        """
+        messages, self._pending = _merge_batch(self._pending), []
+        if not messages:
+            return
+        # ترتیب نمبر فریم بنتے وقت لگتے ہیں، اس لیے ہر کلائنٹ کو seq بڑھتی ترتیب میں ملتے ہیں
+        for i, message in enumerate(messages):
+            self.seq += 1
+            messages[i] = {**message, "seq": self.seq}
+            self._replay.append(messages[i])
         if not self.active_connections:
-            logger.debug("کوئی فعال WebSocket کنکشن نہیں، پیغام نشر نہیں کیا گیا۔")
-            return
-
-        # پیغام کو JSON سٹرنگ میں تبدیل کریں
-        message_str = json.dumps(message)
-        
-        logger.info(f"📡 {len(self.active_connections)} فعال کنکشنز کو پیغام نشر کیا جا رہا ہے...")
-        
-        # اصلاح: تمام کنکشنز کو ایک ساتھ پیغام بھیجنے کے لیے ٹاسک بنائیں
-        tasks = [connection.send_text(message_str) for connection in self.active_connections]
-        
-        # asyncio.gather کا استعمال کرتے ہوئے تمام ٹاسک چلائیں اور نتائج حاصل کریں
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # ناکام کنکشنز کو تلاش کریں اور انہیں ہٹائیں
-        failed_connections = []
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                connection = self.active_connections[i]
-                failed_connections.append(connection)
-                logger.warning(f"ایک کنکشن کو پیغام بھیجنے میں ناکامی: {result}۔ کنکشن کو ہٹایا جا رہا ہے۔")
-
-        for connection in failed_connections:
-            self.disconnect(connection)
+            logger.debug("کوئی فعال WebSocket کنکشن نہیں، پیغام صرف ری پلے بفر میں رکھا گیا۔")
+            return
+
+        # ہر کلائنٹ کے لیے (پیغام کا نمبر، اس کی شکل کی پہچان) کی فہرست؛ یہی فریم کی کلید بھی ہے
+        views: Dict[WebSocket, List[Tuple[Tuple[int, Any], Dict[str, Any]]]] = {}
+        for index, message in enumerate(messages):
+            for websocket in self._interested(message):
+                connection = self.active_connections.get(websocket)
+                view = connection.subscription.view(message) if connection else None
+                if view is not None:
+                    shape = None if view is message else tuple(view["data"]["signal_ids"])
+                    views.setdefault(websocket, []).append(((index, shape), view))
+
+        frames: Dict[Tuple, Tuple[str, Optional[Tuple[str, str]]]] = {}
+        overflowed = []
+        for websocket, entries in views.items():
+            key = tuple(shape for shape, _ in entries)
+            if key not in frames:
+                client_messages = [view for _, view in entries]
+                if len(client_messages) == 1:
+                    frame, coalesce_key = client_messages[0], _coalesce_key(client_messages[0])
+                else:
+                    frame, coalesce_key = {"type": "batch", "messages": client_messages}, None
+                frames[key] = (orjson.dumps(frame, default=str).decode("utf-8"), coalesce_key)
+                self.frames_sent += 1
+            frame_str, coalesce_key = frames[key]
+            if not self.active_connections[websocket].enqueue_live(frame_str, coalesce_key):
+                overflowed.append(websocket)
+        self.messages_sent += len(messages)
+        logger.info(f"📡 {len(messages)} پیغامات {len(views)} دلچسپی رکھنے والے کنکشنز کو {len(frames)} فریمز میں نشر کیے جا رہے ہیں...")
+
+        for websocket in overflowed:
+            logger.warning("ایک سست کلائنٹ کی قطار بھر گئی (پالیسی: disconnect)۔ کنکشن کو ہٹایا جا رہا ہے۔")
+            await self.evict(websocket)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """فی کنکشن قطار اور تاخیر کی پیمائش۔"""
+        return {
+            "connections": len(self.active_connections),
+            "queue_size": self.queue_size,
+            "overflow_policy": self.overflow_policy,
+            "evicted": self.evicted,
+            "frames_sent": self.frames_sent,
+            "messages_sent": self.messages_sent,
+            "epoch": self.epoch,
+            "seq": self.seq,
+            "replay_buffered": len(self._replay),
+            "clients": [connection.get_metrics() for connection in self.active_connections.values()],
+        }
 
 # مینیجر کا ایک عالمی نمونہ (Global Instance) بناتے ہیں تاکہ پوری ایپلیکیشن میں استعمال ہو سکے
 manager = ConnectionManager()